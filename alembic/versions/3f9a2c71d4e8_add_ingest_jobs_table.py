@@ -0,0 +1,64 @@
+"""Add ingest_jobs table
+
+Revision ID: 3f9a2c71d4e8
+Revises: ccb1cea37819
+Create Date: 2026-10-17 10:20:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a2c71d4e8"
+down_revision: str | None = "ccb1cea37819"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ingest_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "kind", sa.Enum("UPLOAD", "UPDATE", name="ingestjobkind"), nullable=False
+        ),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "PENDING", "RUNNING", "SUCCEEDED", "FAILED", name="ingestjobstatus"
+            ),
+            nullable=False,
+        ),
+        sa.Column("phase", sa.String(), nullable=False),
+        sa.Column("features_processed", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("result", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("network_id", sa.Integer(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["network_id"], ["road_networks.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_ingest_jobs_status"), "ingest_jobs", ["status"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_ingest_jobs_status"), table_name="ingest_jobs")
+    op.drop_table("ingest_jobs")
+    sa.Enum(name="ingestjobstatus").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="ingestjobkind").drop(op.get_bind(), checkfirst=True)
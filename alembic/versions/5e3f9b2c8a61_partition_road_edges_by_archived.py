@@ -0,0 +1,167 @@
+"""Partition road_edges into live and history partitions by archived
+
+Revision ID: 5e3f9b2c8a61
+Revises: 9c2e5a7d1f04
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e3f9b2c8a61"
+down_revision: str | None = "9c2e5a7d1f04"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+FOREIGN_KEYS = (
+    ("road_edges_network_id_fkey", "network_id", "road_networks"),
+    ("road_edges_user_id_fkey", "user_id", "users"),
+    ("road_edges_source_node_id_fkey", "source_node_id", "road_nodes"),
+    ("road_edges_target_node_id_fkey", "target_node_id", "road_nodes"),
+)
+
+# every column but the generated highway, for moving rows between tables
+COLUMNS = (
+    "id, name, ref, lanes, oneway, length, width, tunnel, extra_properties, "
+    "geometry, is_current, valid_from, valid_to, fingerprint, timestamp, "
+    "network_id, user_id, source_node_id, target_node_id"
+)
+
+
+def rename_indexes(table: str, prefix: str, new_prefix: str) -> None:
+    op.execute(
+        f"""
+        DO $$
+        DECLARE index_name text;
+        BEGIN
+            FOR index_name IN
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = '{table}' AND starts_with(indexname, '{prefix}')
+            LOOP
+                EXECUTE format(
+                    'ALTER INDEX %I RENAME TO %I',
+                    index_name,
+                    '{new_prefix}' || substr(index_name, {len(prefix) + 1})
+                );
+            END LOOP;
+        END $$
+        """
+    )
+
+
+def create_indexes() -> None:
+    """The indexes of app/db/models.py, on the partitioned table."""
+    op.create_index(
+        "ix_road_edges_current_fingerprint",
+        "road_edges",
+        ["network_id", "fingerprint"],
+        postgresql_where=sa.text("is_current"),
+    )
+    op.create_index(
+        "ix_road_edges_network_geometry",
+        "road_edges",
+        ["network_id", "geometry"],
+        postgresql_using="gist",
+    )
+    op.create_index(
+        "ix_road_edges_extra_properties",
+        "road_edges",
+        ["extra_properties"],
+        postgresql_using="gin",
+        postgresql_ops={"extra_properties": "jsonb_path_ops"},
+    )
+    op.create_index(
+        "ix_road_edges_network_highway", "road_edges", ["network_id", "highway"]
+    )
+    op.create_index("ix_road_edges_network_id", "road_edges", ["network_id", "id"])
+    op.create_index(
+        "ix_road_edges_network_valid_from", "road_edges", ["network_id", "valid_from"]
+    )
+    op.create_index(
+        "ix_road_edges_network_valid_to", "road_edges", ["network_id", "valid_to"]
+    )
+    op.create_index("ix_road_edges_source_node_id", "road_edges", ["source_node_id"])
+    op.create_index("ix_road_edges_target_node_id", "road_edges", ["target_node_id"])
+    op.create_index(
+        "ix_road_edges_network_validity",
+        "road_edges",
+        ["network_id", sa.text("tstzrange(valid_from, valid_to, '[)')")],
+        postgresql_using="gist",
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "road_edges",
+        sa.Column("archived", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+    # the existing table becomes the live partition as it is, its indexes
+    # make way for the ones of the partitioned table and are attached to them
+    # instead of being built again
+    op.rename_table("road_edges", "road_edges_live")
+    op.execute("ALTER TABLE road_edges_live DROP CONSTRAINT road_edges_pkey")
+    rename_indexes("road_edges_live", "ix_road_edges_", "ix_road_edges_live_")
+
+    op.execute(
+        """
+        CREATE TABLE road_edges (
+            LIKE road_edges_live
+            INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING STORAGE,
+            PRIMARY KEY (id, archived)
+        ) PARTITION BY LIST (archived)
+        """
+    )
+    op.execute("ALTER SEQUENCE road_edges_id_seq OWNED BY road_edges.id")
+    op.execute(
+        "ALTER TABLE road_edges ATTACH PARTITION road_edges_live FOR VALUES IN (false)"
+    )
+    op.execute(
+        "CREATE TABLE road_edges_history PARTITION OF road_edges FOR VALUES IN (true)"
+    )
+
+    # the live partition's constraints of the same definition are attached
+    for name, column, table in FOREIGN_KEYS:
+        op.create_foreign_key(name, "road_edges", table, [column], ["id"])
+    create_indexes()
+
+    # the retired edges stay in the live partition until the archival job,
+    # which the API starts when it comes up, moved them
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE road_edges DETACH PARTITION road_edges_live")
+    op.execute("ALTER TABLE road_edges DETACH PARTITION road_edges_history")
+    op.execute(
+        f"INSERT INTO road_edges_live ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM road_edges_history"
+    )
+    op.execute("ALTER SEQUENCE road_edges_id_seq OWNED BY road_edges_live.id")
+    op.drop_table("road_edges_history")
+    op.drop_table("road_edges")
+
+    op.rename_table("road_edges_live", "road_edges")
+    # the (id, archived) key the partition got when it was attached
+    op.execute(
+        """
+        DO $$
+        DECLARE constraint_name text;
+        BEGIN
+            SELECT conname INTO constraint_name FROM pg_constraint
+            WHERE conrelid = 'road_edges'::regclass AND contype = 'p';
+            EXECUTE format(
+                'ALTER TABLE road_edges DROP CONSTRAINT %I', constraint_name
+            );
+        END $$
+        """
+    )
+    op.create_primary_key("road_edges_pkey", "road_edges", ["id"])
+    rename_indexes("road_edges", "ix_road_edges_live_", "ix_road_edges_")
+    op.drop_column("road_edges", "archived")
@@ -0,0 +1,39 @@
+"""Add fingerprint to road_edges
+
+Revision ID: 8b41e0c2f6a3
+Revises: 3f9a2c71d4e8
+Create Date: 2026-10-17 10:40:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b41e0c2f6a3"
+down_revision: str | None = "3f9a2c71d4e8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing edges keep a NULL fingerprint, the next update of their network
+    # replaces them once with fingerprinted rows
+    op.add_column("road_edges", sa.Column("fingerprint", sa.String(32), nullable=True))
+    op.create_index(
+        "ix_road_edges_current_fingerprint",
+        "road_edges",
+        ["network_id", "fingerprint"],
+        unique=False,
+        postgresql_where=sa.text("is_current"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_road_edges_current_fingerprint", table_name="road_edges")
+    op.drop_column("road_edges", "fingerprint")
@@ -0,0 +1,126 @@
+"""Add road_network_stats table
+
+Revision ID: 9c2e5a7d1f04
+Revises: b6c1f08e4d93
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9c2e5a7d1f04"
+down_revision: str | None = "b6c1f08e4d93"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# the length, lane count and class of an edge, like app/core/network_stats.py
+# measures them: the length property or the length on the sphere, the leading
+# number of lanes or 1, string highway values only
+EDGE_LENGTH = (
+    "COALESCE(CASE WHEN e.length NOT IN ('NaN', 'Infinity', '-Infinity') "
+    "THEN e.length END, ST_Length(e.geometry::geography, false))"
+)
+EDGE_LANES = r"COALESCE(substring(e.lanes FROM '^\s*(\d+(?:\.\d+)?)')::float, 1)"
+EDGE_HIGHWAY = (
+    "CASE WHEN jsonb_typeof(e.extra_properties -> 'highway') = 'string' "
+    "THEN e.extra_properties ->> 'highway' END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "road_network_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("network_id", sa.Integer(), nullable=False),
+        sa.Column("valid_from", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("edge_count", sa.Integer(), nullable=False),
+        sa.Column("length", sa.Float(), nullable=False),
+        sa.Column("lane_km", sa.Float(), nullable=False),
+        sa.Column("highways", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("bbox", postgresql.ARRAY(sa.Float()), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["network_id"], ["road_networks.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_road_network_stats_network_valid_from",
+        "road_network_stats",
+        ["network_id", "valid_from"],
+        unique=True,
+    )
+
+    # the statistics of every version of the networks that are already stored,
+    # a version begins whenever edges were added or retired
+    op.execute(
+        f"""
+        INSERT INTO road_network_stats
+            (network_id, valid_from, edge_count, length, lane_km, highways, bbox)
+        WITH versions AS (
+            SELECT network_id, valid_from AS version FROM road_edges
+            UNION
+            SELECT network_id, valid_to FROM road_edges WHERE valid_to IS NOT NULL
+        ),
+        edges AS (
+            SELECT v.network_id, v.version, e.geometry,
+                   {EDGE_LENGTH} AS length,
+                   {EDGE_LENGTH} * {EDGE_LANES} / 1000 AS lane_km,
+                   {EDGE_HIGHWAY} AS highway
+            FROM versions v
+            JOIN road_edges e
+              ON e.network_id = v.network_id
+             AND e.valid_from <= v.version
+             AND (e.valid_to IS NULL OR e.valid_to > v.version)
+        ),
+        totals AS (
+            SELECT network_id, version, count(*) AS edge_count,
+                   sum(length) AS length, sum(lane_km) AS lane_km,
+                   ST_Extent(geometry) AS extent
+            FROM edges
+            GROUP BY network_id, version
+        ),
+        classes AS (
+            SELECT network_id, version,
+                   jsonb_object_agg(highway, jsonb_build_object(
+                       'edge_count', edge_count,
+                       'length', length,
+                       'lane_km', lane_km
+                   )) AS highways
+            FROM (
+                SELECT network_id, version, highway, count(*) AS edge_count,
+                       sum(length) AS length, sum(lane_km) AS lane_km
+                FROM edges
+                WHERE highway IS NOT NULL
+                GROUP BY network_id, version, highway
+            ) AS by_highway
+            GROUP BY network_id, version
+        )
+        SELECT v.network_id, v.version,
+               COALESCE(t.edge_count, 0),
+               COALESCE(t.length, 0),
+               COALESCE(t.lane_km, 0),
+               COALESCE(c.highways, '{{}}'::jsonb),
+               CASE WHEN t.extent IS NOT NULL THEN ARRAY[
+                   ST_XMin(t.extent), ST_YMin(t.extent),
+                   ST_XMax(t.extent), ST_YMax(t.extent)
+               ] END
+        FROM versions v
+        LEFT JOIN totals t USING (network_id, version)
+        LEFT JOIN classes c USING (network_id, version)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_road_network_stats_network_valid_from", table_name="road_network_stats"
+    )
+    op.drop_table("road_network_stats")
@@ -0,0 +1,27 @@
+"""Add (network_id, id) index to road_edges for keyset pagination
+
+Revision ID: a91d4c6e2b75
+Revises: f3b7c2d91e48
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a91d4c6e2b75"
+down_revision: str | None = "f3b7c2d91e48"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_road_edges_network_id", "road_edges", ["network_id", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_road_edges_network_id", table_name="road_edges")
@@ -0,0 +1,127 @@
+"""Add road_nodes table and source/target nodes to road_edges
+
+Revision ID: b6c1f08e4d93
+Revises: d4e8b17a3c56
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import geoalchemy2
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b6c1f08e4d93"
+down_revision: str | None = "d4e8b17a3c56"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# app.core.topology.NODE_GRID
+NODE_GRID = 1e-7
+
+# the snapped first and last point of an edge, like app.core.topology does it
+SOURCE_POINT = (
+    f"ST_SnapToGrid(ST_Force2D(ST_PointN(ST_GeometryN(geometry, 1), 1)), {NODE_GRID})"
+)
+TARGET_POINT = (
+    "ST_SnapToGrid(ST_Force2D(ST_PointN("
+    f"ST_GeometryN(geometry, ST_NumGeometries(geometry)), -1)), {NODE_GRID})"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "road_nodes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "geometry",
+            geoalchemy2.types.Geometry(
+                geometry_type="POINT", srid=4326, spatial_index=False
+            ),
+            nullable=False,
+        ),
+        sa.Column("network_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["network_id"], ["road_networks.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_road_nodes_network_geometry",
+        "road_nodes",
+        ["network_id", "geometry"],
+        postgresql_using="gist",
+    )
+    op.add_column(
+        "road_edges", sa.Column("source_node_id", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "road_edges", sa.Column("target_node_id", sa.Integer(), nullable=True)
+    )
+
+    # the nodes of the edges that are already stored
+    op.execute(
+        f"""
+        INSERT INTO road_nodes (network_id, geometry)
+        SELECT DISTINCT network_id, point FROM (
+            SELECT network_id, {SOURCE_POINT} AS point FROM road_edges
+            WHERE GeometryType(geometry) IN ('LINESTRING', 'MULTILINESTRING')
+            UNION ALL
+            SELECT network_id, {TARGET_POINT} FROM road_edges
+            WHERE GeometryType(geometry) IN ('LINESTRING', 'MULTILINESTRING')
+        ) AS endpoints
+        WHERE point IS NOT NULL
+        """
+    )
+    for column, point in (
+        ("source_node_id", SOURCE_POINT),
+        ("target_node_id", TARGET_POINT),
+    ):
+        op.execute(
+            f"""
+            UPDATE road_edges SET {column} = road_nodes.id
+            FROM road_nodes
+            WHERE road_nodes.network_id = road_edges.network_id
+              AND road_nodes.geometry && {point}
+              AND ST_Equals(road_nodes.geometry, {point})
+              AND GeometryType(road_edges.geometry)
+                  IN ('LINESTRING', 'MULTILINESTRING')
+            """
+        )
+
+    op.create_foreign_key(
+        "road_edges_source_node_id_fkey",
+        "road_edges",
+        "road_nodes",
+        ["source_node_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "road_edges_target_node_id_fkey",
+        "road_edges",
+        "road_nodes",
+        ["target_node_id"],
+        ["id"],
+    )
+    op.create_index("ix_road_edges_source_node_id", "road_edges", ["source_node_id"])
+    op.create_index("ix_road_edges_target_node_id", "road_edges", ["target_node_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_road_edges_target_node_id", table_name="road_edges")
+    op.drop_index("ix_road_edges_source_node_id", table_name="road_edges")
+    op.drop_constraint(
+        "road_edges_target_node_id_fkey", "road_edges", type_="foreignkey"
+    )
+    op.drop_constraint(
+        "road_edges_source_node_id_fkey", "road_edges", type_="foreignkey"
+    )
+    op.drop_column("road_edges", "target_node_id")
+    op.drop_column("road_edges", "source_node_id")
+    op.drop_index("ix_road_nodes_network_geometry", table_name="road_nodes")
+    op.drop_table("road_nodes")
@@ -0,0 +1,101 @@
+"""Add validity interval to road_edges
+
+Revision ID: c72d5e9a1b04
+Revises: 8b41e0c2f6a3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c72d5e9a1b04"
+down_revision: str | None = "8b41e0c2f6a3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# the longest pause between the edges of one version, the versions of a
+# network were written by separate requests at least this far apart
+VERSION_GAP = "1 second"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    op.add_column(
+        "road_edges",
+        sa.Column("valid_from", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "road_edges",
+        sa.Column("valid_to", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    # Before the validity interval an update retired every current edge and
+    # wrote the new version, stamping each edge with the time it was built, so
+    # one version is a burst of timestamps microseconds apart. A version starts
+    # where the timestamps of a network jump by more than VERSION_GAP or where
+    # they pass from retired to current edges. Its edges are valid from its
+    # first timestamp until the first timestamp of the next version.
+    op.execute(
+        f"""
+        WITH stamps AS (
+            SELECT network_id, timestamp, bool_or(is_current) AS is_current
+            FROM road_edges
+            GROUP BY network_id, timestamp
+        ),
+        starts AS (
+            SELECT
+                network_id,
+                timestamp,
+                lag(timestamp) OVER w IS NULL
+                OR timestamp - lag(timestamp) OVER w > interval '{VERSION_GAP}'
+                OR is_current IS DISTINCT FROM lag(is_current) OVER w
+                    AS starts_version
+            FROM stamps
+            WINDOW w AS (PARTITION BY network_id ORDER BY timestamp)
+        ),
+        versions AS (
+            SELECT
+                network_id,
+                timestamp AS version_from,
+                lead(timestamp) OVER (
+                    PARTITION BY network_id ORDER BY timestamp
+                ) AS version_to
+            FROM starts
+            WHERE starts_version
+        )
+        UPDATE road_edges AS e
+        SET
+            valid_from = versions.version_from,
+            valid_to = CASE
+                WHEN e.is_current THEN NULL
+                ELSE COALESCE(versions.version_to, now())
+            END
+        FROM versions
+        WHERE versions.network_id = e.network_id
+          AND versions.version_from <= e.timestamp
+          AND (versions.version_to IS NULL OR e.timestamp < versions.version_to)
+        """
+    )
+
+    op.alter_column("road_edges", "valid_from", nullable=False)
+    op.create_index(
+        "ix_road_edges_network_validity",
+        "road_edges",
+        ["network_id", sa.text("tstzrange(valid_from, valid_to, '[)')")],
+        unique=False,
+        postgresql_using="gist",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_road_edges_network_validity", table_name="road_edges")
+    op.drop_column("road_edges", "valid_to")
+    op.drop_column("road_edges", "valid_from")
@@ -0,0 +1,33 @@
+"""Add valid_from and valid_to indexes to road_edges for change sets
+
+Revision ID: d4e8b17a3c56
+Revises: a91d4c6e2b75
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e8b17a3c56"
+down_revision: str | None = "a91d4c6e2b75"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_road_edges_network_valid_from", "road_edges", ["network_id", "valid_from"]
+    )
+    op.create_index(
+        "ix_road_edges_network_valid_to", "road_edges", ["network_id", "valid_to"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_road_edges_network_valid_to", table_name="road_edges")
+    op.drop_index("ix_road_edges_network_valid_from", table_name="road_edges")
@@ -0,0 +1,39 @@
+"""Add network_id + geometry GiST index to road_edges
+
+Revision ID: e5a81f3c9d27
+Revises: c72d5e9a1b04
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a81f3c9d27"
+down_revision: str | None = "c72d5e9a1b04"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.create_index(
+        "ix_road_edges_network_geometry",
+        "road_edges",
+        ["network_id", "geometry"],
+        postgresql_using="gist",
+    )
+    # superseded by the composite index, it was created by GeoAlchemy
+    op.execute("DROP INDEX IF EXISTS idx_road_edges_geometry")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_road_edges_geometry "
+        "ON road_edges USING gist (geometry)"
+    )
+    op.drop_index("ix_road_edges_network_geometry", table_name="road_edges")
@@ -0,0 +1,49 @@
+"""Add highway column and attribute filter indexes to road_edges
+
+Revision ID: f3b7c2d91e48
+Revises: e5a81f3c9d27
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b7c2d91e48"
+down_revision: str | None = "e5a81f3c9d27"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "road_edges",
+        sa.Column(
+            "highway",
+            sa.String(),
+            sa.Computed("extra_properties ->> 'highway'", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_road_edges_network_highway", "road_edges", ["network_id", "highway"]
+    )
+    op.create_index(
+        "ix_road_edges_extra_properties",
+        "road_edges",
+        ["extra_properties"],
+        postgresql_using="gin",
+        postgresql_ops={"extra_properties": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_road_edges_extra_properties", table_name="road_edges")
+    op.drop_index("ix_road_edges_network_highway", table_name="road_edges")
+    op.drop_column("road_edges", "highway")
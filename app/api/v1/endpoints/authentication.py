@@ -3,18 +3,19 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.services.authentication_service import (
     authenticate_user,
     create_access_token,
 )
+from app.core.config import settings
 from app.core.database import get_db
 from app.schemas import Token
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-ACCESS_TOKEN_EXPIRATION_TIME = 1440  # minutes
+ACCESS_TOKEN_EXPIRATION_TIME = settings.access_token_expire_minutes
 
 
 @router.post(
@@ -27,11 +28,14 @@ ACCESS_TOKEN_EXPIRATION_TIME = 1440  # minutes
         status.HTTP_422_UNPROCESSABLE_ENTITY: {
             "description": "Validation error (e.g., missing fields)"
         },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Too many logins in progress, retry later"
+        },
     },
 )
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Token:
     user = await authenticate_user(form_data.username, form_data.password, db)
 
@@ -44,6 +48,7 @@ async def login(
 
     access_token_expiration = timedelta(minutes=ACCESS_TOKEN_EXPIRATION_TIME)
     access_token = await create_access_token(
-        data={"sub": user.email}, expiration_delta=access_token_expiration
+        data={"sub": user.email, "uid": user.id, "role": user.role.value},
+        expiration_delta=access_token_expiration,
     )
     return Token(access_token=access_token, token_type="bearer")
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.services import jobs_service
+from app.api.v1.services.authentication_service import get_current_user
+from app.core.database import get_db
+from app.db.models import IngestJob, User
+from app.schemas import ReadIngestJob
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get(
+    "/{job_id}",
+    response_model=ReadIngestJob,
+    summary="Get the status of an ingest job",
+    description="""
+             Reports the progress of an upload or update job: its status, the current
+             phase, how many features were processed and, once it finished, the
+             resulting `network_id` or the error that made it fail.
+
+             - Requires authentication.
+             """,
+    responses={
+        status.HTTP_200_OK: {"description": "Job found"},
+        status.HTTP_404_NOT_FOUND: {"description": "Job not found"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> IngestJob:
+    return await jobs_service.get_job(db=db, current_user=current_user, job_id=job_id)
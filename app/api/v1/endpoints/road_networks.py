@@ -1,17 +1,49 @@
 from datetime import datetime
+from typing import Literal
 
-from fastapi import APIRouter, Depends, File, UploadFile, status
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.services import road_network_service
 from app.api.v1.services.authentication_service import get_current_user
+from app.core.cache import CachedResponse, etag_matches
+from app.core.compression import negotiate_encoding
+from app.core.config import settings
 from app.core.database import get_db
 from app.db.models import User
-from app.schemas import NetworkUpdateResponse
+from app.schemas import (
+    SNAP_MAX_POINTS,
+    EdgeFormat,
+    ReadNetworkStats,
+    SnapRequest,
+    SnapResponse,
+)
 
 router = APIRouter(prefix="/networks", tags=["Networks"])
 
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+# tiles are per user, so only the browser may keep them
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def encoding_headers(encoding: str | None) -> dict[str, str]:
+    """Headers of a response that was compressed as Accept-Encoding asked."""
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return headers
+
 
 @router.post(
     "/upload",
@@ -20,27 +52,33 @@ router = APIRouter(prefix="/networks", tags=["Networks"])
              Uploads a road network file, in geojson format.
 
              - Requires authentication.
+             - The file is ingested in the background, the response contains the id
+               of the ingest job, its progress can be followed at `/jobs/{id}`.
              - The file must be valid and properly formatted.
+             - The file may be compressed with gzip or zstd: name it `.geojson.gz` or
+               `.geojson.zst`, or send the part with a `Content-Encoding` or an
+               `application/gzip` or `application/zstd` content type.
              """,
-    status_code=status.HTTP_201_CREATED,
+    status_code=status.HTTP_202_ACCEPTED,
     responses={
-        status.HTTP_201_CREATED: {"description": "File uploaded successfully"},
-        status.HTTP_400_BAD_REQUEST: {
-            "description": "Invalid file format or upload error"
-        },
+        status.HTTP_202_ACCEPTED: {"description": "File accepted for ingestion"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid file format"},
         status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"description": "Unsupported coding"},
     },
 )
 async def upload_road_network(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> JSONResponse:
-    await road_network_service.upload_road_network(
+    accepted = await road_network_service.upload_road_network(
         db=db, file=file, current_user=current_user
     )
     return JSONResponse(
-        status_code=status.HTTP_201_CREATED, content={"message": "File Uploaded"}
+        status_code=status.HTTP_202_ACCEPTED,
+        content=accepted.model_dump(),
+        headers={"Location": accepted.status_url},
     )
 
 
@@ -50,25 +88,447 @@ async def upload_road_network(
     description="""
             Returns the edges of a specific road network by ID.
 
-            - Optionally filter by timestamp (to get the network state at a given time).
+            - Optionally pass a timestamp to get the network exactly as it was at that
+              time.
+            - Optionally pass `bbox=minx,miny,maxx,maxy` and/or `intersects` (a WKT or
+              GeoJSON polygon) to only get the edges that intersect that area, both
+              in EPSG:4326 and combinable with `timestamp`.
+            - Optionally pass a `filter` on the edge attributes, e.g.
+              `highway in (primary, secondary) and lanes >= 2`. Comparisons use `=`,
+              `!=`, `<`, `<=`, `>`, `>=`, `in (...)` or `is [not] null` and combine
+              with `and`, `or`, `not` and parentheses. Attributes other than
+              `name`, `ref`, `lanes`, `oneway`, `length`, `tunnel`, `highway`,
+              `source` and `target` are looked up in the original feature
+              properties, e.g. `source = 12 or target = 12` selects the edges at
+              node 12.
+            - Optionally pass `simplify=<tolerance>` (in degrees) to simplify the
+              geometries while preserving their topology, and `precision=<digits>` to
+              round the coordinates to that many decimals (at most 9 by default).
+            - Optionally pass `limit` to read the edges in pages ordered by id. A page
+              carries a `next` link (in the `Link` header and in the `links` of the
+              FeatureCollection) with an opaque `cursor`, follow it until there is none.
+              All pages show the network version of the first one, also while an
+              update is being ingested.
+            - The response is a GeoJSON FeatureCollection, every feature carries the
+              `id`, `timestamp` and `is_current` of the edge as properties, and the ids
+              of the `source` and `target` nodes at its ends, see `/{network_id}/nodes`.
+            - Pass `format` or an `Accept` header for another format, all of them are
+              streamed while they are read from the database:
+                - `ndjson` (`application/x-ndjson`): one GeoJSON feature per line.
+                - `parquet` (`application/vnd.apache.parquet`): GeoParquet with every
+                  edge column, the WKB geometry and one string column per key of the
+                  original feature properties.
+                - `fgb` (`application/flatgeobuf`): FlatGeobuf with every edge column
+                  and the original feature properties as JSON.
+            - Paged reads are GeoJSON only.
+            - GeoJSON and NDJSON responses are compressed with zstd, brotli or gzip,
+              as the `Accept-Encoding` header allows.
+            - Repeated requests are answered from a cache and carry a strong `ETag`,
+              send it back in `If-None-Match` to get a `304 Not Modified` while the
+              network did not change.
             - Requires authentication.
             """,
     responses={
         status.HTTP_200_OK: {"description": "Edges retrieved successfully"},
+        status.HTTP_304_NOT_MODIFIED: {"description": "Edges did not change"},
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Invalid bbox, polygon, filter, cursor or format"
+        },
         status.HTTP_404_NOT_FOUND: {"description": "Road network not found"},
         status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
     },
 )
 async def get_network(
+    request: Request,
     network_id: int,
     timestamp: datetime | None = None,
-    db: Session = Depends(get_db),
+    bbox: str | None = None,
+    intersects: str | None = None,
+    edge_filter: str | None = Query(None, alias="filter"),
+    limit: int | None = Query(None, ge=1, le=settings.edge_page_max_limit),
+    cursor: str | None = None,
+    simplify: float | None = Query(None, gt=0),
+    precision: int | None = Query(None, ge=0, le=15),
+    edge_format: EdgeFormat | None = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> JSONResponse:
+) -> Response:
+    timestamp = road_network_service.as_utc(timestamp)
+    edge_format = road_network_service.negotiate_edge_format(
+        edge_format, request.headers.get("Accept")
+    )
+    if edge_format in (EdgeFormat.PARQUET, EdgeFormat.FLATGEOBUF):
+        export = await road_network_service.export_network(
+            db=db,
+            current_user=current_user,
+            request=request,
+            network_id=network_id,
+            edge_format=edge_format,
+            timestamp=timestamp,
+            bbox=bbox,
+            intersects=intersects,
+            edge_filter=edge_filter,
+            simplify=simplify,
+            precision=precision,
+        )
+        filename = f"network_{network_id}.{edge_format.value}"
+        return StreamingResponse(
+            export,
+            status_code=status.HTTP_200_OK,
+            media_type=road_network_service.EDGE_FORMAT_MEDIA_TYPES[edge_format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+    if limit is not None or cursor is not None:
+        if edge_format != EdgeFormat.GEOJSON:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Paged reads are only available as GeoJSON",
+            )
+        page = await road_network_service.get_network_page(
+            db=db,
+            current_user=current_user,
+            request=request,
+            network_id=network_id,
+            limit=limit,
+            cursor=cursor,
+            timestamp=timestamp,
+            bbox=bbox,
+            intersects=intersects,
+            edge_filter=edge_filter,
+            simplify=simplify,
+            precision=precision,
+            encoding=encoding,
+        )
+        headers = encoding_headers(page.encoding)
+        if page.next_url:
+            headers["Link"] = f'<{page.next_url}>; rel="next"'
+        return Response(
+            status_code=status.HTTP_200_OK,
+            content=page.body,
+            media_type="application/json",
+            headers=headers,
+        )
+
     network = await road_network_service.get_network(
-        db=db, current_user=current_user, network_id=network_id, timestamp=timestamp
+        db=db,
+        current_user=current_user,
+        request=request,
+        network_id=network_id,
+        timestamp=timestamp,
+        bbox=bbox,
+        intersects=intersects,
+        edge_filter=edge_filter,
+        simplify=simplify,
+        precision=precision,
+        ndjson=edge_format == EdgeFormat.NDJSON,
+        encoding=encoding,
+    )
+    if not isinstance(network, CachedResponse):
+        return StreamingResponse(
+            network,
+            status_code=status.HTTP_200_OK,
+            media_type=road_network_service.EDGE_FORMAT_MEDIA_TYPES[edge_format],
+            headers=encoding_headers(encoding),
+        )
+
+    headers = {
+        **encoding_headers(network.encoding),
+        "ETag": network.etag,
+        "Cache-Control": (
+            IMMUTABLE_CACHE_CONTROL if network.immutable else REVALIDATE_CACHE_CONTROL
+        ),
+    }
+    if etag_matches(request.headers.get("If-None-Match"), network.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        status_code=status.HTTP_200_OK,
+        content=network.body,
+        media_type=network.media_type,
+        headers=headers,
+    )
+
+
+@router.get(
+    "/{network_id}/changes",
+    summary="Retrieve the changes of a road network",
+    description="""
+            Returns the edges that were added to or retired from a road network between
+            the network versions at `since` and `until`.
+
+            - Every feature carries a `change` property, `added` or `retired`, next to
+              the `id`, `timestamp` and `is_current` of the edge.
+            - `until` defaults to the latest version that is no longer changing, the
+              `X-Changes-Until` header holds the value used. Pass it as `since` of the
+              next request to follow a network without missing or repeating changes.
+            - The response is a GeoJSON FeatureCollection, or newline delimited GeoJSON
+              features with `format=ndjson`, streamed while it is read.
+            - Requires authentication.
+            """,
+    responses={
+        status.HTTP_200_OK: {"description": "Changes retrieved successfully"},
+        status.HTTP_400_BAD_REQUEST: {"description": "until is before since"},
+        status.HTTP_404_NOT_FOUND: {"description": "Road network not found"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def get_network_changes(
+    request: Request,
+    network_id: int,
+    since: datetime,
+    until: datetime | None = None,
+    changes_format: Literal["geojson", "ndjson"] = Query("geojson", alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    ndjson = changes_format == "ndjson"
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+    changes, until = await road_network_service.get_network_changes(
+        db=db,
+        current_user=current_user,
+        request=request,
+        network_id=network_id,
+        since=since,
+        until=until,
+        ndjson=ndjson,
+        encoding=encoding,
+    )
+    return StreamingResponse(
+        changes,
+        status_code=status.HTTP_200_OK,
+        media_type="application/x-ndjson" if ndjson else "application/json",
+        headers={**encoding_headers(encoding), "X-Changes-Until": until.isoformat()},
+    )
+
+
+@router.get(
+    "/{network_id}/nodes",
+    summary="Retrieve the nodes of a road network",
+    description="""
+            Returns the nodes of a road network: the points where edges start or end,
+            shared by all edges that meet there.
+
+            - Every feature carries the `id` of the node and its `degree`, the number
+              of edge ends at the node in the requested network version. Edges refer
+              to their nodes with their `source` and `target` properties.
+            - Optionally pass a timestamp to get the nodes of the network as it was at
+              that time, and `bbox=minx,miny,maxx,maxy` (EPSG:4326) to only get the
+              nodes in that area.
+            - Optionally pass `min_degree` and/or `max_degree`, e.g. `max_degree=1`
+              for dead ends or `min_degree=3` for junctions.
+            - The response is a GeoJSON FeatureCollection, streamed while it is read.
+            - Requires authentication.
+            """,
+    responses={
+        status.HTTP_200_OK: {"description": "Nodes retrieved successfully"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid bbox"},
+        status.HTTP_404_NOT_FOUND: {"description": "Road network not found"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def get_network_nodes(
+    request: Request,
+    network_id: int,
+    timestamp: datetime | None = None,
+    bbox: str | None = None,
+    min_degree: int | None = Query(None, ge=0),
+    max_degree: int | None = Query(None, ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+    nodes = await road_network_service.get_network_nodes(
+        db=db,
+        current_user=current_user,
+        request=request,
+        network_id=network_id,
+        timestamp=road_network_service.as_utc(timestamp),
+        bbox=bbox,
+        min_degree=min_degree,
+        max_degree=max_degree,
+        encoding=encoding,
+    )
+    return StreamingResponse(
+        nodes,
+        status_code=status.HTTP_200_OK,
+        media_type="application/json",
+        headers=encoding_headers(encoding),
+    )
+
+
+@router.get(
+    "/{network_id}/route",
+    summary="Find the shortest route in a road network",
+    description="""
+            Returns the shortest route between two points of a road network, from the
+            node closest to `from` to the node closest to `to` (both `lon,lat` in
+            EPSG:4326).
+
+            - Edges are weighted by their `length` (their length in metres if they have
+              none), `oneway` edges are only followed from their `source` to their
+              `target` node.
+            - Optionally pass a timestamp to route the network as it was at that time.
+            - The response is a GeoJSON FeatureCollection of the edges of the route in
+              travel order, its `route` member holds the total `length` and the
+              `source` and `target` nodes.
+            - The graph of a network version is built on the first request and kept in
+              memory for the following ones.
+            - Requires authentication.
+            """,
+    responses={
+        status.HTTP_200_OK: {"description": "Route found"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid from or to point"},
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Road network not found or no route between the points"
+        },
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def get_network_route(
+    network_id: int,
+    origin: str = Query(..., alias="from"),
+    destination: str = Query(..., alias="to"),
+    timestamp: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    timestamp = road_network_service.as_utc(timestamp)
+    route = await road_network_service.get_network_route(
+        db=db,
+        current_user=current_user,
+        network_id=network_id,
+        origin=origin,
+        destination=destination,
+        timestamp=timestamp,
+    )
+    return Response(
+        status_code=status.HTTP_200_OK, content=route, media_type="application/json"
+    )
+
+
+@router.post(
+    "/{network_id}/snap",
+    summary="Snap points to the nearest edges of a road network",
+    description=f"""
+            Matches a batch of points, e.g. a GPS trace, to a road network: for every
+            point the nearest edge, the distance to it in metres and the closest point
+            on the edge.
+
+            - `points` is a list of up to {SNAP_MAX_POINTS} `[lon, lat]` pairs in
+              EPSG:4326.
+            - Optionally pass a `timestamp` to snap to the network as it was at that
+              time, and `max_distance` (metres) to leave points farther away from every
+              edge unmatched.
+            - `matches` holds one entry per point in the order of the points, `null` for
+              points that were not matched.
+            - Requires authentication.
+            """,
+    responses={
+        status.HTTP_200_OK: {"model": SnapResponse, "description": "Points snapped"},
+        status.HTTP_404_NOT_FOUND: {"description": "Road network not found"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def snap_to_network(
+    network_id: int,
+    snap: SnapRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> JSONResponse:
+    # without a response model, validating 100k matches once more is slow
+    matches = await road_network_service.snap_to_network(
+        db=db, current_user=current_user, network_id=network_id, snap=snap
+    )
+    return JSONResponse(status_code=status.HTTP_200_OK, content=matches)
+
+
+@router.get(
+    "/{network_id}/stats",
+    response_model=ReadNetworkStats,
+    summary="Retrieve the statistics of a road network",
+    description="""
+            Returns the number of edges, their total `length` in metres, lane
+            kilometres (`lane_km`, edges without `lanes` count as one lane), the same
+            per `highway` class and the bounding box of a road network.
+
+            - Optionally pass a timestamp to get the statistics of the network as it
+              was at that time, `valid_from` is the time that version was uploaded.
+            - The statistics are updated with every upload and update, reading them
+              does not depend on the size of the network.
+            - Requires authentication.
+            """,
+    responses={
+        status.HTTP_200_OK: {"description": "Statistics retrieved successfully"},
+        status.HTTP_404_NOT_FOUND: {"description": "Road network not found"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def get_network_stats(
+    network_id: int,
+    timestamp: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ReadNetworkStats:
+    stats = await road_network_service.get_network_stats(
+        db=db,
+        current_user=current_user,
+        network_id=network_id,
+        timestamp=road_network_service.as_utc(timestamp),
+    )
+    return ReadNetworkStats(**stats)
+
+
+@router.get(
+    "/{network_id}/tiles/{z}/{x}/{y}.mvt",
+    summary="Retrieve a vector tile of a road network",
+    description="""
+            Returns the Mapbox Vector Tile z/x/y (web mercator tiling scheme) of a road
+            network, with a single `edges` layer.
+
+            - Optionally pass a timestamp to get the tile of the network as it was at
+              that time.
+            - Features carry the edge id, the properties they carry depend on the zoom
+              level (see the `TILE_PROPERTIES` setting).
+            - Tiles of historical versions never change and may be cached for good.
+            - Requires authentication.
+            """,
+    response_class=Response,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {MVT_MEDIA_TYPE: {}},
+            "description": "Tile retrieved successfully",
+        },
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid tile coordinates"},
+        status.HTTP_404_NOT_FOUND: {"description": "Road network not found"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def get_network_tile(
+    network_id: int,
+    z: int,
+    x: int,
+    y: int,
+    timestamp: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    tile, immutable = await road_network_service.get_network_tile(
+        db=db,
+        current_user=current_user,
+        network_id=network_id,
+        z=z,
+        x=x,
+        y=y,
+        timestamp=road_network_service.as_utc(timestamp),
+    )
+    cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    return Response(
+        status_code=status.HTTP_200_OK,
+        content=tile,
+        media_type=MVT_MEDIA_TYPE,
+        headers={"Cache-Control": cache_control},
     )
-    return JSONResponse(status_code=status.HTTP_200_OK, content=network)
 
 
 @router.post(
@@ -78,22 +538,34 @@ async def get_network(
              Updates the given road network using a new uploaded file.
 
              - Requires authentication.
+             - The file is ingested in the background, the response contains the id
+               of the ingest job, its progress can be followed at `/jobs/{id}`.
+             - Only edges that changed are touched: the finished job reports how many
+               edges were `added`, `removed` and `unchanged` in its `result`.
              - The file content must be valid.
+             - The file may be compressed with gzip or zstd: name it `.geojson.gz` or
+               `.geojson.zst`, or send the part with a `Content-Encoding` or an
+               `application/gzip` or `application/zstd` content type.
              """,
+    status_code=status.HTTP_202_ACCEPTED,
     responses={
-        status.HTTP_200_OK: {"description": "Network updated successfully"},
-        status.HTTP_400_BAD_REQUEST: {"description": "Invalid file or update failed"},
+        status.HTTP_202_ACCEPTED: {"description": "File accepted for ingestion"},
         status.HTTP_404_NOT_FOUND: {"description": "Road network not found"},
         status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"description": "Unsupported coding"},
     },
 )
 async def update_network_from_file(
     network_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     file: UploadFile = File(...),
-) -> NetworkUpdateResponse:
-    result = await road_network_service.update_network_from_file(
+) -> JSONResponse:
+    accepted = await road_network_service.update_network_from_file(
         db=db, current_user=current_user, network_id=network_id, file=file
     )
-    return NetworkUpdateResponse(message=result.message, network_id=result.network_id)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=accepted.model_dump(),
+        headers={"Location": accepted.status_url},
+    )
@@ -1,7 +1,7 @@
 from typing import List
 
 from fastapi import APIRouter, Body, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import JSONResponse
 
 from app.api.v1.services import users_service
@@ -18,7 +18,12 @@ router = APIRouter(prefix="/users", tags=["users"])
     response_model=ReadUser,
     summary="Create a new user",
     description="Creates a user with the provided details.",
-    responses={status.HTTP_201_CREATED: {"description": "User successfully created"}},
+    responses={
+        status.HTTP_201_CREATED: {"description": "User successfully created"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Too many password operations in progress, retry later"
+        },
+    },
 )
 async def create_user(
     request: CreateUser = Body(
@@ -30,7 +35,7 @@ async def create_user(
             role=UserRolesOptions.USER,
         ),
     ),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> User:
     created_user = await users_service.create_user(request=request, db=db)
     return created_user
@@ -57,7 +62,7 @@ async def create_user(
 )
 async def get_user(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> User:
     user = await users_service.get_user_by_id(
@@ -71,7 +76,9 @@ async def get_user(
     response_model=list[ReadRoadNetwork],
     summary="Get road networks for user",
     description="""
-             This endpoint will retrieve all the road networks that are associated to a user.
+             This endpoint will retrieve all the road networks that are associated
+             to a user, with the statistics of their current version (see
+             `GET /networks/{id}/stats`).
 
              - Requires authentication.
              """,
@@ -82,7 +89,7 @@ async def get_user(
 )
 async def get_road_networks_for_user(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> List[ReadRoadNetwork]:
     networks = await users_service.get_road_networks_for_user(
@@ -106,7 +113,7 @@ async def get_road_networks_for_user(
 )
 async def delete_user_endpoint(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> MessageResponse:
     result = await users_service.delete_user(
@@ -0,0 +1,337 @@
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import UTC, datetime
+from itertools import repeat
+from typing import Any
+
+import numpy as np
+import shapely
+from numpy.typing import NDArray
+from sqlalchemy import delete, func, insert, select, true, update
+from sqlalchemy.orm import Session
+
+from app.core.edge_batch import EdgeBatch, build_edge_batch
+from app.core.geojson import GeoJSONFeatureStream
+from app.core.network_stats import NetworkStats, measure_edges
+from app.core.topology import edge_endpoints, grid_keys, node_wkb
+from app.db.copy_writer import copy_road_edges, copy_road_nodes
+from app.db.edge_queries import edge_version_filter
+from app.db.models import RoadEdge, RoadNetwork, RoadNetworkStats, RoadNode
+from app.db.stats_queries import select_current_extent, select_network_stats
+
+INGEST_BATCH_SIZE = 1000  # features handed to the database per flush
+RETIRE_BATCH_SIZE = 10000  # edge ids per retiring UPDATE
+ARCHIVE_BATCH_SIZE = 10000  # retired edges moved to the history partition at once
+
+# called with the number of features written so far after every batch
+ProgressCallback = Callable[[int], None]
+
+
+def _no_progress(features_processed: int) -> None:
+    pass
+
+
+class NodeIndex:
+    """
+    The nodes of a network by grid key, see app/core/topology.py. The
+    endpoints of a batch of edges are resolved at once, by binary search over
+    the sorted keys, and the nodes that do not exist yet are written with COPY.
+    """
+
+    def __init__(self, network_id: int) -> None:
+        self.network_id = network_id
+        self._keys: NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        self._ids: NDArray[np.int64] = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def load(cls, db: Session, network_id: int) -> "NodeIndex":
+        """The index of the nodes a network already has."""
+        index = cls(network_id)
+        rows = db.execute(
+            select(
+                RoadNode.id, func.ST_X(RoadNode.geometry), func.ST_Y(RoadNode.geometry)
+            ).where(RoadNode.network_id == network_id)
+        ).all()
+        if rows:
+            nodes = np.array(rows, dtype=np.float64)
+            index._add(grid_keys(nodes[:, 1:]), nodes[:, 0].astype(np.int64))
+        return index
+
+    def _add(self, keys: NDArray[np.int64], ids: NDArray[np.int64]) -> None:
+        keys = np.concatenate([self._keys, keys])
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._ids = np.concatenate([self._ids, ids])[order]
+
+    def _lookup(self, keys: NDArray[np.int64]) -> tuple[NDArray[Any], NDArray[Any]]:
+        positions = np.searchsorted(self._keys, keys)
+        found = positions < len(self._keys)
+        found[found] = self._keys[positions[found]] == keys[found]
+        return positions, found
+
+    def resolve(
+        self, db: Session, edges: EdgeBatch, indices: list[int] | None = None
+    ) -> tuple[list[int | None], list[int | None]]:
+        """
+        The source and target node ids of every edge of a batch, or of the
+        edges at ``indices``, creating the nodes that are missing. Other edges
+        and edges without nodes get None.
+        """
+        sources, targets, linear = edge_endpoints(edges.geometries)
+        if indices is not None:
+            selected = np.zeros(len(edges), dtype=bool)
+            selected[indices] = True
+            linear &= selected
+        keys = np.concatenate([sources[linear], targets[linear]])
+
+        unique = np.unique(keys)
+        new_keys = unique[~self._lookup(unique)[1]]
+        if len(new_keys):
+            new_ids = np.array(
+                db.scalars(
+                    select(func.nextval("road_nodes_id_seq")).select_from(
+                        func.generate_series(1, len(new_keys))
+                    )
+                ).all(),
+                dtype=np.int64,
+            )
+            copy_road_nodes(
+                db,
+                zip(new_ids.tolist(), repeat(self.network_id), node_wkb(new_keys)),
+            )
+            self._add(new_keys, new_ids)
+
+        ids = self._ids[self._lookup(keys)[0]].tolist()
+        count = int(linear.sum())
+        source_ids: list[int | None] = [None] * len(edges)
+        target_ids: list[int | None] = [None] * len(edges)
+        for i, source_id, target_id in zip(
+            np.flatnonzero(linear).tolist(), ids[:count], ids[count:], strict=True
+        ):
+            source_ids[i] = source_id
+            target_ids[i] = target_id
+        return source_ids, target_ids
+
+
+def batch_stats(edges: EdgeBatch, indices: list[int] | None = None) -> NetworkStats:
+    """The statistics of the edges of a batch, or of the edges at ``indices``."""
+    selected = list(range(len(edges))) if indices is None else indices
+    return measure_edges(
+        edges.geometries[selected],
+        [edges.length[i] for i in selected],
+        [edges.lanes[i] for i in selected],
+        [edges.extra_properties[i].get("highway") for i in selected],
+    )
+
+
+def load_current_stats(db: Session, network_id: int) -> NetworkStats:
+    """The statistics of the current version of a network."""
+    row = db.scalar(select_network_stats(network_id))
+    if row is None:
+        return NetworkStats()
+    return NetworkStats.from_row(row)
+
+
+def load_current_fingerprints(db: Session, network_id: int) -> dict[str, list[int]]:
+    """Maps the fingerprints of the current edges of a network to their ids."""
+    current: dict[str, list[int]] = defaultdict(list)
+    rows = db.execute(
+        select(RoadEdge.id, RoadEdge.fingerprint)
+        .where(edge_version_filter(network_id, None))
+        .execution_options(yield_per=RETIRE_BATCH_SIZE)
+    )
+    for edge_id, fingerprint in rows:
+        # edges stored before fingerprinting never match and get replaced once
+        current[fingerprint or ""].append(edge_id)
+    return current
+
+
+def retire_edges(
+    db: Session, edge_ids: list[int], retired_at: datetime
+) -> NetworkStats:
+    """
+    Marks the given edges as not current and closes their validity interval.
+    Returns the statistics of the retired edges, measured from the rows the
+    UPDATE returns rather than by reading them again.
+    """
+    removed = NetworkStats()
+    for start in range(0, len(edge_ids), RETIRE_BATCH_SIZE):
+        rows = db.execute(
+            update(RoadEdge)
+            .where(
+                RoadEdge.archived == False,
+                RoadEdge.id.in_(edge_ids[start : start + RETIRE_BATCH_SIZE]),
+            )
+            .values(is_current=False, valid_to=retired_at)
+            .returning(
+                func.ST_AsBinary(RoadEdge.geometry),
+                RoadEdge.length,
+                RoadEdge.lanes,
+                RoadEdge.extra_properties["highway"],
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        if rows:
+            geometries, lengths, lanes, highways = zip(*rows)
+            removed = removed + measure_edges(
+                shapely.from_wkb([bytes(value) for value in geometries]),
+                lengths,
+                lanes,
+                highways,
+            )
+    return removed
+
+
+def archive_retired_edges(db: Session, network_id: int) -> int:
+    """
+    Moves up to ARCHIVE_BATCH_SIZE retired edges of a network from the live
+    to the history partition and returns how many were moved, found on the
+    (network_id, valid_to) index. They are deleted and inserted again in one
+    statement, ordered by network and version so that the history partition
+    keeps the edges of a version together. Ids and validity intervals stay the
+    same, reads at any timestamp see the same edges before and after. Nothing
+    is committed, the caller owns the transaction.
+    """
+    columns = [
+        column
+        for column in RoadEdge.__table__.columns
+        if column.computed is None and column.name != "archived"
+    ]
+    retired = select(RoadEdge.id).where(
+        RoadEdge.network_id == network_id,
+        RoadEdge.valid_to.is_not(None),
+        RoadEdge.archived == False,
+    )
+
+    moved = (
+        delete(RoadEdge)
+        .where(
+            RoadEdge.archived == False,
+            RoadEdge.id.in_(retired.limit(ARCHIVE_BATCH_SIZE).scalar_subquery()),
+        )
+        .returning(*columns)
+        .cte("moved")
+    )
+    archived = select(*(moved.c[column.name] for column in columns), true()).order_by(
+        moved.c.network_id, moved.c.valid_from, moved.c.id
+    )
+    return db.execute(
+        insert(RoadEdge)
+        .from_select([column.name for column in columns] + ["archived"], archived)
+        .add_cte(moved)
+    ).rowcount
+
+
+def ingest_new_network(
+    db: Session,
+    stream: GeoJSONFeatureStream,
+    user_id: int,
+    on_progress: ProgressCallback = _no_progress,
+) -> RoadNetwork:
+    """
+    Creates a road network and streams the features of ``stream`` into it.
+    Nothing is committed, the caller owns the transaction.
+    """
+    timestamp = datetime.now(UTC)
+    network = RoadNetwork(name="Unnamed Network", timestamp=timestamp, user_id=user_id)
+    db.add(network)
+    db.flush()
+
+    nodes = NodeIndex(network.id)
+    stats = NetworkStats()
+    processed = 0
+    for batch in stream.batches(INGEST_BATCH_SIZE):
+        edges = build_edge_batch(batch)
+        node_ids = nodes.resolve(db, edges)
+        copy_road_edges(db, edges.rows(network.id, user_id, timestamp, None, node_ids))
+        stats = stats + batch_stats(edges)
+        processed += len(edges)
+        on_progress(processed)
+
+    db.add(
+        RoadNetworkStats(network_id=network.id, valid_from=timestamp, **stats.as_dict())
+    )
+
+    # top-level members may follow the features array, so they are only
+    # known once the whole document was streamed
+    network.name = stream.header.get("name") or "Unnamed Network"
+    network.timestamp = stream.header.get("timestamp", network.timestamp)
+    db.flush()
+    return network
+
+
+def ingest_network_update(
+    db: Session,
+    stream: GeoJSONFeatureStream,
+    network_id: int,
+    user_id: int,
+    on_progress: ProgressCallback = _no_progress,
+) -> dict[str, Any]:
+    """
+    Diffs the features of ``stream`` against the current version of a network
+    by fingerprint: only edges that are new or changed are inserted and only
+    edges that were removed or changed are retired. Nothing is committed, the
+    caller owns the transaction.
+
+    The statistics of the new version are those of the current one plus the
+    inserted and minus the retired edges.
+
+    Updates of one network run one after the other: the network row is
+    locked until the transaction ends, so a second update diffs against the
+    version the first one wrote.
+    """
+    db.execute(
+        select(RoadNetwork.id).where(RoadNetwork.id == network_id).with_for_update()
+    )
+    timestamp = datetime.now(UTC)
+    current = load_current_fingerprints(db, network_id)
+    nodes = NodeIndex.load(db, network_id)
+    previous = load_current_stats(db, network_id)
+    added_stats = NetworkStats()
+
+    processed = added = unchanged = 0
+    for batch in stream.batches(INGEST_BATCH_SIZE):
+        edges = build_edge_batch(batch)
+
+        new_edges = []
+        for i, fingerprint in enumerate(edges.fingerprint):
+            matches = current.get(fingerprint)
+            if matches:
+                matches.pop()
+                unchanged += 1
+            else:
+                new_edges.append(i)
+
+        # unchanged edges keep their nodes
+        node_ids = nodes.resolve(db, edges, new_edges)
+        copy_road_edges(
+            db,
+            edges.rows(network_id, user_id, timestamp, new_edges, node_ids),
+        )
+        if new_edges:
+            added_stats = added_stats + batch_stats(edges, new_edges)
+        added += len(new_edges)
+        processed += len(edges)
+        on_progress(processed)
+
+    # an upload without features leaves the network untouched
+    removed_ids = [edge_id for ids in current.values() for edge_id in ids]
+    if processed:
+        removed_stats = retire_edges(db, removed_ids, timestamp)
+    else:
+        removed_ids = []
+        removed_stats = NetworkStats()
+
+    if added or removed_ids:
+        combined = previous + added_stats
+        stats = combined - removed_stats
+        if stats.edge_count and combined.shrinks_bbox(removed_stats):
+            minx, miny, maxx, maxy = db.execute(select_current_extent(network_id)).one()
+            stats.bbox = None if minx is None else (minx, miny, maxx, maxy)
+        db.add(
+            RoadNetworkStats(
+                network_id=network_id, valid_from=timestamp, **stats.as_dict()
+            )
+        )
+
+    return {"added": added, "removed": len(removed_ids), "unchanged": unchanged}
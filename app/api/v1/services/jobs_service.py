@@ -0,0 +1,276 @@
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import Future
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.services.ingest_service import (
+    archive_retired_edges,
+    ingest_network_update,
+    ingest_new_network,
+)
+from app.core import workers
+from app.core.cache import response_cache
+from app.core.compression import UPLOAD_SUFFIXES, open_upload, upload_encoding
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.geojson import GeoJSONFeatureStream
+from app.db.models import (
+    IngestJob,
+    IngestJobKind,
+    IngestJobStatus,
+    RoadNetwork,
+    User,
+    UserRolesOptions,
+)
+from app.schemas import JobAcceptedResponse
+
+logger = logging.getLogger(__name__)
+
+
+# HELPERS
+def _store_upload(file: UploadFile, encoding: str | None) -> str:
+    """
+    Copies the spooled upload into the job storage directory. Compressed
+    uploads stay compressed, the suffix of the stored file names the coding.
+    """
+    os.makedirs(settings.job_storage_dir, exist_ok=True)
+    if encoding is not None:
+        extension = UPLOAD_SUFFIXES[encoding]
+    else:
+        _, extension = os.path.splitext(file.filename or "")
+    path = os.path.join(settings.job_storage_dir, f"{uuid.uuid4().hex}{extension}")
+
+    file.file.seek(0)
+    with open(path, "wb") as target:
+        shutil.copyfileobj(file.file, target)
+    return path
+
+
+def _set_job_state(job_id: int, **values: Any) -> None:
+    """
+    Updates a job row in its own short transaction, so progress is visible
+    while the ingest transaction is still open.
+    """
+    with SessionLocal() as db:
+        db.execute(update(IngestJob).where(IngestJob.id == job_id).values(**values))
+        db.commit()
+
+
+def _claim_job(job_id: int) -> IngestJob | None:
+    """Atomically moves a pending job to RUNNING, None if someone else has it."""
+    with SessionLocal() as db:
+        job = db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job_id, IngestJob.status == IngestJobStatus.PENDING)
+            .values(status=IngestJobStatus.RUNNING, phase="ingesting")
+            .returning(IngestJob)
+        ).scalar_one_or_none()
+        if job is not None:
+            # detach before committing so the loaded attributes stay usable
+            db.expunge(job)
+        db.commit()
+        return job
+
+
+def run_ingest_job(job_id: int) -> bool:
+    """
+    Worker process entry point: streams the stored file of a job into the
+    database and records the outcome on the job row. Returns whether the job
+    ran and succeeded.
+    """
+    job = _claim_job(job_id)
+    if job is None:
+        return False
+
+    def on_progress(features_processed: int) -> None:
+        _set_job_state(job_id, features_processed=features_processed)
+
+    db = SessionLocal()
+    try:
+        with open_upload(job.file_path) as f:
+            stream = GeoJSONFeatureStream(f)
+
+            if job.kind == IngestJobKind.UPLOAD:
+                network = ingest_new_network(db, stream, job.user_id, on_progress)
+                network_id = network.id
+                result: dict[str, Any] = {}
+            else:
+                assert job.network_id is not None
+                network_id = job.network_id
+                result = ingest_network_update(
+                    db, stream, network_id, job.user_id, on_progress
+                )
+
+        _set_job_state(job_id, phase="committing")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("Ingest job %s failed: %s", job_id, e)
+        _set_job_state(
+            job_id, status=IngestJobStatus.FAILED, phase="failed", error=str(e)
+        )
+        return False
+    finally:
+        db.close()
+
+    _set_job_state(
+        job_id,
+        status=IngestJobStatus.SUCCEEDED,
+        phase="done",
+        network_id=network_id,
+        result=result,
+    )
+    try:
+        os.remove(job.file_path)
+    except OSError:
+        logger.warning("Could not remove the stored file of job %s", job_id)
+    return True
+
+
+def run_archive_job(network_id: int | None = None) -> int:
+    """
+    Worker process entry point: moves the retired edges of a network, of all
+    networks if None, to the history partition, a transaction per batch so
+    that neither readers nor ingest jobs wait for the whole move. Returns the
+    number of edges moved.
+    """
+    archived = 0
+    with SessionLocal() as db:
+        network_ids = (
+            [network_id]
+            if network_id is not None
+            else list(db.scalars(select(RoadNetwork.id).order_by(RoadNetwork.id)))
+        )
+        for archiving_id in network_ids:
+            while True:
+                moved = archive_retired_edges(db, archiving_id)
+                db.commit()
+                if not moved:
+                    break
+                archived += moved
+    if archived:
+        logger.info("Archived %s retired edges", archived)
+    return archived
+
+
+def submit_job(job_id: int, network_id: int | None) -> None:
+    """
+    Hands a job to the worker pool. Once it finished, cached responses of its
+    network are dropped, they may show the version the job replaced, and if it
+    succeeded the edges the update retired are archived.
+    """
+    future = workers.submit(run_ingest_job, job_id)
+    if network_id is not None:
+
+        def on_done(done: Future[bool]) -> None:
+            response_cache.invalidate_network(network_id)
+            if not done.cancelled() and done.exception() is None and done.result():
+                workers.submit(run_archive_job, network_id)
+
+        future.add_done_callback(on_done)
+
+
+def resume_unfinished_jobs() -> int:
+    """
+    Requeues the jobs an earlier API process left behind. Jobs that were
+    running but have not reported progress for a while lost their worker, their
+    transaction was rolled back, so they are restarted from the beginning.
+    """
+    stale_before = datetime.now(UTC) - timedelta(
+        seconds=settings.job_stale_after_seconds
+    )
+    with SessionLocal() as db:
+        db.execute(
+            update(IngestJob)
+            .where(
+                IngestJob.status == IngestJobStatus.RUNNING,
+                IngestJob.updated_at < stale_before,
+            )
+            .values(
+                status=IngestJobStatus.PENDING, phase="queued", features_processed=0
+            )
+        )
+        db.commit()
+        jobs = (
+            db.query(IngestJob.id, IngestJob.network_id)
+            .filter(IngestJob.status == IngestJobStatus.PENDING)
+            .order_by(IngestJob.id)
+            .all()
+        )
+
+    for job_id, network_id in jobs:
+        submit_job(job_id, network_id)
+    return len(jobs)
+
+
+# ENDPOINT HANDLERS
+async def enqueue_ingest_job(
+    db: AsyncSession,
+    current_user: User,
+    file: UploadFile,
+    kind: IngestJobKind,
+    network_id: int | None = None,
+) -> JobAcceptedResponse:
+    try:
+        encoding = upload_encoding(
+            file.filename, file.headers.get("Content-Encoding"), file.content_type
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e)
+        )
+
+    try:
+        file_path = await run_in_threadpool(_store_upload, file, encoding)
+
+        job = IngestJob(
+            kind=kind,
+            status=IngestJobStatus.PENDING,
+            filename=file.filename or "",
+            file_path=file_path,
+            network_id=network_id,
+            user_id=current_user.id,
+        )
+        db.add(job)
+        await db.commit()
+
+    except (OSError, SQLAlchemyError):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not queue the ingest job",
+        )
+
+    submit_job(job.id, network_id)
+    return JobAcceptedResponse(
+        message="Ingest job accepted", job_id=job.id, status_url=f"/jobs/{job.id}"
+    )
+
+
+async def get_job(db: AsyncSession, current_user: User, job_id: int) -> IngestJob:
+    try:
+        query = select(IngestJob).filter_by(id=job_id)
+        if current_user.role != UserRolesOptions.ADMIN:
+            query = query.filter_by(user_id=current_user.id)
+        job = await db.scalar(query)
+
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+            )
+        return job
+
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
+        )
@@ -1,230 +1,773 @@
-import json
-from datetime import UTC, datetime
-from typing import Union, List, Dict, Any
-
-from fastapi import File, HTTPException, UploadFile, status
-from geoalchemy2.shape import from_shape, to_shape
-from shapely.geometry import shape
-from shapely.geometry.geo import mapping
-from sqlalchemy import and_
+import asyncio
+import dataclasses
+import logging
+from collections.abc import AsyncIterator, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any, overload
+
+import numpy as np
+from fastapi import File, HTTPException, Request, UploadFile, status
+from shapely.geometry.base import BaseGeometry
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-
-from app.db.models import RoadEdge, RoadNetwork, User, UserRolesOptions
-from app.schemas import UploadRoadNetworkResponse, UpdateRoadNetworkResponse
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncScalarResult, AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.api.v1.services import jobs_service
+from app.core import flatgeobuf, geoparquet
+from app.core.cache import CachedResponse, CacheKey, make_etag, response_cache
+from app.core.compression import (
+    STREAM_LEVELS,
+    compress,
+    compress_stream,
+    strip_upload_suffix,
+)
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.network_stats import stats_summary
+from app.core.pagination import EdgeCursor, EdgePage, decode_cursor, encode_cursor
+from app.core.routing import RoadGraph, build_graph, graph_cache, shortest_path
+from app.core.spatial_filter import Bbox, parse_area, parse_bbox, parse_point
+from app.db.edge_exports import (
+    property_column_name,
+    select_edge_flatgeobuf,
+    select_edge_property_keys,
+    select_edge_rows,
+)
+from app.db.edge_filters import parse_edge_filter
+from app.db.edge_queries import (
+    GEOJSON_FORMAT,
+    NDJSON_FORMAT,
+    FeatureTextFormat,
+    feature_page,
+    route_collection,
+    select_edge_changes,
+    select_edge_features,
+    select_edge_page,
+    select_edge_tile,
+    select_edges_by_id,
+    select_nearest_edges,
+)
+from app.db.models import (
+    IngestJob,
+    IngestJobKind,
+    IngestJobStatus,
+    RoadNetwork,
+    User,
+    UserRolesOptions,
+)
+from app.db.node_queries import (
+    select_graph_edges,
+    select_node_coordinates,
+    select_node_features,
+    select_version_stamp,
+)
+from app.db.stats_queries import select_network_stats
+from app.schemas import EdgeFormat, JobAcceptedResponse, SnapRequest
+
+logger = logging.getLogger(__name__)
+
+
+EDGE_STREAM_BATCH_SIZE = 2000  # features fetched from the server side cursor at once
+EXPORT_BATCH_SIZE = 20000  # edges per GeoParquet row group or FlatGeobuf batch
+SNAP_BATCH_SIZE = 10000  # points snapped per statement
+SNAP_CANDIDATES = 4  # nearest edges in degrees compared in metres per point
+
+EDGE_FORMAT_MEDIA_TYPES = {
+    EdgeFormat.GEOJSON: GEOJSON_FORMAT.media_type,
+    EdgeFormat.NDJSON: NDJSON_FORMAT.media_type,
+    EdgeFormat.PARQUET: geoparquet.MEDIA_TYPE,
+    EdgeFormat.FLATGEOBUF: flatgeobuf.MEDIA_TYPE,
+}
+# media types of the Accept header and the format they select
+ACCEPTED_EDGE_FORMATS = {
+    **{
+        media_type: edge_format
+        for edge_format, media_type in EDGE_FORMAT_MEDIA_TYPES.items()
+    },
+    "application/geo+json": EdgeFormat.GEOJSON,
+}
 
 
 # HELPERS
-async def validate_uploaded_file(file: UploadFile) -> bytes:
-    if not file.filename or (
-        not file.filename.endswith(".json") and not file.filename.endswith(".geojson")
-    ):
+@overload
+def as_utc(timestamp: datetime) -> datetime: ...
+
+
+@overload
+def as_utc(timestamp: None) -> None: ...
+
+
+def as_utc(timestamp: datetime | None) -> datetime | None:
+    """Query timestamps without an offset are taken to be UTC."""
+    if timestamp is None or timestamp.tzinfo is not None:
+        return timestamp
+    return timestamp.replace(tzinfo=UTC)
+
+
+async def validate_uploaded_file(file: UploadFile) -> None:
+    """
+    Checks the file extension of an upload, which may be followed by the
+    suffix of its compression (.gz or .zst). The content is validated by the
+    ingest job while the features are being streamed.
+    """
+    filename = strip_upload_suffix(file.filename or "")
+    if not filename.endswith(".json") and not filename.endswith(".geojson"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file extension"
         )
 
-    contents = await file.read()
+
+async def get_accessible_network(
+    db: AsyncSession, current_user: User, network_id: int
+) -> RoadNetwork:
+    """Returns the network if the user owns it (or is an admin), otherwise 404."""
+    query = select(RoadNetwork).filter_by(id=network_id)
+    if current_user.role != UserRolesOptions.ADMIN:
+        query = query.filter_by(user_id=current_user.id)
+    network = await db.scalar(query)
+
+    if network is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Network not found"
+        )
+    return network
+
+
+async def stream_edge_features(
+    db: AsyncSession,
+    features: AsyncScalarResult[str],
+    request: Request,
+    on_complete: Callable[[bytes], None] | None = None,
+    text_format: FeatureTextFormat = GEOJSON_FORMAT,
+) -> AsyncIterator[str]:
+    """
+    Writes a FeatureCollection (or ``text_format``) out of a server side
+    cursor, one batch of pre-rendered features at a time, so memory and time
+    to first byte do not grow with the network. The cursor and its session
+    are closed when the stream ends, fails or the client goes away.
+
+    ``on_complete`` receives the whole body once it was generated, unless it
+    outgrew the size of a response cache entry.
+    """
+    body: bytearray | None = bytearray() if on_complete else None
+
+    def record(chunk: str) -> str:
+        nonlocal body
+        if body is not None:
+            body += chunk.encode()
+            if len(body) > response_cache.max_entry_bytes:
+                body = None
+        return chunk
 
     try:
-        data = json.loads(contents)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON file")
-
-    if not isinstance(data, dict) or "type" not in data:
-        raise HTTPException(status_code=400, detail="Not a valid GeoJSON structure")
-
-    if data["type"] not in [
-        "FeatureCollection",
-        "Feature",
-        "Point",
-        "LineString",
-        "Polygon",
-    ]:
-        raise HTTPException(status_code=400, detail="Unsupported GeoJSON type")
-
-    return contents
-
-
-async def normalize_lanes(value: Union[List[Any] | str]) -> Union[str | None]:
-    """Normalize lanes value to a string."""
-    if isinstance(value, list):
-        return ",".join(map(str, value))
-    elif value is not None:
-        return str(value)
-    return None
-
-
-async def normalize_width(
-    value: Union[List[float] | float | None],
-) -> Union[List[float] | None]:
-    """Normalize width value to a list of floats."""
-    if isinstance(value, list):
-        try:
-            return [float(w) for w in value]
-        except (ValueError, TypeError):
-            return None
-    elif value is not None:
-        try:
-            return [float(value)]
-        except (ValueError, TypeError):
-            return None
-    return None
-
-
-async def create_road_edge(
-    feature: dict[str, Any], network_id: int, current_user_id: int
-) -> RoadEdge:
-    geometry = from_shape(shape(feature.get("geometry")), srid=4326)
-    properties = feature.get("properties", {})
-
-    lanes_value = await normalize_lanes(properties.get("lanes"))
-    width_value = await normalize_width(properties.get("width"))
-    known_fields = {"name", "ref", "oneway", "length", "tunnel", "lanes", "width"}
-
-    return RoadEdge(
-        geometry=geometry,
-        name=properties.get("name"),
-        ref=properties.get("ref"),
-        lanes=lanes_value,
-        oneway=properties.get("oneway"),
-        length=properties.get("length"),
-        width=width_value,
-        tunnel=properties.get("tunnel"),
-        extra_properties={k: v for k, v in properties.items() if k not in known_fields},
-        is_current=True,
-        network_id=network_id,
-        user_id=current_user_id,
+        yield record(text_format.start)
+        first = True
+        while True:
+            batch = await features.fetchmany(EDGE_STREAM_BATCH_SIZE)
+            if not batch:
+                break
+            if await request.is_disconnected():
+                return
+            yield record(text_format.join(batch, first))
+            first = False
+        record(text_format.end)
+        if on_complete is not None and body is not None:
+            on_complete(bytes(body))
+        yield text_format.end
+    except SQLAlchemyError:
+        # the status line is already sent, all that is left is to cut the body
+        logger.exception("Streaming the edges response failed")
+        raise
+    finally:
+        await features.close()
+        await db.close()
+
+
+async def compressed_response(
+    key: CacheKey, entry: CachedResponse, encoding: str
+) -> CachedResponse:
+    """
+    The cached response ``entry`` compressed with ``encoding``, compressed
+    and stored under ``key`` unless that was done before.
+    """
+    compressed = response_cache.get(key)
+    if compressed is not None:
+        return compressed
+
+    generation = response_cache.generation(entry.network_id)
+    body = await asyncio.to_thread(compress, entry.body, encoding)
+    compressed = dataclasses.replace(
+        entry, body=body, etag=make_etag(body), encoding=encoding
     )
+    response_cache.put(key, compressed, generation)
+    return compressed
+
+
+async def stream_geoparquet(
+    db: AsyncSession,
+    rows: AsyncResult[Any],
+    request: Request,
+    property_columns: list[str],
+) -> AsyncIterator[bytes]:
+    """
+    Writes a GeoParquet file out of a server side cursor, one row group per
+    batch of rows. The cursor and its session are closed when the stream
+    ends, fails or the client goes away.
+    """
+    parquet = geoparquet.GeoParquetStream(property_columns)
+    try:
+        while True:
+            batch = await rows.fetchmany(EXPORT_BATCH_SIZE)
+            if not batch:
+                break
+            if await request.is_disconnected():
+                return
+            # encoding and compressing a row group takes a while
+            yield await asyncio.to_thread(parquet.write, batch)
+        yield parquet.close()
+    except SQLAlchemyError:
+        logger.exception("Streaming the GeoParquet export failed")
+        raise
+    finally:
+        await rows.close()
+        await db.close()
 
 
-async def mark_edges_as_not_current(db: Session, network_id: int) -> None:
-    """Mark all current edges in the network as not current."""
-    db.query(RoadEdge).filter(
-        and_(RoadEdge.network_id == network_id, RoadEdge.is_current == True)
-    ).update({"is_current": False})
-
-
-async def build_updated_edge(
-    feature: dict[str, Any], network_id: int, current_user_id: int
-) -> RoadEdge:
-    """Build a new edge from a GeoJSON feature."""
-    geom = shape(feature["geometry"])
-    geom_pg = from_shape(geom, srid=4326)
-
-    properties = feature.get("properties", {})
-
-    lanes_value = await normalize_lanes(properties.get("lanes"))
-    width_value = await normalize_width(properties.get("width"))
-
-    fields = {"name", "ref", "oneway", "length", "tunnel"}
-
-    edge = RoadEdge(
-        geometry=geom_pg,
-        name=properties.get("name"),
-        ref=properties.get("ref"),
-        lanes=lanes_value,
-        oneway=properties.get("oneway"),
-        length=properties.get("length"),
-        width=width_value,
-        tunnel=properties.get("tunnel"),
-        extra_properties={
-            k: v
-            for k, v in properties.items()
-            if k not in fields.union({"lanes", "width"})
-        },
-        is_current=True,
-        timestamp=datetime.now(UTC),
-        network_id=network_id,
-        user_id=current_user_id,
+async def stream_flatgeobuf(
+    request: Request,
+    network_id: int,
+    snapshot: datetime,
+    bbox: Bbox | None = None,
+    area: BaseGeometry | None = None,
+    condition: ColumnElement[bool] | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Writes a FlatGeobuf rendered by PostGIS in batches of edges, read by
+    keyset like pages so all batches show the version at ``snapshot``, and
+    joined into one file, see ``app.core.flatgeobuf``.
+    """
+    db = AsyncSessionLocal()
+    try:
+        after_id = 0
+        first = True
+        while True:
+            data, last_id = (
+                await db.execute(
+                    select_edge_flatgeobuf(
+                        network_id,
+                        snapshot,
+                        after_id,
+                        EXPORT_BATCH_SIZE,
+                        bbox,
+                        area,
+                        condition,
+                        simplify,
+                        precision,
+                    )
+                )
+            ).one()
+            if last_id is None:
+                # an empty export is still a file, with just the header
+                if first and data:
+                    yield bytes(data)
+                break
+            yield flatgeobuf.join_batch(bytes(data), first)
+            first = False
+            after_id = last_id
+            if await request.is_disconnected():
+                return
+    except SQLAlchemyError:
+        logger.exception("Streaming the FlatGeobuf export failed")
+        raise
+    finally:
+        await db.close()
+
+
+async def is_historical_version(
+    db: AsyncSession, network_id: int, timestamp: datetime | None
+) -> bool:
+    """
+    Whether the version of a network at ``timestamp`` can no longer change:
+    the timestamp lies in the past and no ingest job that could still write
+    edges valid at that time is pending or running.
+    """
+    if timestamp is None or timestamp > datetime.now(UTC):
+        return False
+    unfinished = await db.scalar(
+        select(IngestJob.id)
+        .where(
+            IngestJob.network_id == network_id,
+            IngestJob.status.in_([IngestJobStatus.PENDING, IngestJobStatus.RUNNING]),
+            IngestJob.created_at <= timestamp,
+        )
+        .limit(1)
     )
-    return edge
+    return unfinished is None
+
+
+async def consistent_snapshot(db: AsyncSession, network_id: int) -> datetime:
+    """
+    The latest point in time at which the version of a network can no longer
+    change: now, or just before the oldest ingest job of the network that is
+    still pending or running, since its edges become valid from when it runs.
+    """
+    oldest_unfinished = await db.scalar(
+        select(func.min(IngestJob.created_at)).where(
+            IngestJob.network_id == network_id,
+            IngestJob.status.in_([IngestJobStatus.PENDING, IngestJobStatus.RUNNING]),
+        )
+    )
+    now = datetime.now(UTC)
+    if oldest_unfinished is None or oldest_unfinished > now:
+        return now
+    return oldest_unfinished - timedelta(microseconds=1)
+
+
+def parse_edge_query(
+    bbox: str | None, intersects: str | None, edge_filter: str | None
+) -> tuple[Bbox | None, BaseGeometry | None, ColumnElement[bool] | None]:
+    """Parses the filters of an edges request, 400 if one is invalid."""
+    try:
+        bbox_filter = parse_bbox(bbox) if bbox is not None else None
+        area_filter = parse_area(intersects) if intersects is not None else None
+        condition = parse_edge_filter(edge_filter) if edge_filter is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return bbox_filter, area_filter, condition
+
+
+def negotiate_edge_format(
+    requested: EdgeFormat | None, accept: str | None
+) -> EdgeFormat:
+    """
+    The format of an edges response: the requested one, or else the first
+    media type of the Accept header that is a known format, GeoJSON if none.
+    """
+    if requested is not None:
+        return requested
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in ACCEPTED_EDGE_FORMATS:
+            return ACCEPTED_EDGE_FORMATS[media_type]
+    return EdgeFormat.GEOJSON
+
+
+def graph_from_rows(nodes: list[Any], edges: list[Any]) -> RoadGraph:
+    """
+    Builds a graph from the rows of select_node_coordinates and
+    select_graph_edges.
+    """
+    node_table = np.array(nodes, dtype=np.float64).reshape(-1, 3)
+    edge_table = np.array(edges, dtype=np.float64).reshape(-1, 5)
+    return build_graph(
+        node_ids=node_table[:, 0].astype(np.int64),
+        node_coords=node_table[:, 1:],
+        sources=edge_table[:, 0].astype(np.int64),
+        targets=edge_table[:, 1].astype(np.int64),
+        weights=edge_table[:, 2],
+        oneway=edge_table[:, 3].astype(bool),
+        edge_ids=edge_table[:, 4].astype(np.int64),
+    )
+
+
+async def load_graph(
+    db: AsyncSession, network_id: int, timestamp: datetime | None
+) -> RoadGraph:
+    """
+    The graph of a network version, built on the first request for the
+    version and then taken from ``graph_cache``. Versions are told apart by
+    the time of their last change, so a new version is a new cache entry and
+    the graph of the old one ages out of the cache.
+    """
+    stamp = await db.scalar(select_version_stamp(network_id, timestamp))
+    key = (network_id, stamp)
+    graph = graph_cache.get(key)
+    if graph is not None:
+        return graph
+
+    # the edges as of the stamp rather than of timestamp, so the graph matches
+    # its key even if an update commits meanwhile
+    edges = []
+    if stamp is not None:
+        edges = list(await db.execute(select_graph_edges(network_id, stamp)))
+    nodes = list(await db.execute(select_node_coordinates(network_id)))
+    graph = await asyncio.to_thread(graph_from_rows, nodes, edges)
+    graph_cache.put(key, graph)
+    return graph
+
+
+def tile_properties(z: int) -> list[str]:
+    """The edge properties vector tiles carry at zoom level ``z``."""
+    return [
+        name for name, min_zoom in settings.tile_properties.items() if z >= min_zoom
+    ]
 
 
 # ENDPOINT HANDLERS
 async def upload_road_network(
-    db: Session, current_user: User, file: UploadFile = File(...)
-) -> UploadRoadNetworkResponse:
+    db: AsyncSession, current_user: User, file: UploadFile = File(...)
+) -> JobAcceptedResponse:
+    await validate_uploaded_file(file)
+    return await jobs_service.enqueue_ingest_job(
+        db=db, current_user=current_user, file=file, kind=IngestJobKind.UPLOAD
+    )
+
+
+async def get_network(
+    db: AsyncSession,
+    current_user: User,
+    request: Request,
+    network_id: int,
+    timestamp: datetime | None = None,
+    bbox: str | None = None,
+    intersects: str | None = None,
+    edge_filter: str | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+    ndjson: bool = False,
+    encoding: str | None = None,
+) -> CachedResponse | AsyncIterator[str | bytes]:
+    """
+    Returns the edges of a network version as a GeoJSON FeatureCollection,
+    or as newline delimited features with ``ndjson``.
+    ``bbox`` and ``intersects`` keep only the edges that intersect the given
+    area, ``edge_filter`` only the edges whose attributes match it, see
+    ``app.db.edge_filters``. ``simplify`` and ``precision`` reduce the
+    geometries in PostGIS, see ``edge_feature_json``.
+
+    Responses are served from the response cache when possible, without
+    touching the database. Otherwise the FeatureCollection is generated while
+    it is sent, see ``stream_edge_features``, and stored in the cache.
+
+    ``encoding`` compresses the response. Cached bodies are compressed once
+    per coding and the compressed body is cached next to the plain one.
+    """
+    bbox_filter, area_filter, condition = parse_edge_query(
+        bbox, intersects, edge_filter
+    )
+
+    cache_key = (
+        "edges",
+        network_id,
+        timestamp,
+        bbox_filter,
+        area_filter.wkb_hex if area_filter is not None else None,
+        edge_filter,
+        simplify,
+        precision,
+        ndjson,
+    )
+    cached = response_cache.get(cache_key)
+    if cached is not None and (
+        current_user.role == UserRolesOptions.ADMIN
+        or cached.owner_id == current_user.id
+    ):
+        if encoding is None:
+            return cached
+        return await compressed_response(cache_key + (encoding,), cached, encoding)
+
     try:
-        content = await validate_uploaded_file(file)  # file.file.read()
-        geojson_data = json.loads(content)
+        generation = response_cache.generation(network_id)
+        network = await get_accessible_network(db, current_user, network_id)
+        immutable = await is_historical_version(db, network_id, timestamp)
 
-        network_name = geojson_data.get("name") or "Unnamed Network"
-        timestamp = geojson_data.get("timestamp", datetime.now(UTC))
+        # the request session is closed before a streamed body is sent, so the
+        # cursor gets a session of its own
+        stream_db = AsyncSessionLocal()
+        try:
+            features = await stream_db.stream_scalars(
+                select_edge_features(
+                    network_id,
+                    timestamp,
+                    bbox_filter,
+                    area_filter,
+                    condition,
+                    simplify,
+                    precision,
+                ),
+                execution_options={"yield_per": EDGE_STREAM_BATCH_SIZE},
+            )
+        except SQLAlchemyError:
+            await stream_db.close()
+            raise
+
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
+        )
 
-        network = RoadNetwork(
-            name=network_name, timestamp=timestamp, user_id=current_user.id
+    text_format = NDJSON_FORMAT if ndjson else GEOJSON_FORMAT
+
+    def store(body: bytes) -> None:
+        entry = CachedResponse(
+            body=body,
+            etag=make_etag(body),
+            media_type=text_format.media_type,
+            network_id=network_id,
+            owner_id=network.user_id,
+            immutable=immutable,
         )
-        db.add(network)
-        db.flush()
+        response_cache.put(cache_key, entry, generation)
+
+    stream = stream_edge_features(stream_db, features, request, store, text_format)
+    if encoding is None:
+        return stream
+    return compress_stream(stream, encoding)
 
-        features = geojson_data.get("features", [])
 
-        edges_to_add = [
-            await create_road_edge(feature, network.id, current_user.id)
-            for feature in features
-        ]
+async def export_network(
+    db: AsyncSession,
+    current_user: User,
+    request: Request,
+    network_id: int,
+    edge_format: EdgeFormat,
+    timestamp: datetime | None = None,
+    bbox: str | None = None,
+    intersects: str | None = None,
+    edge_filter: str | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Returns the edges of a network version as a GeoParquet or FlatGeobuf file,
+    generated while it is sent. The parameters select edges like those of
+    ``get_network``. Without a timestamp the file shows the version at
+    ``consistent_snapshot``, the property keys of the GeoParquet schema and the
+    rows are read from that same version.
+    """
+    bbox_filter, area_filter, condition = parse_edge_query(
+        bbox, intersects, edge_filter
+    )
 
-        db.bulk_save_objects(edges_to_add)
-        db.commit()
+    try:
+        await get_accessible_network(db, current_user, network_id)
+        snapshot = timestamp or await consistent_snapshot(db, network_id)
+
+        if edge_format == EdgeFormat.FLATGEOBUF:
+            return stream_flatgeobuf(
+                request,
+                network_id,
+                snapshot,
+                bbox_filter,
+                area_filter,
+                condition,
+                simplify,
+                precision,
+            )
 
-        return UploadRoadNetworkResponse(
-            message="Upload successful", network_id=network.id
+        keys = sorted(
+            await db.scalars(
+                select_edge_property_keys(
+                    network_id, snapshot, bbox_filter, area_filter, condition
+                )
+            )
         )
+        stream_db = AsyncSessionLocal()
+        try:
+            rows = await stream_db.stream(
+                select_edge_rows(
+                    network_id,
+                    keys,
+                    snapshot,
+                    bbox_filter,
+                    area_filter,
+                    condition,
+                    simplify,
+                    precision,
+                ),
+                execution_options={"yield_per": EXPORT_BATCH_SIZE},
+            )
+        except SQLAlchemyError:
+            await stream_db.close()
+            raise
 
-    except Exception as e:
-        db.rollback()
+    except SQLAlchemyError:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Upload failed: {str(e)}"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
         )
 
+    property_columns = [property_column_name(key) for key in keys]
+    return stream_geoparquet(stream_db, rows, request, property_columns)
 
-async def get_network(
-    db: Session,
+
+async def get_network_page(
+    db: AsyncSession,
     current_user: User,
+    request: Request,
     network_id: int,
+    limit: int | None = None,
+    cursor: str | None = None,
     timestamp: datetime | None = None,
-) -> Dict[str, Any]:
+    bbox: str | None = None,
+    intersects: str | None = None,
+    edge_filter: str | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+    encoding: str | None = None,
+) -> EdgePage:
+    """
+    Returns a page of up to ``limit`` edges of a network version, ordered by
+    id, and the URL of the next page. The first page pins the version, the
+    one at ``timestamp`` or else the latest one no running ingest job can
+    still change, into the cursor of the next page.
+    """
+    # the cursor holds the snapshot with its offset, a naive timestamp would
+    # neither decode nor match it on the next page
+    timestamp = as_utc(timestamp)
+    bbox_filter, area_filter, condition = parse_edge_query(
+        bbox, intersects, edge_filter
+    )
+    if limit is None:
+        limit = settings.edge_page_max_limit
+
+    position = None
+    if cursor is not None:
+        try:
+            position = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if position.network_id != network_id or (
+            timestamp is not None and timestamp != position.snapshot
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor does not belong to this read",
+            )
+
     try:
-        if current_user.role == UserRolesOptions.ADMIN:
-            network = db.query(RoadNetwork).filter_by(id=network_id).first()
+        await get_accessible_network(db, current_user, network_id)
+        if position is not None:
+            snapshot, after_id = position.snapshot, position.after_id
         else:
-            network = (
-                db.query(RoadNetwork)
-                .filter_by(id=network_id, user_id=current_user.id)
-                .first()
+            snapshot = timestamp or await consistent_snapshot(db, network_id)
+            after_id = 0
+
+        rows = (
+            await db.execute(
+                select_edge_page(
+                    network_id,
+                    snapshot,
+                    after_id,
+                    limit,
+                    bbox_filter,
+                    area_filter,
+                    condition,
+                    simplify,
+                    precision,
+                )
             )
+        ).all()
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
+        )
 
-        if network is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Network not found"
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = EdgeCursor(network_id, rows[-1].id, snapshot)
+        next_url = str(
+            request.url.include_query_params(
+                limit=limit, cursor=encode_cursor(next_cursor)
             )
+        )
+    body = feature_page([feature for _, feature in rows], next_url).encode()
+    if encoding is not None:
+        body = await asyncio.to_thread(
+            compress, body, encoding, STREAM_LEVELS[encoding]
+        )
+    return EdgePage(body=body, next_url=next_url, encoding=encoding)
 
-        query = db.query(RoadEdge).filter(RoadEdge.network_id == network_id)
 
-        if timestamp:
-            query = query.filter(RoadEdge.timestamp <= timestamp)
-        else:
-            query = query.filter(RoadEdge.is_current == True)
+async def get_network_changes(
+    db: AsyncSession,
+    current_user: User,
+    request: Request,
+    network_id: int,
+    since: datetime,
+    until: datetime | None = None,
+    ndjson: bool = False,
+    encoding: str | None = None,
+) -> tuple[AsyncIterator[str | bytes], datetime]:
+    """
+    Returns the edges added to or retired from a network between ``since``
+    and ``until`` as a stream of GeoJSON features, and ``until``. It defaults
+    to the latest version no running ingest job can still change, so it can
+    be passed as ``since`` of the next request without missing changes.
+    """
+    since = as_utc(since)
+    until = as_utc(until)
+    if until is not None and until < since:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="until must not be before since",
+        )
 
-        edges = query.all()
+    try:
+        await get_accessible_network(db, current_user, network_id)
+        if until is None:
+            until = max(since, await consistent_snapshot(db, network_id))
 
-        if not edges:
-            return {"type": "FeatureCollection", "features": []}
+        stream_db = AsyncSessionLocal()
+        try:
+            features = await stream_db.stream_scalars(
+                select_edge_changes(network_id, since, until),
+                execution_options={"yield_per": EDGE_STREAM_BATCH_SIZE},
+            )
+        except SQLAlchemyError:
+            await stream_db.close()
+            raise
 
-        features = [
-            {
-                "type": "Feature",
-                "geometry": mapping(to_shape(edge.geometry)),
-                "properties": {
-                    "id": edge.id,
-                    "timestamp": edge.timestamp.isoformat(),
-                    "is_current": edge.is_current,
-                },
-            }
-            for edge in edges
-        ]
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
+        )
 
-        return {"type": "FeatureCollection", "features": features}
+    text_format = NDJSON_FORMAT if ndjson else GEOJSON_FORMAT
+    stream = stream_edge_features(stream_db, features, request, None, text_format)
+    if encoding is None:
+        return stream, until
+    return compress_stream(stream, encoding), until
+
+
+async def get_network_nodes(
+    db: AsyncSession,
+    current_user: User,
+    request: Request,
+    network_id: int,
+    timestamp: datetime | None = None,
+    bbox: str | None = None,
+    min_degree: int | None = None,
+    max_degree: int | None = None,
+    encoding: str | None = None,
+) -> AsyncIterator[str | bytes]:
+    """
+    Returns the nodes of a network version with their degree as a stream of
+    GeoJSON features, optionally within a bounding box and range of degrees.
+    """
+    bbox_filter, _, _ = parse_edge_query(bbox, None, None)
+
+    try:
+        await get_accessible_network(db, current_user, network_id)
+
+        stream_db = AsyncSessionLocal()
+        try:
+            features = await stream_db.stream_scalars(
+                select_node_features(
+                    network_id, timestamp, bbox_filter, min_degree, max_degree
+                ),
+                execution_options={"yield_per": EDGE_STREAM_BATCH_SIZE},
+            )
+        except SQLAlchemyError:
+            await stream_db.close()
+            raise
 
     except SQLAlchemyError:
         raise HTTPException(
@@ -232,49 +775,180 @@ async def get_network(
             detail="An internal error occurred",
         )
 
+    stream = stream_edge_features(stream_db, features, request)
+    if encoding is None:
+        return stream
+    return compress_stream(stream, encoding)
 
-async def update_network_from_file(
-    db: Session, current_user: User, network_id: int, file: UploadFile = File(...)
-) -> UpdateRoadNetworkResponse:
+
+async def get_network_route(
+    db: AsyncSession,
+    current_user: User,
+    network_id: int,
+    origin: str,
+    destination: str,
+    timestamp: datetime | None = None,
+) -> str:
+    """
+    Returns the shortest route between the nodes closest to two lon/lat
+    points in a network version, as a FeatureCollection of its edges in
+    travel order. 404 if the network has no route between them.
+    """
     try:
-        current_user_id = current_user.id
+        origin_point = parse_point(origin, "from")
+        destination_point = parse_point(destination, "to")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        if current_user.role == UserRolesOptions.ADMIN:
-            network = db.query(RoadNetwork).filter_by(id=network_id).first()
-        else:
-            network = (
-                db.query(RoadNetwork)
-                .filter_by(id=network_id, user_id=current_user_id)
-                .first()
+    try:
+        await get_accessible_network(db, current_user, network_id)
+        graph = await load_graph(db, network_id, timestamp)
+
+        source = graph.nearest_vertex(origin_point)
+        target = graph.nearest_vertex(destination_point)
+        route = None
+        if source is not None and target is not None:
+            route = await asyncio.to_thread(shortest_path, graph, source, target)
+        if route is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No route found"
             )
 
-        if network is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Network not found"
+        rows = await db.execute(select_edges_by_id(route.edge_ids))
+        features = dict(rows.tuples().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
+        )
+
+    return route_collection(
+        [features[edge_id] for edge_id in route.edge_ids],
+        route.length,
+        int(graph.node_ids[source]),
+        int(graph.node_ids[target]),
+    )
+
+
+async def snap_to_network(
+    db: AsyncSession, current_user: User, network_id: int, snap: SnapRequest
+) -> dict[str, Any]:
+    """
+    Returns the nearest edge of a network version to every point of a batch,
+    with the distance in metres and the closest point on the edge, in the
+    order of the points. Points without an edge within ``max_distance`` get
+    None. The points are snapped a batch per statement, see
+    ``select_nearest_edges``.
+    """
+    matches: list[dict[str, Any] | None] = [None] * len(snap.points)
+    timestamp = as_utc(snap.timestamp)
+    try:
+        await get_accessible_network(db, current_user, network_id)
+
+        for start in range(0, len(snap.points), SNAP_BATCH_SIZE):
+            batch = snap.points[start : start + SNAP_BATCH_SIZE]
+            rows = await db.execute(
+                select_nearest_edges(
+                    network_id,
+                    timestamp,
+                    [lon for lon, _ in batch],
+                    [lat for _, lat in batch],
+                    SNAP_CANDIDATES,
+                )
             )
+            for ordinal, edge_id, distance, lon, lat in rows:
+                if snap.max_distance is not None and distance > snap.max_distance:
+                    continue
+                matches[start + ordinal - 1] = {
+                    "edge_id": edge_id,
+                    "distance": distance,
+                    "location": [lon, lat],
+                }
+
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
+        )
+
+    return {"matches": matches}
+
+
+async def get_network_stats(
+    db: AsyncSession,
+    current_user: User,
+    network_id: int,
+    timestamp: datetime | None = None,
+) -> dict[str, Any]:
+    """
+    Returns the statistics of a network version, the current one or the one
+    at ``timestamp``. They are kept up to date by uploads and updates, so this
+    is one index lookup however large the network is.
+    """
+    try:
+        await get_accessible_network(db, current_user, network_id)
+        row = await db.scalar(select_network_stats(network_id, timestamp))
+
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
+        )
+
+    return stats_summary(row)
 
-        content = await file.read()
-        geojson_data = json.loads(content)
-        current_user_id = current_user_id
 
-        features = geojson_data.get("features", [])
+async def get_network_tile(
+    db: AsyncSession,
+    current_user: User,
+    network_id: int,
+    z: int,
+    x: int,
+    y: int,
+    timestamp: datetime | None = None,
+) -> tuple[bytes, bool]:
+    """
+    Returns the Mapbox Vector Tile z/x/y of a network version and whether it is
+    immutable, i.e. the tile of a historical version.
+    """
+    if not 0 <= z <= settings.tile_max_zoom or not (0 <= x < 2**z and 0 <= y < 2**z):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid tile coordinates"
+        )
 
-        if features:
-            await mark_edges_as_not_current(db, network_id)
+    try:
+        await get_accessible_network(db, current_user, network_id)
+
+        tile = await db.scalar(
+            select_edge_tile(network_id, timestamp, z, x, y, tile_properties(z))
+        )
+        immutable = await is_historical_version(db, network_id, timestamp)
+        return bytes(tile or b""), immutable
 
-        new_features = [
-            await build_updated_edge(feature, network_id, current_user_id)
-            for feature in features
-        ]
-        db.bulk_save_objects(new_features)
-        db.commit()
-        return UpdateRoadNetworkResponse(
-            message="Network updated successfully",
-            network_id=int(getattr(network, "id")),
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
         )
 
-    except Exception as e:
-        db.rollback()
+
+async def update_network_from_file(
+    db: AsyncSession, current_user: User, network_id: int, file: UploadFile = File(...)
+) -> JobAcceptedResponse:
+    try:
+        network = await get_accessible_network(db, current_user, network_id)
+    except SQLAlchemyError:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Update failed: {str(e)}"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred",
         )
+
+    await validate_uploaded_file(file)
+    return await jobs_service.enqueue_ingest_job(
+        db=db,
+        current_user=current_user,
+        file=file,
+        kind=IngestJobKind.UPDATE,
+        network_id=network.id,
+    )
@@ -1,34 +1,41 @@
+from typing import Any
+
 from fastapi import HTTPException, status
 from pydantic import EmailStr
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import principal_cache, response_cache, revoked_principals
+from app.core.network_stats import stats_summary
 from app.core.security import Hasher
 from app.db.models import RoadNetwork, User, UserRolesOptions
+from app.db.stats_queries import select_latest_stats
 from app.schemas import CreateUser
 
 
-async def create_user(db: Session, request: CreateUser) -> User:
+async def create_user(db: AsyncSession, request: CreateUser) -> User:
+    hashed_password = await Hasher.hash_password_async(request.hashed_password)
     try:
         new_user = User(
             username=request.username,
             email=request.email,
-            hashed_password=Hasher.hash_password(request.hashed_password),
+            hashed_password=hashed_password,
             role=request.role,
         )
 
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         return new_user
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise Exception(f"Failed to create user, {e}")
 
 
-async def get_user_by_id(db: Session, user_id: int, current_user: User) -> User:
+async def get_user_by_id(db: AsyncSession, user_id: int, current_user: User) -> User:
     try:
-        user = db.query(User).filter_by(id=user_id).first()
+        user = await db.scalar(select(User).filter_by(id=user_id))
 
         if not user:
             raise HTTPException(
@@ -53,10 +60,14 @@ async def get_user_by_id(db: Session, user_id: int, current_user: User) -> User:
 
 
 async def get_road_networks_for_user(
-    db: Session, user_id: int, current_user: User
-) -> list[RoadNetwork]:  # More accurate than Query[RoadNetwork]
+    db: AsyncSession, user_id: int, current_user: User
+) -> list[dict[str, Any]]:
+    """
+    The road networks of a user with the statistics of their current version,
+    read from the stored statistics rather than the edges.
+    """
     try:
-        user = db.query(User).filter_by(id=user_id).first()
+        user = await db.scalar(select(User).filter_by(id=user_id))
 
         if not user:
             raise HTTPException(
@@ -71,9 +82,24 @@ async def get_road_networks_for_user(
                 detail="Action not permitted", status_code=status.HTTP_401_UNAUTHORIZED
             )
 
-        networks = db.query(RoadNetwork).filter_by(user_id=user_id).all()
+        networks = list(
+            await db.scalars(select(RoadNetwork).filter_by(user_id=user_id))
+        )
+        stats = {
+            row.network_id: row
+            for row in await db.scalars(
+                select_latest_stats([network.id for network in networks])
+            )
+        }
 
-        return networks
+        return [
+            {
+                "id": network.id,
+                "name": network.name,
+                "stats": stats_summary(stats.get(network.id)),
+            }
+            for network in networks
+        ]
 
     except SQLAlchemyError:
         raise HTTPException(
@@ -82,8 +108,10 @@ async def get_road_networks_for_user(
         )
 
 
-async def delete_user(db: Session, user_id: int, current_user: User) -> dict[str, str]:
-    user = db.query(User).filter_by(id=user_id).first()
+async def delete_user(
+    db: AsyncSession, user_id: int, current_user: User
+) -> dict[str, str]:
+    user = await db.scalar(select(User).filter_by(id=user_id))
 
     if not user:
         raise HTTPException(
@@ -95,15 +123,19 @@ async def delete_user(db: Session, user_id: int, current_user: User) -> dict[str
             detail="Action not permitted", status_code=status.HTTP_401_UNAUTHORIZED
         )
 
-    db.delete(user)
-    db.commit()
+    email = user.email
+    await db.delete(user)
+    await db.commit()
+    response_cache.invalidate_owner(user_id)
+    principal_cache.invalidate(email)
+    revoked_principals.put(user_id, True)
     return {"detail": "User deleted successfully"}
 
 
 # for now, I use this for authenticating users, does not get used by a respective endpoint
-async def get_user_by_email(db: Session, email: EmailStr) -> User:
+async def get_user_by_email(db: AsyncSession, email: EmailStr) -> User:
     try:
-        user = db.query(User).filter_by(email=email).first()
+        user = await db.scalar(select(User).filter_by(email=email))
 
         if not user:
             raise HTTPException(
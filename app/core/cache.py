@@ -0,0 +1,280 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.db.models import User
+
+CacheKey = tuple[Hashable, ...]
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    media_type: str
+    network_id: int
+    owner_id: int
+    # responses of historical network versions never change and survive
+    # invalidation of their network
+    immutable: bool
+    # content coding of the body, None if it is not compressed
+    encoding: str | None = None
+
+
+def make_etag(body: bytes) -> str:
+    """A strong ETag, derived from the exact bytes of the body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header value matches ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as If-None-Match requires
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def hit_rate(hits: int, misses: int) -> float:
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """
+    A least recently used cache of response bodies, bounded by the total size
+    of the bodies. The cache lives in the API process, ingest jobs invalidate
+    their network through the done callbacks of their futures, so the entries
+    are thread safe.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: OrderedDict[CacheKey, CachedResponse] = OrderedDict()
+        self._size = 0
+        # bumped on every invalidation, so responses that were being generated
+        # while their network changed are not stored afterwards
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self, network_id: int) -> int:
+        with self._lock:
+            return self._generations.get(network_id, 0)
+
+    def put(
+        self, key: CacheKey, entry: CachedResponse, generation: int | None = None
+    ) -> None:
+        """
+        Stores a response. If ``generation`` is given, the response is only
+        stored if its network was not invalidated since that generation.
+        """
+        if len(entry.body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            current = self._generations.get(entry.network_id, 0)
+            if generation is not None and generation != current:
+                return
+            self._discard(key)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def invalidate_network(self, network_id: int) -> None:
+        """Drops the entries of a network that a new version could change."""
+        with self._lock:
+            self._generations[network_id] = self._generations.get(network_id, 0) + 1
+        self._discard_where(
+            lambda entry: entry.network_id == network_id and not entry.immutable
+        )
+
+    def invalidate_owner(self, user_id: int) -> None:
+        """Drops every entry of the networks owned by a user."""
+        self._discard_where(lambda entry: entry.owner_id == user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": hit_rate(self.hits, self.misses),
+            }
+
+    def _discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+    def _discard_where(self, predicate: Callable[[CachedResponse], bool]) -> None:
+        with self._lock:
+            for key in [key for key, e in self._entries.items() if predicate(e)]:
+                self._discard(key)
+
+
+response_cache = ResponseCache(
+    max_bytes=settings.response_cache_max_bytes,
+    max_entry_bytes=settings.response_cache_max_entry_bytes,
+)
+
+
+class SizedCache(Generic[K, V]):
+    """
+    A thread safe least recently used cache bounded by the total size of its
+    values, as measured by ``size``. Values larger than the whole cache are
+    not stored.
+    """
+
+    def __init__(self, max_bytes: int, size: Callable[[V], int]) -> None:
+        self.max_bytes = max_bytes
+        self._size_of = size
+        self._entries: OrderedDict[K, tuple[int, V]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: K, value: V) -> None:
+        size = self._size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[0]
+            self._entries[key] = (size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def discard_where(self, predicate: Callable[[K], bool]) -> None:
+        """Drops the entries whose key matches ``predicate``."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._size -= self._entries.pop(key)[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": hit_rate(self.hits, self.misses),
+            }
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A thread safe least recently used cache whose entries expire ``ttl``
+    seconds after they were stored.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def __contains__(self, key: K) -> bool:
+        with self._lock:
+            item = self._entries.get(key)
+            return item is not None and item[0] >= time.monotonic()
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": hit_rate(self.hits, self.misses),
+            }
+
+
+# resolved users by token subject (email)
+principal_cache: TTLCache[str, "User"] = TTLCache(
+    ttl=settings.principal_cache_ttl_seconds,
+    max_entries=settings.principal_cache_max_entries,
+)
+
+# ids of deleted users, kept as long as a token issued to them can be valid
+revoked_principals: TTLCache[int, bool] = TTLCache(
+    ttl=settings.access_token_expire_minutes * 60,
+    max_entries=settings.principal_cache_max_entries,
+)
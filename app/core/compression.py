@@ -0,0 +1,189 @@
+"""
+Content codings of uploads and responses: gzip, zstd and brotli (br, for
+responses only).
+
+Compressed uploads are stored as they were received and decompressed while
+the ingest job reads them. Streamed responses are compressed chunk by chunk,
+every chunk is flushed so clients get the features as they are read. Cached
+responses are compressed once per coding, at a higher level, and kept.
+"""
+
+import gzip
+import os
+import zlib
+from collections.abc import AsyncIterator
+from typing import BinaryIO, Protocol
+
+import brotli
+import zstandard
+
+# suffix of a stored upload in each coding
+UPLOAD_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+# media types that mean a compressed file, e.g. for curl's --data-binary
+UPLOAD_MEDIA_TYPES = {
+    "application/gzip": "gzip",
+    "application/x-gzip": "gzip",
+    "application/zstd": "zstd",
+}
+
+# response codings in order of preference on equal quality
+RESPONSE_ENCODINGS = ("zstd", "br", "gzip")
+
+# levels while streaming, where latency matters, and for cached bodies,
+# which are compressed once and sent many times
+STREAM_LEVELS = {"gzip": 5, "zstd": 3, "br": 4}
+CACHE_LEVELS = {"gzip": 9, "zstd": 12, "br": 9}
+
+
+def upload_encoding(
+    filename: str | None, content_encoding: str | None, content_type: str | None
+) -> str | None:
+    """
+    The coding of an uploaded file, from the Content-Encoding or Content-Type
+    of its part, or else from its suffix. Raises ValueError if unsupported.
+    """
+    if content_encoding and content_encoding.strip().lower() != "identity":
+        encoding = content_encoding.strip().lower()
+        if encoding == "x-gzip":
+            encoding = "gzip"
+        if encoding not in UPLOAD_SUFFIXES:
+            raise ValueError(f"Unsupported Content-Encoding {content_encoding}")
+        return encoding
+
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in UPLOAD_MEDIA_TYPES:
+        return UPLOAD_MEDIA_TYPES[media_type]
+
+    for encoding, suffix in UPLOAD_SUFFIXES.items():
+        if (filename or "").lower().endswith(suffix):
+            return encoding
+    return None
+
+
+def strip_upload_suffix(filename: str) -> str:
+    """The name of an uploaded file without its compression suffix."""
+    for suffix in UPLOAD_SUFFIXES.values():
+        if filename.lower().endswith(suffix):
+            return filename[: -len(suffix)]
+    return filename
+
+
+def open_upload(path: str) -> BinaryIO:
+    """Opens a stored upload, decompressing it while it is read."""
+    _, suffix = os.path.splitext(path)
+    if suffix == UPLOAD_SUFFIXES["gzip"]:
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    if suffix == UPLOAD_SUFFIXES["zstd"]:
+        return zstandard.ZstdDecompressor().stream_reader(  # type: ignore[return-value]
+            open(path, "rb"), closefd=True
+        )
+    return open(path, "rb")
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    The response coding to use for an Accept-Encoding header, None for the
+    identity. The highest quality wins, then the order of RESPONSE_ENCODINGS.
+    """
+    qualities: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, parameters = item.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        name, _, value = parameters.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding:
+            qualities[coding] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    ranked = [
+        (qualities.get(encoding, wildcard), -i, encoding)
+        for i, encoding in enumerate(RESPONSE_ENCODINGS)
+    ]
+    quality, _, encoding = max(ranked)
+    return encoding if quality > 0 else None
+
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    """Compresses a whole body, by default at the level for cached bodies."""
+    level = level if level is not None else CACHE_LEVELS[encoding]
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return brotli.compress(data, quality=level)
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipCompressor:
+    def __init__(self) -> None:
+        self._zlib = zlib.compressobj(
+            STREAM_LEVELS["gzip"], zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._zlib.flush()
+
+
+class _ZstdCompressor:
+    def __init__(self) -> None:
+        compressor = zstandard.ZstdCompressor(level=STREAM_LEVELS["zstd"])
+        self._zstd = compressor.compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zstd.compress(data) + self._zstd.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._zstd.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self) -> None:
+        self._brotli = brotli.Compressor(quality=STREAM_LEVELS["br"])
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.process(data) + self._brotli.flush()
+
+    def finish(self) -> bytes:
+        return self._brotli.finish()
+
+
+_COMPRESSORS = {
+    "gzip": _GzipCompressor,
+    "zstd": _ZstdCompressor,
+    "br": _BrotliCompressor,
+}
+
+
+async def compress_stream(
+    chunks: AsyncIterator[str | bytes], encoding: str
+) -> AsyncIterator[bytes]:
+    """Compresses a streamed body chunk by chunk."""
+    compressor: _Compressor = _COMPRESSORS[encoding]()
+    try:
+        async for chunk in chunks:
+            data = compressor.compress(
+                chunk.encode() if isinstance(chunk, str) else chunk
+            )
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        # lets the body release its cursor right away if the client went away
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -10,7 +10,41 @@ class Settings(BaseSettings):
     db_user: str = Field(..., alias="POSTGRES_USER")
     db_password: str = Field(..., alias="POSTGRES_PASSWORD")
     db_name: str = Field(..., alias="POSTGRES_DB")
+    # log every SQL statement, slows down every request
+    db_echo: bool = Field(False, alias="DB_ECHO")
     jwt_secret_key: str = Field(..., alias="JWT_SECRET_KEY")
+    access_token_expire_minutes: int = Field(1440, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # threads running bcrypt, and how many more operations may wait for one
+    password_hash_workers: int = Field(2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_queue: int = Field(16, alias="PASSWORD_HASH_MAX_QUEUE")
+    principal_cache_ttl_seconds: int = Field(60, alias="PRINCIPAL_CACHE_TTL_SECONDS")
+    principal_cache_max_entries: int = Field(10000, alias="PRINCIPAL_CACHE_MAX_ENTRIES")
+    # accept the signed id/role claims of a token without loading the user,
+    # deleted users are then only locked out by the process that deleted them
+    trust_token_claims: bool = Field(False, alias="TRUST_TOKEN_CLAIMS")
+    job_storage_dir: str = Field("data/jobs", alias="JOB_STORAGE_DIR")
+    ingest_workers: int = Field(2, alias="INGEST_WORKERS")
+    job_stale_after_seconds: int = Field(300, alias="JOB_STALE_AFTER_SECONDS")
+    # edge property -> lowest zoom level at which vector tiles include it,
+    # properties that are not edge columns are read from extra_properties
+    tile_properties: dict[str, int] = Field(
+        default_factory=lambda: {"highway": 0, "ref": 10, "name": 13, "lanes": 15},
+        alias="TILE_PROPERTIES",
+    )
+    tile_max_zoom: int = Field(22, alias="TILE_MAX_ZOOM")
+    response_cache_max_bytes: int = Field(
+        256 * 1024 * 1024, alias="RESPONSE_CACHE_MAX_BYTES"
+    )
+    # larger responses are streamed without being cached
+    response_cache_max_entry_bytes: int = Field(
+        32 * 1024 * 1024, alias="RESPONSE_CACHE_MAX_ENTRY_BYTES"
+    )
+
+    # largest page of a paged edges read
+    edge_page_max_limit: int = Field(10000, alias="EDGE_PAGE_MAX_LIMIT")
+
+    # routing graphs kept in memory, by network version
+    graph_cache_max_bytes: int = Field(256 * 1024 * 1024, alias="GRAPH_CACHE_MAX_BYTES")
 
     @property
     def DB_URL(self) -> str:
@@ -19,6 +53,13 @@ class Settings(BaseSettings):
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
+    @property
+    def ASYNC_DB_URL(self) -> str:
+        return (
+            f"postgresql+psycopg://{self.db_user}:{self.db_password}"
+            f"@{self.db_host}:{self.db_port}/{self.db_name}"
+        )
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
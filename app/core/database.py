@@ -1,17 +1,33 @@
-from typing import Any, Generator
+from collections.abc import AsyncGenerator
 
 
 from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from app.core.config import settings
 import logging
 
-engine = create_engine(settings.DB_URL, echo=True, pool_pre_ping=True)
-
+# synchronous engine, used by the ingest workers (COPY) and at startup
+engine = create_engine(settings.DB_URL, echo=settings.db_echo, pool_pre_ping=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# asynchronous engine, used by the request handlers so queries never block
+# the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DB_URL, echo=settings.db_echo, pool_pre_ping=True
+)
+
+# objects stay usable after commit, lazy refreshes are not possible in async
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 logger = logging.getLogger(__name__)
 
 
@@ -19,13 +35,11 @@ class Base(DeclarativeBase):
     pass
 
 
-def get_db() -> Generator[Session, Any, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    except SQLAlchemyError:
-        db.rollback()
-        logger.exception("DB rollback due to error")
-        raise
-    finally:
-        db.close()
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError:
+            await db.rollback()
+            logger.exception("DB rollback due to error")
+            raise
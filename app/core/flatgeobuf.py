@@ -0,0 +1,51 @@
+"""
+Joins FlatGeobuf files rendered by PostGIS for consecutive batches of edges
+into a single file, so a large export can be sent while it is generated.
+
+A FlatGeobuf (https://flatgeobuf.org) without spatial index is the magic
+bytes, a size prefixed Header flatbuffer and size prefixed features. The
+batches share their header, so every batch after the first one only
+contributes its features. The header of the first batch counts only its own
+features, the count is reset to 0, which tells readers to read up to the end.
+"""
+
+import struct
+
+MEDIA_TYPE = "application/flatgeobuf"
+MAGIC_SIZE = 8
+# position of features_count among the fields of the Header table
+FEATURES_COUNT_FIELD = 8
+
+
+def header_end(data: bytes) -> int:
+    """The offset of the first feature of a FlatGeobuf without index."""
+    if len(data) < MAGIC_SIZE + 4 or not data.startswith(b"fgb"):
+        raise ValueError("Not a FlatGeobuf")
+    (header_size,) = struct.unpack_from("<I", data, MAGIC_SIZE)
+    return MAGIC_SIZE + 4 + header_size
+
+
+def clear_features_count(data: bytes) -> bytes:
+    """The FlatGeobuf with the features_count of its header set to unknown."""
+    buffer = bytearray(data)
+    header = MAGIC_SIZE + 4
+    (table_offset,) = struct.unpack_from("<I", buffer, header)
+    table = header + table_offset
+    (vtable_offset,) = struct.unpack_from("<i", buffer, table)
+    vtable = table - vtable_offset
+    (vtable_size,) = struct.unpack_from("<H", buffer, vtable)
+
+    entry = 4 + 2 * FEATURES_COUNT_FIELD
+    if entry < vtable_size:
+        (field_offset,) = struct.unpack_from("<H", buffer, vtable + entry)
+        # an absent field already has the default of 0
+        if field_offset:
+            struct.pack_into("<Q", buffer, table + field_offset, 0)
+    return bytes(buffer)
+
+
+def join_batch(data: bytes, first: bool) -> bytes:
+    """The part of a batch's FlatGeobuf that belongs in the joined file."""
+    if first:
+        return clear_features_count(data)
+    return data[header_end(data) :]
@@ -0,0 +1,167 @@
+import codecs
+import json
+from collections.abc import Iterator
+from typing import Any, BinaryIO
+
+SUPPORTED_GEOJSON_TYPES = {
+    "FeatureCollection",
+    "Feature",
+    "Point",
+    "LineString",
+    "Polygon",
+}
+
+CHUNK_SIZE = 64 * 1024  # bytes read from the upload per refill
+WHITESPACE = " \t\n\r"
+
+
+class GeoJSONError(ValueError):
+    """Raised when an uploaded document is not valid, supported GeoJSON."""
+
+
+class GeoJSONFeatureStream:
+    """
+    Incrementally parses a GeoJSON document from a binary file object.
+
+    Only the members of the top-level ``features`` array are streamed, every
+    other top-level member (``type``, ``name``, ``crs``, ...) is collected into
+    ``header``. At most one feature plus one read chunk is held in memory at a
+    time, so memory use does not depend on the size of the file.
+    """
+
+    def __init__(self, fileobj: BinaryIO, chunk_size: int = CHUNK_SIZE) -> None:
+        self._file = fileobj
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._consumed = False
+        self.header: dict[str, Any] = {}
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        if self._consumed:
+            raise RuntimeError("GeoJSON stream can only be iterated once")
+        self._consumed = True
+
+        self._expect("{", "Not a valid GeoJSON structure")
+        if self._peek() == "}":
+            self._pos += 1
+        else:
+            while True:
+                key = self._decode_value()
+                if not isinstance(key, str):
+                    raise GeoJSONError("Invalid JSON file")
+                self._expect(":", "Invalid JSON file")
+
+                if key == "features":
+                    yield from self._iter_features()
+                else:
+                    self.header[key] = self._decode_value()
+                    if key == "type":
+                        self._check_type()
+
+                if self._next_delimiter(",}") == "}":
+                    break
+
+        if self._peek() != "":
+            raise GeoJSONError("Invalid JSON file")
+        if "type" not in self.header:
+            raise GeoJSONError("Not a valid GeoJSON structure")
+
+    def batches(self, size: int) -> Iterator[list[dict[str, Any]]]:
+        """Yields the features in lists of at most ``size`` items."""
+        batch: list[dict[str, Any]] = []
+        for feature in self:
+            batch.append(feature)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # PARSING HELPERS
+    def _iter_features(self) -> Iterator[dict[str, Any]]:
+        self._expect("[", "Invalid JSON file")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            feature = self._decode_value()
+            if not isinstance(feature, dict):
+                raise GeoJSONError("Not a valid GeoJSON structure")
+            yield feature
+
+            if self._next_delimiter(",]") == "]":
+                return
+
+    def _check_type(self) -> None:
+        if self.header["type"] not in SUPPORTED_GEOJSON_TYPES:
+            raise GeoJSONError("Unsupported GeoJSON type")
+
+    def _decode_value(self) -> Any:
+        """Decodes the next JSON value, reading more input until it is complete."""
+        self._peek()
+        wanted = self._chunk_size
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise GeoJSONError("Invalid JSON file")
+            else:
+                # a value ending exactly at the end of the buffer may be a
+                # truncated number, only trust it once more input was seen
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+
+            # grow geometrically so huge values are not re-parsed per chunk
+            self._fill(wanted)
+            wanted *= 2
+
+    def _next_delimiter(self, allowed: str) -> str:
+        char = self._peek()
+        if char == "" or char not in allowed:
+            raise GeoJSONError("Invalid JSON file")
+        self._pos += 1
+        return char
+
+    def _expect(self, char: str, message: str) -> None:
+        if self._peek() != char:
+            raise GeoJSONError(message)
+        self._pos += 1
+
+    def _peek(self) -> str:
+        """Skips whitespace and returns the next character, or "" at the end."""
+        while True:
+            while (
+                self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if self._eof:
+                return ""
+            self._fill(self._chunk_size)
+
+    def _fill(self, size: int) -> None:
+        if self._eof:
+            return
+
+        # drop what has already been parsed before reading more
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+
+        target = len(self._buffer) + size
+        while len(self._buffer) < target:
+            chunk = self._file.read(self._chunk_size)
+            try:
+                self._buffer += self._decoder.decode(chunk, final=not chunk)
+            except UnicodeDecodeError:
+                raise GeoJSONError("Invalid JSON file")
+            if not chunk:
+                self._eof = True
+                return
@@ -0,0 +1,109 @@
+"""
+Writes edges as GeoParquet (https://geoparquet.org) while they are read, one
+row group per batch of rows, so the file never has to be held in memory.
+"""
+
+import io
+import json
+from collections.abc import Sequence
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MEDIA_TYPE = "application/vnd.apache.parquet"
+GEOPARQUET_VERSION = "1.1.0"
+
+# arrow types of the typed edge columns, see app.db.edge_exports.EXPORT_COLUMNS
+EDGE_FIELDS = [
+    ("id", pa.int32()),
+    ("name", pa.string()),
+    ("ref", pa.string()),
+    ("lanes", pa.string()),
+    ("oneway", pa.bool_()),
+    ("length", pa.float64()),
+    ("width", pa.list_(pa.float64())),
+    ("tunnel", pa.string()),
+    ("highway", pa.string()),
+    ("is_current", pa.bool_()),
+    ("valid_from", pa.timestamp("us", tz="UTC")),
+    ("valid_to", pa.timestamp("us", tz="UTC")),
+    ("fingerprint", pa.string()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("network_id", pa.int32()),
+    ("user_id", pa.int32()),
+    ("source", pa.int32()),
+    ("target", pa.int32()),
+]
+
+
+def edge_schema(property_columns: list[str]) -> pa.Schema:
+    """
+    The schema of an edges file: the typed columns, the WKB geometry and one
+    string column per flattened extra_properties key. Without a ``crs`` the
+    geometry is in OGC:CRS84, i.e. EPSG:4326 in lon/lat order like the API.
+    """
+    geo = {
+        "version": GEOPARQUET_VERSION,
+        "primary_column": "geometry",
+        "columns": {"geometry": {"encoding": "WKB", "geometry_types": []}},
+    }
+    fields = [
+        *EDGE_FIELDS,
+        ("geometry", pa.binary()),
+        *((name, pa.string()) for name in property_columns),
+    ]
+    return pa.schema(fields, metadata={"geo": json.dumps(geo)})
+
+
+class _Drain(io.RawIOBase):
+    """A write-only file whose content is taken out as it is written."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class GeoParquetStream:
+    """
+    Turns batches of rows into the bytes of a GeoParquet file. ``write``
+    returns the bytes of a row group, ``close`` the footer.
+    """
+
+    def __init__(self, property_columns: list[str]) -> None:
+        self.schema = edge_schema(property_columns)
+        self._sink = _Drain()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression="zstd")
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        columns = list(zip(*rows, strict=True))
+        batch = pa.record_batch(
+            [
+                pa.array(values, type=field.type)
+                for values, field in zip(columns, self.schema, strict=True)
+            ],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch)
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
@@ -0,0 +1,224 @@
+"""
+Summary statistics of a network version: edge count, total length and lane
+kilometres, overall and per ``highway`` class, and bounding box.
+
+Statistics are kept per version and maintained from deltas: an update adds
+the statistics of the edges it inserts and subtracts those of the edges it
+retires, so only the changed edges are ever measured. The bounding box is
+the one figure that cannot be subtracted, it is measured again when an edge
+on its boundary is retired.
+"""
+
+import math
+import re
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any
+
+import numpy as np
+import shapely
+from numpy.typing import NDArray
+
+from app.core.spatial_filter import Bbox
+
+# radius of the sphere PostGIS measures geography on without the spheroid,
+# the migration that added statistics measured the existing edges with it
+EARTH_RADIUS = 6371008.7714150598
+
+# the leading number of a lanes value such as "2" or "2,3"
+_LANES = re.compile(r"^\s*(\d+(?:\.\d+)?)")
+
+_LINEAR_TYPES = [
+    shapely.GeometryType.LINESTRING.value,
+    shapely.GeometryType.MULTILINESTRING.value,
+]
+
+
+@dataclass
+class HighwayStats:
+    edge_count: int = 0
+    # metres
+    length: float = 0.0
+    lane_km: float = 0.0
+
+
+@dataclass
+class NetworkStats:
+    """The statistics of a network version, or of a set of its edges."""
+
+    edge_count: int = 0
+    # metres
+    length: float = 0.0
+    lane_km: float = 0.0
+    highways: dict[str, HighwayStats] = field(default_factory=dict)
+    bbox: Bbox | None = None
+
+    def __add__(self, other: "NetworkStats") -> "NetworkStats":
+        highways = {key: replace(value) for key, value in self.highways.items()}
+        for key, value in other.highways.items():
+            total = highways.setdefault(key, HighwayStats())
+            total.edge_count += value.edge_count
+            total.length += value.length
+            total.lane_km += value.lane_km
+        bbox = self.bbox or other.bbox
+        if self.bbox is not None and other.bbox is not None:
+            bbox = (
+                min(self.bbox[0], other.bbox[0]),
+                min(self.bbox[1], other.bbox[1]),
+                max(self.bbox[2], other.bbox[2]),
+                max(self.bbox[3], other.bbox[3]),
+            )
+        return NetworkStats(
+            self.edge_count + other.edge_count,
+            self.length + other.length,
+            self.lane_km + other.lane_km,
+            highways,
+            bbox,
+        )
+
+    def __sub__(self, other: "NetworkStats") -> "NetworkStats":
+        """
+        The statistics without the edges of ``other``. The bounding box stays
+        as it is, see ``shrinks_bbox``.
+        """
+        highways = {key: replace(value) for key, value in self.highways.items()}
+        for key, value in other.highways.items():
+            total = highways.setdefault(key, HighwayStats())
+            total.edge_count -= value.edge_count
+            total.length -= value.length
+            total.lane_km -= value.lane_km
+            if total.edge_count <= 0:
+                del highways[key]
+        edge_count = self.edge_count - other.edge_count
+        if edge_count <= 0:
+            # no rounding errors left behind in an empty version
+            return NetworkStats()
+        return NetworkStats(
+            edge_count,
+            self.length - other.length,
+            self.lane_km - other.lane_km,
+            highways,
+            self.bbox,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """The statistics as the columns of a road_network_stats row."""
+        return {
+            "edge_count": self.edge_count,
+            "length": self.length,
+            "lane_km": self.lane_km,
+            "highways": {key: asdict(value) for key, value in self.highways.items()},
+            "bbox": None if self.bbox is None else list(self.bbox),
+        }
+
+    @classmethod
+    def from_row(cls, row: Any) -> "NetworkStats":
+        """The statistics of a road_network_stats row."""
+        bbox = row.bbox
+        return cls(
+            edge_count=row.edge_count,
+            length=row.length,
+            lane_km=row.lane_km,
+            highways={
+                key: HighwayStats(**value) for key, value in row.highways.items()
+            },
+            bbox=None if bbox is None else (bbox[0], bbox[1], bbox[2], bbox[3]),
+        )
+
+    def shrinks_bbox(self, removed: "NetworkStats") -> bool:
+        """Whether removing edges with ``removed`` statistics may shrink the bbox."""
+        if self.bbox is None or removed.bbox is None:
+            return False
+        return (
+            removed.bbox[0] <= self.bbox[0]
+            or removed.bbox[1] <= self.bbox[1]
+            or removed.bbox[2] >= self.bbox[2]
+            or removed.bbox[3] >= self.bbox[3]
+        )
+
+
+def geodesic_lengths(geometries: NDArray[np.object_]) -> NDArray[np.float64]:
+    """
+    The length in metres of every geometry on the sphere, like
+    ST_Length(geography, false): the sum of the lengths of its parts, 0 for
+    anything but (Multi)LineStrings.
+    """
+    linear = np.isin(shapely.get_type_id(geometries), _LINEAR_TYPES)
+    parts, owners = shapely.get_parts(geometries, return_index=True)
+    coords, index = shapely.get_coordinates(parts, return_index=True)
+    lengths = np.zeros(len(geometries), dtype=np.float64)
+    if len(coords) < 2:
+        return lengths
+    # haversine between consecutive coordinates of the same part
+    lon, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    same = index[1:] == index[:-1]
+    a = (
+        np.sin((lat[1:] - lat[:-1]) / 2) ** 2
+        + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin((lon[1:] - lon[:-1]) / 2) ** 2
+    )
+    segments = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    np.add.at(lengths, owners[index[1:][same]], segments[same])
+    return np.where(linear, lengths, 0.0)
+
+
+def _length(value: Any) -> float | None:
+    try:
+        length = float(value)
+    except (TypeError, ValueError):
+        return None
+    return length if math.isfinite(length) else None
+
+
+def _lanes(value: str | None) -> float:
+    match = _LANES.match(value) if value else None
+    # an edge without a lane count is a single lane
+    return float(match.group(1)) if match else 1.0
+
+
+def measure_edges(
+    geometries: NDArray[np.object_],
+    lengths: Sequence[Any],
+    lanes: Sequence[str | None],
+    highways: Sequence[Any],
+) -> NetworkStats:
+    """
+    The statistics of a set of edges from their geometries and length, lanes
+    and highway properties. Edges without a length are measured on the
+    sphere, only string highway values count as a class.
+    """
+    if not len(geometries):
+        return NetworkStats()
+    measured = [_length(value) for value in lengths]
+    if any(value is None for value in measured):
+        fallback = geodesic_lengths(geometries).tolist()
+        measured = [
+            fallback[i] if value is None else value for i, value in enumerate(measured)
+        ]
+
+    stats = NetworkStats(edge_count=len(geometries))
+    for length, lane_count, highway in zip(measured, lanes, highways, strict=True):
+        lane_km = length * _lanes(lane_count) / 1000
+        stats.length += length
+        stats.lane_km += lane_km
+        if isinstance(highway, str):
+            total = stats.highways.setdefault(highway, HighwayStats())
+            total.edge_count += 1
+            total.length += length
+            total.lane_km += lane_km
+
+    bounds = shapely.bounds(geometries)
+    if not np.isnan(bounds).all():
+        minx, miny = np.nanmin(bounds[:, :2], axis=0).tolist()
+        maxx, maxy = np.nanmax(bounds[:, 2:], axis=0).tolist()
+        stats.bbox = (minx, miny, maxx, maxy)
+    return stats
+
+
+def stats_summary(row: Any | None) -> dict[str, Any]:
+    """
+    The statistics of a road_network_stats row with the time of its version,
+    empty statistics without a time if there is no row.
+    """
+    if row is None:
+        return {"valid_from": None, **NetworkStats().as_dict()}
+    return {"valid_from": row.valid_from, **NetworkStats.from_row(row).as_dict()}
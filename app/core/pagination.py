@@ -0,0 +1,53 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True)
+class EdgeCursor:
+    """
+    Where a paged read of a network continues: after the edge ``after_id`` of
+    the network version at ``snapshot``. Every page of a read shows the same
+    version, however the network changes in between.
+    """
+
+    network_id: int
+    after_id: int
+    snapshot: datetime
+
+
+@dataclass(frozen=True)
+class EdgePage:
+    body: bytes
+    next_url: str | None
+    # content coding of the body, None if it is not compressed
+    encoding: str | None = None
+
+
+def encode_cursor(cursor: EdgeCursor) -> str:
+    data = {
+        "n": cursor.network_id,
+        "a": cursor.after_id,
+        "t": cursor.snapshot.isoformat(),
+    }
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(value: str) -> EdgeCursor:
+    """Decodes a cursor of ``encode_cursor``, raises ValueError if invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        data = json.loads(raw)
+        cursor = EdgeCursor(
+            network_id=int(data["n"]),
+            after_id=int(data["a"]),
+            snapshot=datetime.fromisoformat(data["t"]),
+        )
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError):
+        raise ValueError("Invalid cursor")
+    if cursor.snapshot.tzinfo is None:
+        raise ValueError("Invalid cursor")
+    return cursor
@@ -0,0 +1,212 @@
+"""
+Shortest paths over the edges of a network version.
+
+A version is turned into a compressed sparse row (CSR) graph: the arcs
+leaving each vertex are a slice of flat numpy arrays, a few dozen bytes per
+edge however large the network. Graphs are built once per network version
+and kept in ``graph_cache``. Edges are weighted by their length, oneway edges
+are only traversed from their source to their target node.
+"""
+
+import heapq
+import math
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.core.cache import SizedCache
+from app.core.config import settings
+from app.core.spatial_filter import Point
+
+
+@dataclass(frozen=True)
+class Adjacency:
+    """The arcs of a graph grouped by vertex, ``heads[indptr[v]:indptr[v + 1]]``."""
+
+    indptr: NDArray[np.int64]
+    heads: NDArray[np.int64]
+    weights: NDArray[np.float64]
+    edge_ids: NDArray[np.int64]
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.indptr.nbytes
+            + self.heads.nbytes
+            + self.weights.nbytes
+            + self.edge_ids.nbytes
+        )
+
+
+def adjacency(
+    vertex_count: int,
+    tails: NDArray[np.int64],
+    heads: NDArray[np.int64],
+    weights: NDArray[np.float64],
+    edge_ids: NDArray[np.int64],
+) -> Adjacency:
+    order = np.argsort(tails, kind="stable")
+    counts = np.bincount(tails, minlength=vertex_count)
+    return Adjacency(
+        indptr=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        heads=heads[order],
+        weights=weights[order],
+        edge_ids=edge_ids[order],
+    )
+
+
+@dataclass(frozen=True)
+class RoadGraph:
+    """
+    A network version as a directed graph. Vertices are the nodes with edges,
+    ``forward`` holds the arcs leaving a vertex and ``backward`` the arcs
+    entering it, for the search from the target.
+    """
+
+    node_ids: NDArray[np.int64]
+    coords: NDArray[np.float64]
+    forward: Adjacency
+    backward: Adjacency
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.node_ids.nbytes
+            + self.coords.nbytes
+            + self.forward.nbytes
+            + self.backward.nbytes
+        )
+
+    def nearest_vertex(self, point: Point) -> int | None:
+        """The vertex closest to a lon/lat point, None if the graph is empty."""
+        if not len(self.node_ids):
+            return None
+        lon, lat = point
+        # equirectangular distances, exact enough to tell nodes apart locally
+        dx = (self.coords[:, 0] - lon) * math.cos(math.radians(lat))
+        dy = self.coords[:, 1] - lat
+        return int(np.argmin(dx * dx + dy * dy))
+
+
+def build_graph(
+    node_ids: NDArray[np.int64],
+    node_coords: NDArray[np.float64],
+    sources: NDArray[np.int64],
+    targets: NDArray[np.int64],
+    weights: NDArray[np.float64],
+    oneway: NDArray[np.bool_],
+    edge_ids: NDArray[np.int64],
+) -> RoadGraph:
+    """
+    Builds the graph of a network version from the node ids and coordinates
+    of the network, sorted by id, and the source and target node ids, weight,
+    oneway flag and id of its edges.
+    """
+    vertex_nodes, vertices = np.unique(
+        np.concatenate([sources, targets]), return_inverse=True
+    )
+    tails, heads = np.split(vertices.astype(np.int64), 2)
+    coords = node_coords[np.searchsorted(node_ids, vertex_nodes)]
+
+    # every edge is an arc from source to target, two way edges also the other
+    # way round
+    two_way = ~oneway
+    arc_tails = np.concatenate([tails, heads[two_way]])
+    arc_heads = np.concatenate([heads, tails[two_way]])
+    arc_weights = np.concatenate([weights, weights[two_way]])
+    arc_edges = np.concatenate([edge_ids, edge_ids[two_way]])
+
+    count = len(vertex_nodes)
+    return RoadGraph(
+        node_ids=vertex_nodes.astype(np.int64),
+        coords=coords,
+        forward=adjacency(count, arc_tails, arc_heads, arc_weights, arc_edges),
+        backward=adjacency(count, arc_heads, arc_tails, arc_weights, arc_edges),
+    )
+
+
+@dataclass(frozen=True)
+class Route:
+    length: float
+    # ids of the edges from the source to the target, in travel order
+    edge_ids: list[int]
+
+
+def shortest_path(graph: RoadGraph, source: int, target: int) -> Route | None:
+    """
+    The shortest route between two vertices by bidirectional Dijkstra, None
+    if the target cannot be reached. The searches from both ends alternate
+    by the smaller tentative distance and stop once their frontiers together
+    exceed the best route found, which settles far fewer vertices than a
+    search from one end.
+    """
+    if source == target:
+        return Route(0.0, [])
+
+    sides = [graph.forward, graph.backward]
+    # memoryviews index the arrays at the speed of Python lists
+    views = [
+        (
+            memoryview(side.indptr),
+            memoryview(side.heads),
+            memoryview(side.weights),
+            memoryview(side.edge_ids),
+        )
+        for side in sides
+    ]
+    count = len(graph.node_ids)
+    distances = [[math.inf] * count, [math.inf] * count]
+    distances[0][source] = 0.0
+    distances[1][target] = 0.0
+    # vertex -> (previous vertex, edge) on the way from the side's start
+    parents: list[dict[int, tuple[int, int]]] = [{}, {}]
+    heaps: list[list[tuple[float, int]]] = [[(0.0, source)], [(0.0, target)]]
+    best = math.inf
+    meeting = -1
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        distance, vertex = heapq.heappop(heaps[side])
+        own, other = distances[side], distances[1 - side]
+        if distance > own[vertex]:
+            continue
+
+        indptr, heads, weights, edge_ids = views[side]
+        parent = parents[side]
+        for arc in range(indptr[vertex], indptr[vertex + 1]):
+            head = heads[arc]
+            candidate = distance + weights[arc]
+            if candidate < own[head]:
+                own[head] = candidate
+                parent[head] = (vertex, edge_ids[arc])
+                heapq.heappush(heaps[side], (candidate, head))
+                # every improvement on either side is checked against the
+                # other side, so the best meeting point is never missed
+                if candidate + other[head] < best:
+                    best = candidate + other[head]
+                    meeting = head
+
+    if meeting < 0:
+        return None
+
+    forward_edges = []
+    vertex = meeting
+    while vertex != source:
+        vertex, edge_id = parents[0][vertex]
+        forward_edges.append(edge_id)
+    backward_edges = []
+    vertex = meeting
+    while vertex != target:
+        vertex, edge_id = parents[1][vertex]
+        backward_edges.append(edge_id)
+    return Route(best, forward_edges[::-1] + backward_edges)
+
+
+# graphs by network id and the time of the last change of the version
+graph_cache: SizedCache[tuple[int, datetime | None], RoadGraph] = SizedCache(
+    max_bytes=settings.graph_cache_max_bytes, size=lambda graph: graph.nbytes
+)
@@ -1,5 +1,55 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
 from bcrypt import checkpw, gensalt, hashpw
 
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class HashingPoolBusyError(Exception):
+    """Raised when too many password operations are already waiting."""
+
+
+class HashingPool:
+    """
+    Runs bcrypt off the event loop on a few dedicated threads (bcrypt releases
+    the GIL). At most ``workers + max_queue`` operations are admitted at once,
+    further ones are rejected right away instead of queueing up behind a
+    burst of logins.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.limit = workers + max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+
+    async def run(self, fn: Callable[..., T], *args: object) -> T:
+        # only touched from the event loop thread, no lock needed
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            raise HashingPoolBusyError("Too many password operations in progress")
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+
+hashing_pool = HashingPool(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
 
 class Hasher:
     @staticmethod
@@ -14,3 +64,15 @@ class Hasher:
             )
         except ValueError:
             return False
+
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """``hash_password`` on the hashing pool, may raise HashingPoolBusyError."""
+        return await hashing_pool.run(Hasher.hash_password, password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """``verify_password`` on the hashing pool, may raise HashingPoolBusyError."""
+        return await hashing_pool.run(
+            Hasher.verify_password, plain_password, hashed_password
+        )
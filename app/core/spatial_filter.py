@@ -0,0 +1,59 @@
+import json
+
+import shapely
+from shapely.errors import ShapelyError
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+
+Bbox = tuple[float, float, float, float]
+Point = tuple[float, float]
+
+POLYGONAL_TYPES = ("Polygon", "MultiPolygon")
+
+
+def parse_bbox(value: str) -> Bbox:
+    """Parses ``minx,miny,maxx,maxy`` into a tuple, raises ValueError if invalid."""
+    parts = value.split(",")
+    if len(parts) != 4:
+        raise ValueError("bbox must be minx,miny,maxx,maxy")
+    try:
+        minx, miny, maxx, maxy = (float(part) for part in parts)
+    except ValueError:
+        raise ValueError("bbox coordinates must be numbers")
+    if minx > maxx or miny > maxy:
+        raise ValueError("bbox minimum must not exceed its maximum")
+    return minx, miny, maxx, maxy
+
+
+def parse_point(value: str, name: str = "point") -> Point:
+    """Parses ``lon,lat`` into a tuple, raises ValueError if invalid."""
+    parts = value.split(",")
+    try:
+        if len(parts) != 2:
+            raise ValueError
+        lon, lat = (float(part) for part in parts)
+    except ValueError:
+        raise ValueError(f"{name} must be lon,lat")
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        raise ValueError(f"{name} must be a lon,lat in EPSG:4326")
+    return lon, lat
+
+
+def parse_area(value: str) -> BaseGeometry:
+    """
+    Parses a polygon given either as WKT or as a GeoJSON geometry, raises
+    ValueError if it is neither or not a valid (multi)polygon.
+    """
+    try:
+        if value.lstrip().startswith("{"):
+            geometry = shape(json.loads(value))
+        else:
+            geometry = shapely.from_wkt(value)
+    except (ValueError, TypeError, KeyError, AttributeError, ShapelyError):
+        raise ValueError("intersects must be a WKT or GeoJSON polygon")
+
+    if geometry.geom_type not in POLYGONAL_TYPES:
+        raise ValueError("intersects must be a WKT or GeoJSON polygon")
+    if not geometry.is_valid:
+        raise ValueError("intersects polygon is not valid")
+    return geometry
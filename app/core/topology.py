@@ -0,0 +1,69 @@
+"""
+Nodes of the node-edge model of a road network: the endpoints of its edges,
+snapped to a grid so that edges whose ends meet share a node.
+
+Grid cells are addressed by integer keys, a node is stored at the corner of
+its cell. The snapping matches PostGIS' ST_SnapToGrid, which the migration
+that introduced nodes used for the existing edges.
+"""
+
+import numpy as np
+import shapely
+from numpy.typing import NDArray
+
+from app.core.edge_batch import SRID
+
+# size of a grid cell in degrees, about a centimetre
+NODE_GRID = 1e-7
+
+# a key is the lon cell in the upper 32 bits and the lat cell in the lower 31,
+# both offset to be positive
+_LON_OFFSET = 2**31
+_LAT_OFFSET = 2**30
+_LAT_BITS = 31
+
+_LINEAR_TYPES = [
+    shapely.GeometryType.LINESTRING.value,
+    shapely.GeometryType.MULTILINESTRING.value,
+]
+
+
+def grid_keys(coords: NDArray[np.float64]) -> NDArray[np.int64]:
+    """The grid cells of (n, 2) lon/lat coordinates as single int64 keys."""
+    cells = np.rint(coords[:, :2] / NODE_GRID).astype(np.int64)
+    return ((cells[:, 0] + _LON_OFFSET) << _LAT_BITS) | (cells[:, 1] + _LAT_OFFSET)
+
+
+def grid_points(keys: NDArray[np.int64]) -> NDArray[np.float64]:
+    """The (n, 2) coordinates of the nodes of grid keys, see ``grid_keys``."""
+    lon = (keys >> _LAT_BITS) - _LON_OFFSET
+    lat = (keys & (2**_LAT_BITS - 1)) - _LAT_OFFSET
+    return np.column_stack([lon, lat]) * NODE_GRID
+
+
+def edge_endpoints(
+    geometries: NDArray[np.object_],
+) -> tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.bool_]]:
+    """
+    The grid keys of the first and last point of every edge, and which edges
+    have nodes at all: non-empty LineStrings and MultiLineStrings, the ends of
+    a MultiLineString are the start of its first and the end of its last part.
+    """
+    counts = shapely.get_num_coordinates(geometries)
+    linear = np.isin(shapely.get_type_id(geometries), _LINEAR_TYPES) & (counts > 0)
+
+    coords = shapely.get_coordinates(geometries)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    # empty and non-linear edges get the key of cell 0, masked by ``linear``
+    first = np.zeros(len(geometries), dtype=np.int64)
+    last = np.zeros(len(geometries), dtype=np.int64)
+    first[linear] = grid_keys(coords[starts[linear]])
+    last[linear] = grid_keys(coords[ends[linear] - 1])
+    return first, last, linear
+
+
+def node_wkb(keys: NDArray[np.int64]) -> list[str]:
+    """Hex encoded EWKB of the node points of grid keys."""
+    points = shapely.set_srid(shapely.points(grid_points(keys)), SRID)
+    return [value.hex() for value in shapely.to_wkb(points, include_srid=True)]
@@ -0,0 +1,45 @@
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def start_workers() -> ProcessPoolExecutor:
+    """
+    Starts the process pool used for CPU heavy background work (ingest jobs).
+    Processes are spawned rather than forked so they never share the parent's
+    database connections.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.ingest_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def submit(fn: Callable[..., Any], *args: Any) -> Future[Any]:
+    """Runs ``fn(*args)`` in the worker pool, starting the pool if needed."""
+    future = start_workers().submit(fn, *args)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def shutdown_workers() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _log_failure(future: Future[Any]) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Background job crashed", exc_info=future.exception())
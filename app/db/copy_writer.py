@@ -0,0 +1,101 @@
+import io
+import json
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+# Column order of the rows handed to copy_road_edges
+ROAD_EDGE_COPY_COLUMNS = (
+    "name",
+    "ref",
+    "lanes",
+    "oneway",
+    "length",
+    "width",
+    "tunnel",
+    "extra_properties",
+    "geometry",
+    "is_current",
+    "timestamp",
+    "network_id",
+    "user_id",
+    "fingerprint",
+    "valid_from",
+    "source_node_id",
+    "target_node_id",
+)
+
+COPY_ROAD_EDGES_SQL = (
+    f"COPY road_edges ({', '.join(ROAD_EDGE_COPY_COLUMNS)}) FROM STDIN"
+)
+
+# Column order of the rows handed to copy_road_nodes
+ROAD_NODE_COPY_COLUMNS = ("id", "network_id", "geometry")
+
+COPY_ROAD_NODES_SQL = (
+    f"COPY road_nodes ({', '.join(ROAD_NODE_COPY_COLUMNS)}) FROM STDIN"
+)
+
+# characters that must be escaped in PostgreSQL's COPY text format
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value: Any) -> str:
+    """Renders a single value in COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        # only used for the float[] width column
+        items = ",".join("NULL" if v is None else repr(float(v)) for v in value)
+        return "{" + items + "}"
+    if isinstance(value, dict):
+        return json.dumps(value).translate(_COPY_ESCAPES)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _copy_rows(db: Session, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+        count += 1
+
+    if not count:
+        return 0
+
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+    return count
+
+
+def copy_road_edges(db: Session, rows: Iterable[Sequence[Any]]) -> int:
+    """
+    Streams edge rows into road_edges with COPY ... FROM STDIN, inside the
+    session's current transaction.
+
+    Every row holds the values of ROAD_EDGE_COPY_COLUMNS in order, with the
+    geometry as hex encoded EWKB. Returns the number of rows written.
+    """
+    return _copy_rows(db, COPY_ROAD_EDGES_SQL, rows)
+
+
+def copy_road_nodes(db: Session, rows: Iterable[Sequence[Any]]) -> int:
+    """
+    Streams node rows into road_nodes like ``copy_road_edges``, in
+    ROAD_NODE_COPY_COLUMNS order. The ids are taken from the sequence of
+    road_nodes beforehand, so edges can point to the nodes right away.
+    """
+    return _copy_rows(db, COPY_ROAD_NODES_SQL, rows)
@@ -0,0 +1,142 @@
+"""
+Queries behind the binary export formats of the edges endpoint. They select
+the same edges as ``select_edge_features``, as typed columns rather than
+GeoJSON text.
+"""
+
+from datetime import datetime
+from typing import Any
+
+from shapely.geometry.base import BaseGeometry
+from sqlalchemy import Select, String, Text, cast, func, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.spatial_filter import Bbox
+from app.db.edge_queries import edge_geometry, edge_selection
+from app.db.models import RoadEdge
+
+# the typed columns of an edge in export order, geometry and the flattened
+# extra_properties follow them
+EXPORT_COLUMNS: dict[str, Any] = {
+    "id": RoadEdge.id,
+    "name": RoadEdge.name,
+    "ref": RoadEdge.ref,
+    "lanes": RoadEdge.lanes,
+    "oneway": RoadEdge.oneway,
+    "length": RoadEdge.length,
+    "width": RoadEdge.width,
+    "tunnel": RoadEdge.tunnel,
+    "highway": RoadEdge.highway,
+    "is_current": RoadEdge.is_current,
+    "valid_from": RoadEdge.valid_from,
+    "valid_to": RoadEdge.valid_to,
+    "fingerprint": RoadEdge.fingerprint,
+    "timestamp": RoadEdge.timestamp,
+    "network_id": RoadEdge.network_id,
+    "user_id": RoadEdge.user_id,
+    "source": RoadEdge.source_node_id,
+    "target": RoadEdge.target_node_id,
+}
+
+
+def export_geometry(
+    simplify: float | None = None, precision: int | None = None
+) -> ColumnElement[Any]:
+    """
+    The geometry of an edge for binary formats. ``precision`` zeroes the
+    bits of the coordinates below that many decimals, which does not shrink
+    a double but lets it compress well.
+    """
+    geometry = edge_geometry(simplify)
+    if precision is not None:
+        geometry = func.ST_QuantizeCoordinates(geometry, precision)
+    return geometry
+
+
+def property_column_name(key: str) -> str:
+    """The column of a flattened extra_properties key, prefixed if it is taken."""
+    if key in EXPORT_COLUMNS or key == "geometry":
+        return f"extra_properties.{key}"
+    return key
+
+
+def select_edge_property_keys(
+    network_id: int,
+    timestamp: datetime | None = None,
+    bbox: Bbox | None = None,
+    area: BaseGeometry | None = None,
+    condition: ColumnElement[bool] | None = None,
+) -> Select[tuple[str]]:
+    """Selects the distinct extra_properties keys of the selected edges."""
+    keys = func.jsonb_object_keys(RoadEdge.extra_properties)
+    return (
+        select(keys)
+        .where(*edge_selection(network_id, timestamp, bbox, area, condition))
+        .distinct()
+    )
+
+
+def select_edge_rows(
+    network_id: int,
+    keys: list[str],
+    timestamp: datetime | None = None,
+    bbox: Bbox | None = None,
+    area: BaseGeometry | None = None,
+    condition: ColumnElement[bool] | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+) -> Select[Any]:
+    """
+    Selects the typed columns, the WKB geometry and the given extra_properties
+    keys (as text) of the selected edges, in that order.
+    """
+    geometry = func.ST_AsBinary(export_geometry(simplify, precision))
+    return select(
+        *EXPORT_COLUMNS.values(),
+        geometry.label("geometry"),
+        *(RoadEdge.extra_properties[key].astext for key in keys),
+    ).where(*edge_selection(network_id, timestamp, bbox, area, condition))
+
+
+def select_edge_flatgeobuf(
+    network_id: int,
+    snapshot: datetime,
+    after_id: int,
+    limit: int,
+    bbox: Bbox | None = None,
+    area: BaseGeometry | None = None,
+    condition: ColumnElement[bool] | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+) -> Select[tuple[bytes | None, int | None]]:
+    """
+    Selects a FlatGeobuf of up to ``limit`` edges of a network version that
+    follow the edge ``after_id``, rendered by PostGIS, and the last edge id
+    in it. Strings are passed as text, the one string type every PostGIS
+    version maps, and widths and extra_properties as JSON text.
+    """
+    columns = {
+        **{
+            name: cast(column, Text) if isinstance(column.type, String) else column
+            for name, column in EXPORT_COLUMNS.items()
+        },
+        "width": cast(func.to_json(RoadEdge.width), Text),
+        "extra_properties": cast(RoadEdge.extra_properties, Text),
+    }
+    edges = (
+        select(
+            *(column.label(name) for name, column in columns.items()),
+            export_geometry(simplify, precision).label("geometry"),
+        )
+        .where(
+            *edge_selection(network_id, snapshot, bbox, area, condition),
+            RoadEdge.id > after_id,
+        )
+        .order_by(RoadEdge.id)
+        .limit(limit)
+        .subquery("edges")
+    )
+    return select(
+        func.ST_AsFlatGeobuf(edges.table_valued(), False, "geometry"),
+        func.max(edges.c.id),
+    )
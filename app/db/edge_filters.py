@@ -0,0 +1,248 @@
+"""
+Filter expressions over edge attributes, compiled to SQL.
+
+    highway in (primary, secondary) and oneway = true and lanes >= 2
+
+A comparison is ``<field> <op> <value>`` with ``=``, ``!=``, ``<``, ``<=``,
+``>``, ``>=``, ``<field> in (<value>, ...)`` or ``<field> is [not] null``.
+Comparisons combine with ``and``, ``or``, ``not`` and parentheses. Values are
+numbers, ``true``/``false``, quoted strings or bare words (strings).
+
+Fields that are columns of ``road_edges`` compare against the column, every
+other field is a key of ``extra_properties``. Equality on keys compiles to
+JSONB containment (``@>``), which the GIN index on ``extra_properties``
+answers; the values then compare with their JSON type, ``lanes = 2`` does not
+match the string ``"2"``.
+"""
+
+import re
+from typing import Any
+
+from sqlalchemy import Boolean, Float, Integer, Numeric, and_, case, not_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.models import RoadEdge
+
+# typed columns that can be filtered on, highway is generated from
+# extra_properties
+FILTER_COLUMNS: dict[str, Any] = {
+    "id": RoadEdge.id,
+    "name": RoadEdge.name,
+    "ref": RoadEdge.ref,
+    "lanes": RoadEdge.lanes,
+    "oneway": RoadEdge.oneway,
+    "length": RoadEdge.length,
+    "tunnel": RoadEdge.tunnel,
+    "highway": RoadEdge.highway,
+    # the edges at a node, e.g. "source = 12 or target = 12"
+    "source": RoadEdge.source_node_id,
+    "target": RoadEdge.target_node_id,
+}
+
+MAX_FILTER_LENGTH = 2000
+
+_TOKEN = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)(?![\w.])
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<op><=|>=|!=|=|<|>|\(|\)|,)
+      | (?P<word>[A-Za-z_][\w:.\-]*)
+    )""",
+    re.VERBOSE,
+)
+_NUMERIC_TEXT = r"^\s*-?\d+(\.\d+)?\s*$"
+_KEYWORDS = {"and", "or", "not", "in", "is", "null", "true", "false"}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _tokenize(text: str) -> list[tuple[str, Any]]:
+    tokens: list[tuple[str, Any]] = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise FilterError(f"Unexpected input at position {position} of filter")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            is_float = "." in value or "e" in value.lower()
+            tokens.append(("value", float(value) if is_float else int(value)))
+        elif kind == "string":
+            tokens.append(("value", re.sub(r"\\(.)", r"\1", value[1:-1])))
+        elif kind == "word" and value.lower() in _KEYWORDS:
+            keyword = value.lower()
+            if keyword in ("true", "false"):
+                tokens.append(("value", keyword == "true"))
+            else:
+                tokens.append(("keyword", keyword))
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+def _as_number(text: ColumnElement[Any]) -> ColumnElement[Any]:
+    """Text as a number, NULL where it is not numeric (e.g. lanes "2,3")."""
+    return case((text.op("~")(_NUMERIC_TEXT), text.cast(Numeric)), else_=None)
+
+
+def _column_comparison(
+    name: str, column: Any, op: str, values: list[Any]
+) -> ColumnElement[bool]:
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        if op not in ("=", "!=", "in") or not all(isinstance(v, bool) for v in values):
+            raise FilterError(f"{name} can only be compared to true or false")
+    elif isinstance(column_type, (Integer, Float)):
+        if not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) for v in values
+        ):
+            raise FilterError(f"{name} can only be compared to numbers")
+    elif op in ("<", "<=", ">", ">="):
+        if not isinstance(values[0], (int, float)) or isinstance(values[0], bool):
+            raise FilterError(f"{name} can only be ordered against numbers")
+        column = _as_number(column)
+    else:
+        values = [str(v).lower() if isinstance(v, bool) else str(v) for v in values]
+
+    if op == "in":
+        return column.in_(values)
+    return _compare(column, op, values[0])
+
+
+def _key_comparison(key: str, op: str, values: list[Any]) -> ColumnElement[bool]:
+    properties = RoadEdge.extra_properties
+    if op == "in":
+        return or_(*(properties.contains({key: value}) for value in values))
+    if op == "=":
+        return properties.contains({key: values[0]})
+    if op == "!=":
+        return and_(
+            properties.has_key(key), not_(properties.contains({key: values[0]}))
+        )
+    if not isinstance(values[0], (int, float)) or isinstance(values[0], bool):
+        raise FilterError(f"{key} can only be ordered against numbers")
+    return _compare(_as_number(properties[key].astext), op, values[0])
+
+
+def _compare(column: Any, op: str, value: Any) -> ColumnElement[bool]:
+    return {
+        "=": column.__eq__,
+        "!=": column.__ne__,
+        "<": column.__lt__,
+        "<=": column.__le__,
+        ">": column.__gt__,
+        ">=": column.__ge__,
+    }[op](value)
+
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, Any]]) -> None:
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> tuple[str, Any] | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self, kind: str, value: Any = None) -> Any:
+        token = self.peek()
+        if (
+            token is None
+            or token[0] != kind
+            or (value is not None and token[1] != value)
+        ):
+            expected = value if value is not None else kind
+            found = "end of filter" if token is None else repr(token[1])
+            raise FilterError(f"Expected {expected} in filter, found {found}")
+        self.position += 1
+        return token[1]
+
+    def accept(self, kind: str, value: Any) -> bool:
+        if self.peek() == (kind, value):
+            self.position += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        token = self.peek()
+        # bare words are strings
+        if token is not None and token[0] == "word":
+            self.position += 1
+            return token[1]
+        return self.take("value")
+
+    def parse(self) -> ColumnElement[bool]:
+        condition = self.disjunction()
+        token = self.peek()
+        if token is not None:
+            raise FilterError(f"Unexpected {token[1]!r} in filter")
+        return condition
+
+    def disjunction(self) -> ColumnElement[bool]:
+        terms = [self.conjunction()]
+        while self.accept("keyword", "or"):
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else or_(*terms)
+
+    def conjunction(self) -> ColumnElement[bool]:
+        terms = [self.negation()]
+        while self.accept("keyword", "and"):
+            terms.append(self.negation())
+        return terms[0] if len(terms) == 1 else and_(*terms)
+
+    def negation(self) -> ColumnElement[bool]:
+        if self.accept("keyword", "not"):
+            return not_(self.negation())
+        if self.accept("op", "("):
+            condition = self.disjunction()
+            self.take("op", ")")
+            return condition
+        return self.comparison()
+
+    def comparison(self) -> ColumnElement[bool]:
+        field = self.take("word")
+        column = FILTER_COLUMNS.get(field)
+
+        if self.accept("keyword", "is"):
+            negated = self.accept("keyword", "not")
+            self.take("keyword", "null")
+            target = (
+                column
+                if column is not None
+                else RoadEdge.extra_properties[field].astext
+            )
+            return target.is_not(None) if negated else target.is_(None)
+
+        if self.accept("keyword", "in"):
+            self.take("op", "(")
+            values = [self.value()]
+            while self.accept("op", ","):
+                values.append(self.value())
+            self.take("op", ")")
+            op = "in"
+        else:
+            op = self.take("op")
+            if op not in ("=", "!=", "<", "<=", ">", ">="):
+                raise FilterError(f"Expected a comparison after {field} in filter")
+            values = [self.value()]
+
+        if column is not None:
+            return _column_comparison(field, column, op, values)
+        return _key_comparison(field, op, values)
+
+
+def parse_edge_filter(text: str) -> ColumnElement[bool]:
+    """Compiles a filter expression to a SQL condition on road_edges."""
+    if len(text) > MAX_FILTER_LENGTH:
+        raise FilterError("Filter is too long")
+    tokens = _tokenize(text)
+    if not tokens:
+        raise FilterError("Filter is empty")
+    return _Parser(tokens).parse()
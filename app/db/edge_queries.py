@@ -0,0 +1,391 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from geoalchemy2 import Geography
+from geoalchemy2.shape import from_shape
+from shapely.geometry.base import BaseGeometry
+from sqlalchemy import (
+    JSON,
+    CompoundSelect,
+    Float,
+    Select,
+    Text,
+    bindparam,
+    cast,
+    func,
+    or_,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.edge_batch import SRID
+from app.core.spatial_filter import Bbox
+from app.db.models import RoadEdge, edge_validity
+
+FEATURE_COLLECTION_START = '{"type": "FeatureCollection", "features": ['
+FEATURE_COLLECTION_END = "]}"
+
+
+@dataclass(frozen=True)
+class FeatureTextFormat:
+    """How pre-rendered feature texts are written out as a document."""
+
+    media_type: str
+    start: str
+    end: str
+    # one feature per line, otherwise comma separated
+    line_delimited: bool
+
+    def join(self, features: list[str], first: bool) -> str:
+        """The text of a batch of features, ``first`` if nothing was written yet."""
+        if self.line_delimited:
+            return "".join(feature + "\n" for feature in features)
+        return ("" if first else ",") + ",".join(features)
+
+
+GEOJSON_FORMAT = FeatureTextFormat(
+    "application/json", FEATURE_COLLECTION_START, FEATURE_COLLECTION_END, False
+)
+NDJSON_FORMAT = FeatureTextFormat("application/x-ndjson", "", "", True)
+
+TILE_LAYER = "edges"
+TILE_EXTENT = 4096  # tile coordinate space of the MVT spec
+TILE_BUFFER = 64  # pixels of geometry kept around a tile, avoids seams
+WEB_MERCATOR_SRID = 3857
+WEB_MERCATOR_WIDTH = 2 * 20037508.342789244
+
+# edge properties that are columns, every other one comes from extra_properties
+TILE_PROPERTY_COLUMNS = {
+    "name": RoadEdge.name,
+    "ref": RoadEdge.ref,
+    "lanes": RoadEdge.lanes,
+    "oneway": RoadEdge.oneway,
+    "length": RoadEdge.length,
+    "tunnel": RoadEdge.tunnel,
+    "highway": RoadEdge.highway,
+}
+
+
+def edge_geometry(
+    simplify: float | None = None, edge: type[RoadEdge] = RoadEdge
+) -> ColumnElement[Any]:
+    """The geometry of an edge, simplified with a tolerance in degrees if given."""
+    if simplify is None:
+        return edge.geometry
+    return func.ST_SimplifyPreserveTopology(edge.geometry, simplify)
+
+
+def edge_feature_json(
+    edge: type[RoadEdge] = RoadEdge,
+    extra: dict[str, Any] | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+) -> ColumnElement[str]:
+    """
+    A GeoJSON feature of an edge, rendered as text by PostGIS so the geometry
+    never has to be decoded in Python. ``extra`` adds properties.
+
+    ``simplify`` is a tolerance in degrees for ST_SimplifyPreserveTopology,
+    ``precision`` the number of decimals of the coordinates (PostGIS writes
+    up to 9 by default).
+    """
+    geometry = edge_geometry(simplify, edge)
+    geojson = (
+        func.ST_AsGeoJSON(geometry)
+        if precision is None
+        else func.ST_AsGeoJSON(geometry, precision)
+    )
+    extra_pairs = [item for pair in (extra or {}).items() for item in pair]
+    feature = func.json_build_object(
+        "type",
+        "Feature",
+        "geometry",
+        cast(geojson, JSON),
+        "properties",
+        func.json_build_object(
+            "id",
+            edge.id,
+            "timestamp",
+            edge.timestamp,
+            "is_current",
+            edge.is_current,
+            "source",
+            edge.source_node_id,
+            "target",
+            edge.target_node_id,
+            *extra_pairs,
+        ),
+    )
+    return cast(feature, Text)
+
+
+def edge_version_filter(network_id: int, timestamp: datetime | None) -> Any:
+    """
+    Edges of a network as they were at ``timestamp``, the current ones if None.
+    Current edges are never archived, saying so limits the scan to the live
+    partition.
+    """
+    if timestamp is None:
+        return (
+            (RoadEdge.network_id == network_id)
+            & (RoadEdge.is_current == True)
+            & (RoadEdge.archived == False)
+        )
+    return (RoadEdge.network_id == network_id) & edge_validity().contains(timestamp)
+
+
+def edge_spatial_filter(
+    bbox: Bbox | None = None, area: BaseGeometry | None = None
+) -> list[Any]:
+    """
+    Restricts edges to those intersecting a bounding box and/or a polygon.
+    ST_Intersects adds the && bounding box test that the GiST index answers.
+    """
+    clauses = []
+    if bbox is not None:
+        envelope = func.ST_MakeEnvelope(*bbox, SRID)
+        clauses.append(func.ST_Intersects(RoadEdge.geometry, envelope))
+    if area is not None:
+        clauses.append(
+            func.ST_Intersects(RoadEdge.geometry, from_shape(area, srid=SRID))
+        )
+    return clauses
+
+
+def edge_selection(
+    network_id: int,
+    timestamp: datetime | None = None,
+    bbox: Bbox | None = None,
+    area: BaseGeometry | None = None,
+    condition: ColumnElement[bool] | None = None,
+) -> list[Any]:
+    """
+    The WHERE clauses of an edges read: a network version, optionally
+    restricted to an area and by ``condition``, e.g. from ``parse_edge_filter``.
+    """
+    clauses = [edge_version_filter(network_id, timestamp)]
+    clauses += edge_spatial_filter(bbox, area)
+    if condition is not None:
+        clauses.append(condition)
+    return clauses
+
+
+def select_edge_features(
+    network_id: int,
+    timestamp: datetime | None = None,
+    bbox: Bbox | None = None,
+    area: BaseGeometry | None = None,
+    condition: ColumnElement[bool] | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+) -> Select[tuple[str]]:
+    """
+    Selects one GeoJSON feature text per edge of a network version, see
+    ``edge_selection``. ``simplify`` and ``precision`` are passed to
+    ``edge_feature_json``.
+    """
+    feature = edge_feature_json(simplify=simplify, precision=precision)
+    return select(feature).where(
+        *edge_selection(network_id, timestamp, bbox, area, condition)
+    )
+
+
+def select_edge_page(
+    network_id: int,
+    snapshot: datetime,
+    after_id: int,
+    limit: int,
+    bbox: Bbox | None = None,
+    area: BaseGeometry | None = None,
+    condition: ColumnElement[bool] | None = None,
+    simplify: float | None = None,
+    precision: int | None = None,
+) -> Select[tuple[int, str]]:
+    """
+    Selects the id and GeoJSON feature text of up to ``limit`` + 1 edges of a
+    network version that follow the edge ``after_id``, the extra row tells
+    whether there is a next page. A page is one seek on (network_id, id)
+    rather than skipping the rows of the previous pages.
+    """
+    feature = edge_feature_json(simplify=simplify, precision=precision)
+    return (
+        select(RoadEdge.id, feature)
+        .where(
+            *edge_selection(network_id, snapshot, bbox, area, condition),
+            RoadEdge.id > after_id,
+        )
+        .order_by(RoadEdge.id)
+        .limit(limit + 1)
+    )
+
+
+def select_edges_by_id(edge_ids: list[int]) -> Select[tuple[int, str]]:
+    """Selects the id and GeoJSON feature text of the edges with the given ids."""
+    return select(RoadEdge.id, edge_feature_json()).where(RoadEdge.id.in_(edge_ids))
+
+
+def select_nearest_edges(
+    network_id: int,
+    timestamp: datetime | None,
+    lons: list[float],
+    lats: list[float],
+    candidates: int,
+) -> Select[tuple[int, int, float, float, float]]:
+    """
+    Selects the nearest edge of a network version to each of a batch of
+    points in one statement: the position of the point (from 1), the edge
+    id, the distance in metres and the lon/lat of the closest point on the
+    edge. Points without edges are left out.
+
+    A LATERAL KNN search (``<->``) per point walks the (network_id,
+    geometry) GiST index for the ``candidates`` nearest edges in degrees,
+    the nearest of those in metres wins.
+    """
+    points = (
+        func.unnest(
+            bindparam("lons", lons, type_=ARRAY(Float)),
+            bindparam("lats", lats, type_=ARRAY(Float)),
+        )
+        .table_valued("lon", "lat", with_ordinality="ordinal")
+        .render_derived("points")
+    )
+    point = func.ST_SetSRID(func.ST_MakePoint(points.c.lon, points.c.lat), SRID)
+
+    nearest = (
+        select(RoadEdge.id, RoadEdge.geometry)
+        .where(edge_version_filter(network_id, timestamp))
+        .order_by(RoadEdge.geometry.op("<->")(point))
+        .limit(candidates)
+        .lateral("nearest")
+    )
+    geography = Geography(geometry_type=None, srid=SRID)
+    distance = func.ST_Distance(
+        cast(nearest.c.geometry, geography), cast(point, geography)
+    )
+    closest = func.ST_ClosestPoint(nearest.c.geometry, point)
+    return (
+        select(
+            points.c.ordinal,
+            nearest.c.id,
+            distance,
+            func.ST_X(closest),
+            func.ST_Y(closest),
+        )
+        .select_from(points.join(nearest, true()))
+        .distinct(points.c.ordinal)
+        .order_by(points.c.ordinal, distance)
+    )
+
+
+def select_edge_changes(
+    network_id: int, since: datetime, until: datetime
+) -> CompoundSelect:
+    """
+    Selects the GeoJSON feature texts of the edges that were added to or
+    retired from a network between the versions at ``since`` and ``until``,
+    with a ``change`` property of "added" or "retired". Edges that came and
+    went within the window are in neither version and left out.
+
+    Each half is a range scan on (network_id, valid_from) or
+    (network_id, valid_to), so the cost follows the size of the change.
+    """
+    added = select(edge_feature_json(extra={"change": "added"})).where(
+        RoadEdge.network_id == network_id,
+        RoadEdge.valid_from > since,
+        RoadEdge.valid_from <= until,
+        or_(RoadEdge.valid_to.is_(None), RoadEdge.valid_to > until),
+    )
+    retired = select(edge_feature_json(extra={"change": "retired"})).where(
+        RoadEdge.network_id == network_id,
+        RoadEdge.valid_to > since,
+        RoadEdge.valid_to <= until,
+        RoadEdge.valid_from <= since,
+    )
+    return union_all(added, retired)
+
+
+def feature_collection(features: list[str]) -> str:
+    """Joins pre-rendered feature texts into a FeatureCollection document."""
+    return FEATURE_COLLECTION_START + ",".join(features) + FEATURE_COLLECTION_END
+
+
+def feature_page(features: list[str], next_url: str | None) -> str:
+    """A FeatureCollection page, with a link to the next page if there is one."""
+    links = [{"rel": "next", "href": next_url}] if next_url is not None else []
+    return (
+        FEATURE_COLLECTION_START
+        + ",".join(features)
+        + '], "links": '
+        + json.dumps(links)
+        + "}"
+    )
+
+
+def route_collection(
+    features: list[str], length: float, source: int, target: int
+) -> str:
+    """
+    A FeatureCollection of the edges of a route in travel order, with the
+    length of the route and the nodes it starts and ends at.
+    """
+    route = {"length": length, "source": source, "target": target}
+    return (
+        FEATURE_COLLECTION_START
+        + ",".join(features)
+        + '], "route": '
+        + json.dumps(route)
+        + "}"
+    )
+
+
+def tile_property(name: str) -> ColumnElement[Any]:
+    if name in TILE_PROPERTY_COLUMNS:
+        return TILE_PROPERTY_COLUMNS[name].label(name)
+    return RoadEdge.extra_properties[name].astext.label(name)
+
+
+def select_edge_tile(
+    network_id: int,
+    timestamp: datetime | None,
+    z: int,
+    x: int,
+    y: int,
+    properties: list[str],
+) -> Select[tuple[bytes]]:
+    """
+    Selects the Mapbox Vector Tile z/x/y of a network version, with a single
+    ``edges`` layer that carries the edge id and the given properties.
+    """
+    envelope = func.ST_TileEnvelope(z, x, y)
+    # look up the edges touching the tile or its buffer in the stored SRID,
+    # so the (network_id, geometry) GiST index can be used
+    margin = WEB_MERCATOR_WIDTH / 2**z * TILE_BUFFER / TILE_EXTENT
+    search_area = func.ST_Transform(func.ST_Expand(envelope, margin), SRID)
+
+    tile_geometry = func.ST_AsMVTGeom(
+        func.ST_Transform(RoadEdge.geometry, WEB_MERCATOR_SRID),
+        envelope,
+        TILE_EXTENT,
+        TILE_BUFFER,
+        True,
+    )
+    features = (
+        select(
+            tile_geometry.label("geom"),
+            RoadEdge.id.label("id"),
+            *(tile_property(name) for name in properties),
+        )
+        .where(
+            edge_version_filter(network_id, timestamp),
+            RoadEdge.geometry.op("&&")(search_area),
+        )
+        .subquery("features")
+    )
+    return select(
+        func.ST_AsMVT(features.table_valued(), TILE_LAYER, TILE_EXTENT, "geom", "id")
+    ).where(features.c.geom.is_not(None))
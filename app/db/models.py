@@ -6,14 +6,23 @@ from geoalchemy2 import Geometry
 from geoalchemy2.elements import WKBElement
 from sqlalchemy import (
     Boolean,
+    Computed,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
+    event,
+    false,
+    func,
+    literal_column,
+    text,
 )
 from sqlalchemy import Enum as SqlEnum
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSTZRANGE
+from sqlalchemy.schema import DDL
+from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
@@ -33,6 +42,23 @@ class UserRolesOptions(str, Enum):
     GUEST = "GUEST"
 
 
+class IngestJobKind(str, Enum):
+    """
+    UPLOAD: creates a new road network from the stored file
+    UPDATE: replaces the current edges of an existing road network
+    """
+
+    UPLOAD = "UPLOAD"
+    UPDATE = "UPDATE"
+
+
+class IngestJobStatus(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -68,12 +94,98 @@ class RoadNetwork(Base):
     edges: Mapped[list["RoadEdge"]] = relationship(
         "RoadEdge", back_populates="network", cascade="all, delete-orphan"
     )
+    nodes: Mapped[list["RoadNode"]] = relationship(
+        "RoadNode", back_populates="network", cascade="all, delete-orphan"
+    )
+    stats: Mapped[list["RoadNetworkStats"]] = relationship(
+        "RoadNetworkStats", back_populates="network", cascade="all, delete-orphan"
+    )
+
+
+class RoadNetworkStats(Base):
+    """
+    The statistics of a network version, see app/core/network_stats.py. A row
+    is written by every upload and update that changes the network, the
+    statistics as of a time are those of the last row at or before it.
+    """
+
+    __tablename__ = "road_network_stats"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    network_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("road_networks.id", ondelete="CASCADE"), nullable=False
+    )
+    # the time the version came to be, the valid_from of its newest edges
+    valid_from: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    edge_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # metres
+    length: Mapped[float] = mapped_column(Float, nullable=False)
+    lane_km: Mapped[float] = mapped_column(Float, nullable=False)
+    # edge_count, length and lane_km by highway class
+    highways: Mapped[dict[str, Any]] = mapped_column(
+        JSONB, default=dict, nullable=False
+    )
+    # minx, miny, maxx, maxy, NULL for a version without edges
+    bbox: Mapped[list[float] | None] = mapped_column(ARRAY(Float), nullable=True)
+
+    network: Mapped["RoadNetwork"] = relationship("RoadNetwork", back_populates="stats")
+
+    __table_args__ = (
+        Index(
+            "ix_road_network_stats_network_valid_from",
+            "network_id",
+            "valid_from",
+            unique=True,
+        ),
+    )
+
+
+class RoadNode(Base):
+    """
+    An endpoint shared by edges of a network, snapped to the grid of
+    app/core/topology.py. Nodes are not versioned, every version of the
+    network uses the nodes its edges point to.
+    """
+
+    __tablename__ = "road_nodes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    geometry: Mapped[WKBElement] = mapped_column(
+        # indexed together with network_id below
+        Geometry(geometry_type="POINT", srid=4326, spatial_index=False),
+        nullable=False,
+    )
+    network_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("road_networks.id", ondelete="CASCADE"), nullable=False
+    )
+
+    network: Mapped["RoadNetwork"] = relationship("RoadNetwork", back_populates="nodes")
+
+    __table_args__ = (
+        Index(
+            "ix_road_nodes_network_geometry",
+            "network_id",
+            "geometry",
+            postgresql_using="gist",
+        ),
+    )
 
 
 class RoadEdge(Base):
+    """
+    An edge of a version of a network. The table is partitioned by
+    ``archived``: edges are written to road_edges_live and stay there after
+    they were retired, until the archival job moves them to
+    road_edges_history. Reads of the current version only touch the live
+    partition, see ``edge_version_filter``.
+    """
+
     __tablename__ = "road_edges"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # the primary key is (id, archived), the partition key has to be part of it
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str | None] = mapped_column(String, nullable=True)
     ref: Mapped[str | None] = mapped_column(String, nullable=True)
     lanes: Mapped[str | None] = mapped_column(String, nullable=True)
@@ -82,10 +194,30 @@ class RoadEdge(Base):
     width: Mapped[list[float] | None] = mapped_column(ARRAY(Float), nullable=True)
     tunnel: Mapped[str | None] = mapped_column(String, nullable=True)
     extra_properties: Mapped[dict[str, Any]] = mapped_column(JSONB, default=dict)
+    # the most filtered on key of extra_properties, kept in a column of its own
+    highway: Mapped[str | None] = mapped_column(
+        String, Computed("extra_properties ->> 'highway'", persisted=True)
+    )
     geometry: Mapped[WKBElement] = mapped_column(
-        Geometry(geometry_type="GEOMETRY", srid=4326), nullable=False
+        # indexed together with network_id below
+        Geometry(geometry_type="GEOMETRY", srid=4326, spatial_index=False),
+        nullable=False,
     )
     is_current: Mapped[bool] = mapped_column(Boolean, default=True)
+    # moved to the history partition, only ever true for retired edges
+    archived: Mapped[bool] = mapped_column(
+        Boolean, primary_key=True, default=False, server_default=false()
+    )
+    # validity interval [valid_from, valid_to), valid_to is NULL while current
+    valid_from: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+    valid_to: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # hash of geometry and properties, used to diff updates against the
+    # current version of the network
+    fingerprint: Mapped[str | None] = mapped_column(String(32), nullable=True)
     timestamp: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.now(UTC), nullable=False
     )
@@ -95,6 +227,122 @@ class RoadEdge(Base):
     user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id"), nullable=False
     )
+    # the nodes at the first and last point of the geometry, NULL for edges
+    # that are not (Multi)LineStrings
+    source_node_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("road_nodes.id"), nullable=True
+    )
+    target_node_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("road_nodes.id"), nullable=True
+    )
 
     network: Mapped["RoadNetwork"] = relationship("RoadNetwork", back_populates="edges")
     user: Mapped["User"] = relationship("User", back_populates="edges")
+
+    __table_args__ = (
+        Index(
+            "ix_road_edges_current_fingerprint",
+            "network_id",
+            "fingerprint",
+            postgresql_where=text("is_current"),
+        ),
+        # viewport queries are always scoped to one network
+        Index(
+            "ix_road_edges_network_geometry",
+            "network_id",
+            "geometry",
+            postgresql_using="gist",
+        ),
+        # attribute filters, see app/db/edge_filters.py
+        Index(
+            "ix_road_edges_extra_properties",
+            "extra_properties",
+            postgresql_using="gin",
+            postgresql_ops={"extra_properties": "jsonb_path_ops"},
+        ),
+        Index("ix_road_edges_network_highway", "network_id", "highway"),
+        # keyset pagination of the edges of a network
+        Index("ix_road_edges_network_id", "network_id", "id"),
+        # change sets between two versions of a network
+        Index("ix_road_edges_network_valid_from", "network_id", "valid_from"),
+        Index("ix_road_edges_network_valid_to", "network_id", "valid_to"),
+        # the edges at a node
+        Index("ix_road_edges_source_node_id", "source_node_id"),
+        Index("ix_road_edges_target_node_id", "target_node_id"),
+        {"postgresql_partition_by": "LIST (archived)"},
+    )
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[IngestJobKind] = mapped_column(SqlEnum(IngestJobKind), nullable=False)
+    status: Mapped[IngestJobStatus] = mapped_column(
+        SqlEnum(IngestJobStatus),
+        default=IngestJobStatus.PENDING,
+        nullable=False,
+        index=True,
+    )
+    phase: Mapped[str] = mapped_column(String, default="queued", nullable=False)
+    features_processed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[str | None] = mapped_column(String, nullable=True)
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    file_path: Mapped[str] = mapped_column(String, nullable=False)
+    result: Mapped[dict[str, Any]] = mapped_column(JSONB, default=dict)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+        nullable=False,
+    )
+    network_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("road_networks.id", ondelete="CASCADE"), nullable=True
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+
+
+def edge_validity(edge: type[RoadEdge] = RoadEdge) -> ColumnElement[Any]:
+    """The validity interval of an edge as a tstzrange."""
+    return func.tstzrange(
+        edge.valid_from, edge.valid_to, literal_column("'[)'"), type_=TSTZRANGE
+    )
+
+
+# "network N as of T" is a single range scan on this index, btree_gist lets the
+# plain network_id column share a GiST index with the validity range
+Index(
+    "ix_road_edges_network_validity",
+    RoadEdge.network_id,
+    edge_validity(),
+    postgresql_using="gist",
+)
+
+# retired edges are moved to a partition of their own, the live one then only
+# holds the current edges and those retired since the last archival
+event.listen(
+    RoadEdge.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE road_edges_live PARTITION OF road_edges FOR VALUES IN (false)"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    RoadEdge.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE road_edges_history PARTITION OF road_edges "
+        "FOR VALUES IN (true)"
+    ).execute_if(dialect="postgresql"),
+)
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,133 @@
+"""
+Queries over the nodes of a network and the graph its edges form. The degree
+of a node is counted from the source and target node ids of the edges of a
+network version, an index lookup per node rather than a geometric search for
+touching edges.
+"""
+
+from datetime import datetime
+from typing import Any
+
+from geoalchemy2 import Geography
+from sqlalchemy import JSON, Select, Text, cast, func, select, union_all
+
+from app.core.edge_batch import SRID
+from app.core.spatial_filter import Bbox
+from app.core.topology import NODE_GRID
+from app.db.edge_queries import edge_selection, edge_version_filter
+from app.db.models import RoadEdge, RoadNode
+
+
+def node_degrees(
+    network_id: int, timestamp: datetime | None = None, bbox: Bbox | None = None
+) -> Any:
+    """
+    A subquery of the node ids of a network version with their ``degree``,
+    the number of edge ends at the node. Only nodes with edges are in it.
+    """
+    if bbox is not None:
+        # a node is up to half a grid cell away from the ends of its edges
+        minx, miny, maxx, maxy = bbox
+        bbox = (minx - NODE_GRID, miny - NODE_GRID, maxx + NODE_GRID, maxy + NODE_GRID)
+    selection = edge_selection(network_id, timestamp, bbox)
+    ends = union_all(
+        select(RoadEdge.source_node_id.label("node_id")).where(*selection),
+        select(RoadEdge.target_node_id.label("node_id")).where(*selection),
+    ).subquery("ends")
+    return (
+        select(ends.c.node_id, func.count().label("degree"))
+        .where(ends.c.node_id.is_not(None))
+        .group_by(ends.c.node_id)
+        .subquery("degrees")
+    )
+
+
+def select_node_features(
+    network_id: int,
+    timestamp: datetime | None = None,
+    bbox: Bbox | None = None,
+    min_degree: int | None = None,
+    max_degree: int | None = None,
+) -> Select[tuple[str]]:
+    """
+    Selects one GeoJSON feature text per node of a network version, with its
+    ``id`` and ``degree`` as properties, optionally within a bounding box and
+    a range of degrees (1 are dead ends, 3 and more junctions).
+    """
+    degrees = node_degrees(network_id, timestamp, bbox)
+    feature = func.json_build_object(
+        "type",
+        "Feature",
+        "geometry",
+        cast(func.ST_AsGeoJSON(RoadNode.geometry), JSON),
+        "properties",
+        func.json_build_object("id", RoadNode.id, "degree", degrees.c.degree),
+    )
+    query = select(cast(feature, Text)).join(degrees, degrees.c.node_id == RoadNode.id)
+    if bbox is not None:
+        # edges that merely cross the box bring their nodes outside of it
+        envelope = func.ST_MakeEnvelope(*bbox, SRID)
+        query = query.where(func.ST_Intersects(RoadNode.geometry, envelope))
+    if min_degree is not None:
+        query = query.where(degrees.c.degree >= min_degree)
+    if max_degree is not None:
+        query = query.where(degrees.c.degree <= max_degree)
+    return query.order_by(RoadNode.id)
+
+
+def select_version_stamp(
+    network_id: int, timestamp: datetime | None = None
+) -> Select[tuple[datetime | None]]:
+    """
+    Selects the time of the last change of a network at or before
+    ``timestamp`` (ever if None): the versions at two timestamps are the same
+    if the stamps are. Two index scans on (network_id, valid_from/valid_to).
+    """
+    added = select(func.max(RoadEdge.valid_from)).where(
+        RoadEdge.network_id == network_id
+    )
+    retired = select(func.max(RoadEdge.valid_to)).where(
+        RoadEdge.network_id == network_id
+    )
+    if timestamp is not None:
+        added = added.where(RoadEdge.valid_from <= timestamp)
+        retired = retired.where(RoadEdge.valid_to <= timestamp)
+    return select(func.greatest(added.scalar_subquery(), retired.scalar_subquery()))
+
+
+def select_graph_edges(
+    network_id: int, timestamp: datetime | None = None
+) -> Select[tuple[int, int, float, bool, int]]:
+    """
+    Selects the source and target node, weight, oneway flag and id of the
+    edges of a network version that have nodes. Edges without a length
+    weigh their length on the spheroid, in metres like the length property.
+    """
+    weight = func.coalesce(
+        RoadEdge.length,
+        func.ST_Length(
+            cast(RoadEdge.geometry, Geography(geometry_type=None, srid=SRID))
+        ),
+    )
+    return select(
+        RoadEdge.source_node_id,
+        RoadEdge.target_node_id,
+        weight,
+        func.coalesce(RoadEdge.oneway, False),
+        RoadEdge.id,
+    ).where(
+        edge_version_filter(network_id, timestamp),
+        RoadEdge.source_node_id.is_not(None),
+        RoadEdge.target_node_id.is_not(None),
+    )
+
+
+def select_node_coordinates(
+    network_id: int,
+) -> Select[tuple[int, float, float]]:
+    """Selects the id, lon and lat of the nodes of a network, ordered by id."""
+    return (
+        select(RoadNode.id, func.ST_X(RoadNode.geometry), func.ST_Y(RoadNode.geometry))
+        .where(RoadNode.network_id == network_id)
+        .order_by(RoadNode.id)
+    )
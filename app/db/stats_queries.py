@@ -0,0 +1,55 @@
+"""
+Queries over the statistics of network versions, see
+app/core/network_stats.py. Reading the statistics of a version is a single
+lookup on (network_id, valid_from), however large the network.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Select, func, select
+
+from app.db.edge_queries import edge_version_filter
+from app.db.models import RoadEdge, RoadNetworkStats
+
+
+def select_network_stats(
+    network_id: int, timestamp: datetime | None = None
+) -> Select[tuple[RoadNetworkStats]]:
+    """
+    Selects the statistics row of a network version, the last one at or
+    before ``timestamp`` (the current version if None).
+    """
+    query = select(RoadNetworkStats).where(RoadNetworkStats.network_id == network_id)
+    if timestamp is not None:
+        query = query.where(RoadNetworkStats.valid_from <= timestamp)
+    return query.order_by(RoadNetworkStats.valid_from.desc()).limit(1)
+
+
+def select_latest_stats(network_ids: list[int]) -> Select[tuple[RoadNetworkStats]]:
+    """Selects the statistics row of the current version of every network."""
+    return (
+        select(RoadNetworkStats)
+        .where(RoadNetworkStats.network_id.in_(network_ids))
+        .distinct(RoadNetworkStats.network_id)
+        .order_by(RoadNetworkStats.network_id, RoadNetworkStats.valid_from.desc())
+    )
+
+
+def select_current_extent(
+    network_id: int,
+) -> Select[tuple[float | None, float | None, float | None, float | None]]:
+    """
+    Selects the bounding box of the current edges of a network, the one
+    statistic that has to be measured over the whole version again.
+    """
+    extent = (
+        select(func.ST_Extent(RoadEdge.geometry).label("extent"))
+        .where(edge_version_filter(network_id, None))
+        .subquery()
+    )
+    return select(
+        func.ST_XMin(extent.c.extent),
+        func.ST_YMin(extent.c.extent),
+        func.ST_XMax(extent.c.extent),
+        func.ST_YMax(extent.c.extent),
+    )
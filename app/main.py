@@ -1,15 +1,24 @@
 import os
-from typing import Dict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Dict
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, status
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 
 
 from app.api.v1.endpoints.authentication import router as authentication_router
+from app.api.v1.endpoints.jobs import router as jobs_router
 from app.api.v1.endpoints.road_networks import router as road_networks_router
 from app.api.v1.endpoints.users import router as users_router
+from app.api.v1.services.authentication_service import principal_metrics
+from app.api.v1.services.jobs_service import resume_unfinished_jobs, run_archive_job
+from app.core import workers
+from app.core.cache import response_cache
 from app.core.database import engine
+from app.core.routing import graph_cache
+from app.core.security import HashingPoolBusyError, hashing_pool
 from app.db import models
 from app.core.database import Base
 
@@ -17,6 +26,18 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    workers.start_workers()
+    resume_unfinished_jobs()
+    # retired edges left behind by an earlier process or stored before the
+    # history partition existed
+    workers.submit(run_archive_job)
+    yield
+    workers.shutdown_workers()
+
+
 app = FastAPI(
     title="Road Network Management API",
     description="REST API for managing road networks, uploading, updating and retrieving road networks",
@@ -25,16 +46,31 @@ app = FastAPI(
         {"name": "users", "description": "Operations related to users"},
         {"name": "authentication", "description": "Login and security"},
         {"name": "Networks", "description": "Manage road network data"},
+        {"name": "Jobs", "description": "Progress of background ingest jobs"},
     ],
+    lifespan=lifespan,
 )
 
 app.include_router(users_router)
 app.include_router(authentication_router)
 app.include_router(road_networks_router)
+app.include_router(jobs_router)
 
 Base.metadata.create_all(engine)
 
 
+@app.exception_handler(HashingPoolBusyError)
+async def hashing_pool_busy_handler(
+    request: Request, exc: HashingPoolBusyError
+) -> JSONResponse:
+    """Login and user creation shed load instead of queueing behind bcrypt."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request) -> HTMLResponse:
     """Homepage."""
@@ -44,3 +80,17 @@ async def root(request: Request) -> HTMLResponse:
 @app.get("/health", tags=["Health"])
 def health_check() -> Dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["Health"])
+def metrics() -> Dict[str, Any]:
+    """Hit rates of the in-process caches and load of the password hashing pool."""
+    return {
+        "principal_cache": principal_metrics(),
+        "response_cache": response_cache.stats(),
+        "graph_cache": graph_cache.stats(),
+        "password_hashing": {
+            "in_flight": hashing_pool.in_flight,
+            "rejected": hashing_pool.rejected,
+        },
+    }
@@ -1,8 +1,10 @@
-from typing import Dict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, FiniteFloat
 
-from app.db.models import UserRolesOptions
+from app.db.models import IngestJobKind, IngestJobStatus, UserRolesOptions
 
 
 # -------------------- User Schemas --------------------
@@ -40,14 +42,75 @@ class UserAuth(BaseModel):
 
 
 # --------- RoadNetworks --------
+class ReadHighwayStats(BaseModel):
+    edge_count: int
+    # metres
+    length: float
+    lane_km: float
+
+
+class ReadNetworkStats(BaseModel):
+    # the time of the version, None for a network without versions yet
+    valid_from: datetime | None
+    edge_count: int
+    # metres
+    length: float
+    lane_km: float
+    highways: Dict[str, ReadHighwayStats]
+    # minx, miny, maxx, maxy, None without edges
+    bbox: tuple[float, float, float, float] | None
+
+
 class ReadRoadNetwork(BaseModel):
     id: int
     name: str
+    stats: ReadNetworkStats | None = None
 
     class Config:
         orm_mode = True
 
 
+class EdgeFormat(str, Enum):
+    """
+    GEOJSON: a GeoJSON FeatureCollection
+    NDJSON: newline delimited GeoJSON features
+    PARQUET: GeoParquet, with extra_properties flattened into columns
+    FLATGEOBUF: FlatGeobuf, with extra_properties as a JSON column
+    """
+
+    GEOJSON = "geojson"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+    FLATGEOBUF = "fgb"
+
+
+# largest batch of points of a snap request
+SNAP_MAX_POINTS = 100_000
+
+
+class SnapRequest(BaseModel):
+    # lon, lat in EPSG:4326
+    points: list[tuple[FiniteFloat, FiniteFloat]] = Field(
+        ..., max_length=SNAP_MAX_POINTS
+    )
+    timestamp: datetime | None = None
+    # points farther than this many metres from every edge are not matched
+    max_distance: float | None = Field(None, gt=0)
+
+
+class SnapMatch(BaseModel):
+    edge_id: int
+    # metres between the point and the edge
+    distance: float
+    # the closest point of the edge, lon, lat
+    location: tuple[float, float]
+
+
+class SnapResponse(BaseModel):
+    # one per point, in order, None if the point was not matched
+    matches: list[SnapMatch | None]
+
+
 class NetworkUpdateResponse(BaseModel):
     message: str
     network_id: int
@@ -63,6 +126,29 @@ class UpdateRoadNetworkResponse(BaseModel):
     network_id: int
 
 
+# --------- Ingest Jobs --------
+class JobAcceptedResponse(BaseModel):
+    message: str
+    job_id: int
+    status_url: str
+
+
+class ReadIngestJob(BaseModel):
+    id: int
+    kind: IngestJobKind
+    status: IngestJobStatus
+    phase: str
+    features_processed: int
+    error: str | None
+    network_id: int | None
+    result: Dict[str, Any]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
 # -------------- Common ----------------------
 class MessageResponse(BaseModel):
     detail: str
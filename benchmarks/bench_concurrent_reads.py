@@ -0,0 +1,125 @@
+"""
+Measures the latency of edge reads while a large upload is being received and
+ingested, compared to the latency of the same reads on an idle API.
+
+Every read asks for a slightly different bounding box, so it is answered by the
+database rather than by the response cache. The upload is a generated file
+with the bundled task assignment features repeated ``--edges`` times.
+
+Usage (against a running API, e.g. the docker-compose setup):
+    python -m benchmarks.bench_concurrent_reads --email user@example.com \\
+        --password secret --network-id 1 --edges 500000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+from typing import Any
+
+import httpx
+
+from benchmarks.bench_edge_writer import load_features
+
+
+def write_upload(path: str, edges: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": load_features(edges)}, f)
+
+
+async def read_edges(
+    client: httpx.AsyncClient, network_id: int, timings: list[float]
+) -> None:
+    # a random 0.01 degree box in York, where the test networks are
+    x, y = random.uniform(-1.1, -1.0), random.uniform(53.9, 54.0)
+    started = time.perf_counter()
+    resp = await client.get(
+        f"/networks/{network_id}/edges",
+        params={"bbox": f"{x},{y},{x + 0.01},{y + 0.01}"},
+    )
+    resp.raise_for_status()
+    timings.append(time.perf_counter() - started)
+
+
+async def read_until(
+    client: httpx.AsyncClient, network_id: int, done: asyncio.Event
+) -> list[float]:
+    timings: list[float] = []
+    while not done.is_set():
+        await read_edges(client, network_id, timings)
+    return timings
+
+
+async def upload_and_wait(
+    client: httpx.AsyncClient, path: str, done: asyncio.Event
+) -> None:
+    try:
+        with open(path, "rb") as f:
+            resp = await client.post(
+                "/networks/upload",
+                files={"file": ("bench.geojson", f, "application/geo+json")},
+            )
+        resp.raise_for_status()
+        job_id = resp.json()["job_id"]
+        while True:
+            job = (await client.get(f"/jobs/{job_id}")).json()
+            if job["status"] in ("SUCCEEDED", "FAILED"):
+                print(f"upload job {job_id}: {job['status']}")
+                return
+            await asyncio.sleep(0.5)
+    finally:
+        done.set()
+
+
+def report(label: str, timings: list[float]) -> None:
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    print(
+        f"{label:14} reads {len(timings):6}  p50 {percentiles[49] * 1000:8.1f}ms"
+        f"  p99 {percentiles[98] * 1000:8.1f}ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.api_url, timeout=600) as client:
+        resp = await client.post(
+            "/auth/login", data={"username": args.email, "password": args.password}
+        )
+        resp.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {resp.json()['access_token']}"
+
+        idle: list[float] = []
+        for _ in range(args.reads):
+            await read_edges(client, args.network_id, idle)
+
+        with tempfile.NamedTemporaryFile(suffix=".geojson") as upload:
+            write_upload(upload.name, args.edges)
+            done = asyncio.Event()
+            readers: list[Any] = [
+                read_until(client, args.network_id, done)
+                for _ in range(args.concurrency)
+            ]
+            *busy, _ = await asyncio.gather(
+                *readers, upload_and_wait(client, upload.name, done)
+            )
+
+        report("idle", idle)
+        report("during upload", [t for timings in busy for t in timings])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--network-id", type=int, required=True)
+    parser.add_argument("--edges", type=int, default=500_000)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Measures the CPU part of ingest: per-feature conversion with shape() versus
+the column-wise build_edge_batch, and per-feature node extraction versus
+edge_endpoints.
+
+No database is needed. The features of the bundled task assignment networks and
+test data are repeated until the requested number of edges is reached.
+
+Usage:
+    python -m benchmarks.bench_edge_batch --edges 200000
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import shapely
+from shapely.geometry import shape
+
+from app.core.edge_batch import KNOWN_FIELDS, build_edge_batch
+from app.core.topology import NODE_GRID, edge_endpoints
+
+DATA_GLOBS = (
+    "geojson_files_from_task_assignment/*.geojson",
+    "tests/test_data/*.geojson",
+)
+
+
+def load_features(count: int) -> list[dict[str, Any]]:
+    features: list[dict[str, Any]] = []
+    for pattern in DATA_GLOBS:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding="utf-8") as f:
+                features.extend(json.load(f)["features"])
+    return list(itertools.islice(itertools.cycle(features), count))
+
+
+def batched(items: list[Any], size: int) -> Iterator[list[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def per_feature_row(feature: dict[str, Any]) -> tuple[Any, ...]:
+    """The previous conversion: one shape() and one WKB write per feature."""
+    geometry = shapely.to_wkb(
+        shapely.set_srid(shape(feature["geometry"]), 4326),
+        hex=True,
+        include_srid=True,
+    )
+    properties = feature.get("properties") or {}
+    lanes = properties.get("lanes")
+    width = properties.get("width")
+    return (
+        properties.get("name"),
+        ",".join(map(str, lanes)) if isinstance(lanes, list) else lanes,
+        [float(w) for w in width] if isinstance(width, list) else width,
+        {k: v for k, v in properties.items() if k not in KNOWN_FIELDS},
+        geometry,
+    )
+
+
+def per_feature_endpoints(geometry: Any) -> tuple[Any, ...]:
+    """Snapped endpoints one geometry at a time, for comparison."""
+    coords = shapely.get_coordinates(geometry)
+    return tuple(round(c / NODE_GRID) for c in (*coords[0], *coords[-1]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edges", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    features = load_features(args.edges)
+
+    started = time.perf_counter()
+    for feature in features:
+        per_feature_row(feature)
+    per_feature_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for batch in batched(features, args.batch_size):
+        list(build_edge_batch(batch).rows(0, 0, None))  # type: ignore[arg-type]
+    batch_seconds = time.perf_counter() - started
+
+    geometries = [
+        build_edge_batch(batch).geometries
+        for batch in batched(features, args.batch_size)
+    ]
+    started = time.perf_counter()
+    for batch_geometries in geometries:
+        for geometry in batch_geometries:
+            per_feature_endpoints(geometry)
+    per_feature_nodes_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for batch_geometries in geometries:
+        edge_endpoints(batch_geometries)
+    nodes_seconds = time.perf_counter() - started
+
+    print(f"edges:            {len(features)}")
+    print(f"per feature:      {per_feature_seconds:8.2f}s")
+    print(f"build_edge_batch: {batch_seconds:8.2f}s")
+    print(f"speedup:          {per_feature_seconds / batch_seconds:8.1f}x")
+    print(f"nodes per feature:{per_feature_nodes_seconds:8.2f}s")
+    print(f"edge_endpoints:   {nodes_seconds:8.2f}s")
+    print(f"speedup:          {per_feature_nodes_seconds / nodes_seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
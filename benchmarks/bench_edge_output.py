@@ -0,0 +1,103 @@
+"""
+Measures the payload size and latency of the edges response at different
+simplification tolerances and coordinate precisions.
+
+The features of the bundled task assignment networks are written with the
+COPY writer into a throwaway network, then the FeatureCollection is rendered
+by PostGIS for every combination of ``simplify`` and ``precision`` and the
+size and p50/p99 latency are reported. Everything runs in one transaction
+that is rolled back at the end.
+
+Usage (against the docker-compose database):
+    python -m benchmarks.bench_edge_output --edges 50000 --runs 10
+"""
+
+import argparse
+import statistics
+import time
+from datetime import UTC, datetime
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.core.edge_batch import build_edge_batch
+from app.db.copy_writer import copy_road_edges
+from app.db.edge_queries import feature_collection, select_edge_features
+from app.db.models import RoadNetwork, User
+from benchmarks.bench_edge_writer import batched, load_features
+
+# (simplify tolerance in degrees, coordinate decimals), None is the default
+VARIANTS: list[tuple[float | None, int | None]] = [
+    (None, None),
+    (None, 7),
+    (None, 6),
+    (None, 5),
+    (0.00001, 6),
+    (0.0001, 6),
+    (0.001, 5),
+]
+
+
+def render(
+    db: Session, network_id: int, simplify: float | None, precision: int | None
+) -> bytes:
+    query = select_edge_features(network_id, simplify=simplify, precision=precision)
+    return feature_collection(list(db.execute(query).scalars())).encode()
+
+
+def run(args: argparse.Namespace) -> None:
+    features = load_features(args.edges)
+    db = SessionLocal()
+    try:
+        user = User(
+            username="bench_edge_output",
+            email="bench_edge_output@example.com",
+            hashed_password="-",
+        )
+        db.add(user)
+        db.flush()
+        network = RoadNetwork(
+            name="bench", timestamp=datetime.now(UTC), user_id=user.id
+        )
+        db.add(network)
+        db.flush()
+
+        timestamp = datetime.now(UTC)
+        for batch in batched(features, 1000):
+            edges = build_edge_batch(batch)
+            copy_road_edges(db, edges.rows(network.id, user.id, timestamp))
+
+        print(f"edges: {len(features)}, runs: {args.runs}")
+        baseline = None
+        for simplify, precision in VARIANTS:
+            timings = []
+            size = 0
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                size = len(render(db, network.id, simplify, precision))
+                timings.append(time.perf_counter() - started)
+            percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+            baseline = baseline or size
+            label = f"simplify={simplify} precision={precision}"
+            print(
+                f"{label:32} {size / 1e6:8.2f} MB ({size / baseline:4.0%})"
+                f"  p50 {percentiles[49] * 1000:8.1f}ms"
+                f"  p99 {percentiles[98] * 1000:8.1f}ms"
+            )
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edges", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    engine.echo = False
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares the ORM bulk_save_objects path with the COPY based edge writer.
+
+The features of the bundled task assignment networks are repeated until the
+requested number of edges is reached and written into a throwaway network.
+Everything runs in one transaction that is rolled back at the end.
+
+Usage (against the docker-compose database):
+    python -m benchmarks.bench_edge_writer --edges 200000
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import time
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from typing import Any
+
+from geoalchemy2.shape import from_shape
+from shapely.geometry import shape
+
+from app.core.database import SessionLocal, engine
+from app.core.edge_batch import build_edge_batch
+from app.db.copy_writer import copy_road_edges
+from app.db.models import RoadEdge, RoadNetwork, User
+
+DATA_GLOB = "geojson_files_from_task_assignment/*.geojson"
+
+
+def load_features(count: int) -> list[dict[str, Any]]:
+    features: list[dict[str, Any]] = []
+    for path in sorted(glob.glob(DATA_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            features.extend(json.load(f)["features"])
+    return list(itertools.islice(itertools.cycle(features), count))
+
+
+def orm_edge(feature: dict[str, Any], network_id: int, user_id: int) -> RoadEdge:
+    properties = feature.get("properties") or {}
+    return RoadEdge(
+        geometry=from_shape(shape(feature["geometry"]), srid=4326),
+        name=properties.get("name"),
+        ref=properties.get("ref"),
+        lanes=properties.get("lanes"),
+        oneway=properties.get("oneway"),
+        length=properties.get("length"),
+        tunnel=properties.get("tunnel"),
+        extra_properties={},
+        is_current=True,
+        timestamp=datetime.now(UTC),
+        network_id=network_id,
+        user_id=user_id,
+    )
+
+
+def batched(items: list[Any], size: int) -> Iterator[list[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def run(args: argparse.Namespace) -> None:
+    features = load_features(args.edges)
+    db = SessionLocal()
+    try:
+        user = User(
+            username="bench_edge_writer",
+            email="bench_edge_writer@example.com",
+            hashed_password="-",
+        )
+        db.add(user)
+        db.flush()
+        network = RoadNetwork(
+            name="bench", timestamp=datetime.now(UTC), user_id=user.id
+        )
+        db.add(network)
+        db.flush()
+
+        started = time.perf_counter()
+        for batch in batched(features, args.batch_size):
+            db.bulk_save_objects([orm_edge(f, network.id, user.id) for f in batch])
+        orm_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        timestamp = datetime.now(UTC)
+        for batch in batched(features, args.batch_size):
+            edges = build_edge_batch(batch)
+            copy_road_edges(db, edges.rows(network.id, user.id, timestamp))
+        copy_seconds = time.perf_counter() - started
+
+        print(f"edges:             {len(features)}")
+        print(f"bulk_save_objects: {orm_seconds:8.2f}s")
+        print(f"COPY writer:       {copy_seconds:8.2f}s")
+        print(f"speedup:           {orm_seconds / copy_seconds:8.1f}x")
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edges", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    engine.echo = False
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Compares the latency of building the edges response with ORM objects and
+Python side GeoJSON conversion against the features rendered by PostGIS.
+
+A throwaway network with the requested number of edges is written with the
+COPY writer, both implementations are run against it repeatedly and the
+p50/p99 latency (query plus response serialization) is reported. Everything
+runs in one transaction that is rolled back at the end.
+
+Usage (against the docker-compose database):
+    python -m benchmarks.bench_edges_endpoint --edges 100000 --runs 20
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from fastapi.responses import JSONResponse, Response
+from geoalchemy2.shape import to_shape
+from shapely.geometry.geo import mapping
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.core.edge_batch import build_edge_batch
+from app.db.copy_writer import copy_road_edges
+from app.db.edge_queries import feature_collection, select_edge_features
+from app.db.models import RoadEdge, RoadNetwork, User
+from benchmarks.bench_edge_writer import batched, load_features
+
+
+def orm_response(db: Session, network_id: int) -> bytes:
+    """The edges response as it was built before PostGIS rendered the features."""
+    edges = (
+        db.query(RoadEdge)
+        .filter(RoadEdge.network_id == network_id, RoadEdge.is_current == True)
+        .all()
+    )
+    features = [
+        {
+            "type": "Feature",
+            "geometry": mapping(to_shape(edge.geometry)),
+            "properties": {
+                "id": edge.id,
+                "timestamp": edge.timestamp.isoformat(),
+                "is_current": edge.is_current,
+            },
+        }
+        for edge in edges
+    ]
+    content = {"type": "FeatureCollection", "features": features}
+    return JSONResponse(content=content).body
+
+
+def postgis_response(db: Session, network_id: int) -> bytes:
+    features = db.execute(select_edge_features(network_id)).scalars()
+    return Response(
+        content=feature_collection(list(features)), media_type="application/json"
+    ).body
+
+
+def measure(
+    db: Session, network_id: int, build: Callable[[Session, int], bytes], runs: int
+) -> tuple[float, float, int]:
+    timings = []
+    size = 0
+    for _ in range(runs):
+        # start every run from an empty identity map, like a fresh request
+        db.expunge_all()
+        started = time.perf_counter()
+        size = len(build(db, network_id))
+        timings.append(time.perf_counter() - started)
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return percentiles[49], percentiles[98], size
+
+
+def run(args: argparse.Namespace) -> None:
+    features = load_features(args.edges)
+    db = SessionLocal()
+    try:
+        user = User(
+            username="bench_edges_endpoint",
+            email="bench_edges_endpoint@example.com",
+            hashed_password="-",
+        )
+        db.add(user)
+        db.flush()
+        network = RoadNetwork(
+            name="bench", timestamp=datetime.now(UTC), user_id=user.id
+        )
+        db.add(network)
+        db.flush()
+
+        timestamp = datetime.now(UTC)
+        for batch in batched(features, 1000):
+            edges = build_edge_batch(batch)
+            copy_road_edges(db, edges.rows(network.id, user.id, timestamp))
+
+        print(f"edges: {len(features)}, runs: {args.runs}")
+        for label, build in (
+            ("ORM + mapping()", orm_response),
+            ("PostGIS", postgis_response),
+        ):
+            p50, p99, size = measure(db, network.id, build, args.runs)
+            print(
+                f"{label:16} p50 {p50 * 1000:9.1f}ms  p99 {p99 * 1000:9.1f}ms"
+                f"  ({size / 1e6:.1f} MB)"
+            )
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edges", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    engine.echo = False
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures the latency of edge reads while a burst of logins hits the API,
+compared to the latency of the same reads on an idle API. Also reports how
+many logins were turned away with 503 by the bounded password hashing pool.
+
+Usage (against a running API, e.g. the docker-compose setup):
+    python -m benchmarks.bench_login_storm --email user@example.com \\
+        --password secret --network-id 1 --logins 500
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+
+import httpx
+
+from benchmarks.bench_concurrent_reads import read_edges, read_until, report
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> int:
+    resp = await client.post(
+        "/auth/login", data={"username": email, "password": password}
+    )
+    return resp.status_code
+
+
+async def login_storm(
+    client: httpx.AsyncClient, args: argparse.Namespace, done: asyncio.Event
+) -> Counter[int]:
+    try:
+        statuses = await asyncio.gather(
+            *(login(client, args.email, args.password) for _ in range(args.logins))
+        )
+        return Counter(statuses)
+    finally:
+        done.set()
+
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.logins + args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.api_url, timeout=600, limits=limits
+    ) as client:
+        resp = await client.post(
+            "/auth/login", data={"username": args.email, "password": args.password}
+        )
+        resp.raise_for_status()
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        async with httpx.AsyncClient(
+            base_url=args.api_url, timeout=600, headers=headers
+        ) as reader:
+            idle: list[float] = []
+            for _ in range(args.reads):
+                await read_edges(reader, args.network_id, idle)
+
+            done = asyncio.Event()
+            *busy, statuses = await asyncio.gather(
+                *(
+                    read_until(reader, args.network_id, done)
+                    for _ in range(args.concurrency)
+                ),
+                login_storm(client, args, done),
+            )
+
+    report("idle", idle)
+    report("login storm", [t for timings in busy for t in timings])
+    print("login responses:", dict(statuses))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--network-id", type=int, required=True)
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measures routing on a synthetic grid network: building the CSR graph, its
+size, and the latency of bidirectional Dijkstra versus a Dijkstra from the
+origin only, for random pairs of nodes up to a part of the grid apart.
+
+No database is needed.
+
+Usage:
+    python -m benchmarks.bench_route --size 300 --routes 100 --span 4
+"""
+
+import argparse
+import heapq
+import math
+import random
+import statistics
+import time
+
+import numpy as np
+
+from app.core.routing import RoadGraph, build_graph, shortest_path
+
+
+def grid_graph(size: int) -> RoadGraph:
+    """
+    A size x size street grid with blocks of 60m to 140m and every tenth
+    street oneway.
+    """
+    node_ids = np.arange(1, size * size + 1, dtype=np.int64)
+    rows, cols = np.divmod(node_ids - 1, size)
+    coords = np.column_stack([cols * 0.001, rows * 0.001])
+
+    horizontal = node_ids.reshape(size, size)[:, :-1].ravel()
+    vertical = node_ids.reshape(size, size)[:-1, :].ravel()
+    sources = np.concatenate([horizontal, vertical])
+    targets = np.concatenate([horizontal + 1, vertical + size])
+    oneway = np.concatenate(
+        [(rows[horizontal - 1] % 10) == 0, np.zeros(len(vertical), dtype=bool)]
+    )
+    weights = np.random.default_rng(0).uniform(60.0, 140.0, len(sources))
+    edge_ids = np.arange(len(sources), dtype=np.int64)
+    return build_graph(node_ids, coords, sources, targets, weights, oneway, edge_ids)
+
+
+def one_sided_dijkstra(graph: RoadGraph, source: int, target: int) -> float | None:
+    indptr = memoryview(graph.forward.indptr)
+    heads = memoryview(graph.forward.heads)
+    weights = memoryview(graph.forward.weights)
+    distances = [math.inf] * len(graph.node_ids)
+    distances[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        distance, vertex = heapq.heappop(heap)
+        if vertex == target:
+            return distance
+        if distance > distances[vertex]:
+            continue
+        for arc in range(indptr[vertex], indptr[vertex + 1]):
+            candidate = distance + weights[arc]
+            if candidate < distances[heads[arc]]:
+                distances[heads[arc]] = candidate
+                heapq.heappush(heap, (candidate, heads[arc]))
+    return None
+
+
+def percentiles(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered) * 1000:8.2f}ms  p99 {p99 * 1000:8.2f}ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--routes", type=int, default=100)
+    # routes go at most size / span blocks in either direction
+    parser.add_argument("--span", type=int, default=4)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = grid_graph(args.size)
+    build_seconds = time.perf_counter() - started
+
+    # routes within a part of the network, like checks between nearby places
+    rng = random.Random(0)
+    span = max(1, args.size // args.span)
+    pairs = []
+    for _ in range(args.routes):
+        row, col = rng.randrange(args.size - span), rng.randrange(args.size - span)
+        pairs.append(
+            (
+                row * args.size + col,
+                (row + rng.randrange(span)) * args.size + col + rng.randrange(span),
+            )
+        )
+    bidirectional, one_sided = [], []
+    for source, target in pairs:
+        started = time.perf_counter()
+        route = shortest_path(graph, source, target)
+        bidirectional.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        length = one_sided_dijkstra(graph, source, target)
+        one_sided.append(time.perf_counter() - started)
+        assert (route is None) == (length is None)
+        assert route is None or math.isclose(route.length, length or 0.0)
+
+    print(f"nodes:          {len(graph.node_ids)}")
+    print(f"graph size:     {graph.nbytes / 1024 / 1024:8.1f}MiB")
+    print(f"build:          {build_seconds:8.2f}s")
+    print(f"bidirectional:  {percentiles(bidirectional)}")
+    print(f"one sided:      {percentiles(one_sided)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -50,3 +50,23 @@ def api_url(docker_ip: int, docker_services: Any) -> str:
         logger.info("Checking container status...")
 
         raise
+
+
+@pytest.fixture(scope="session")
+def db_url(
+    pytestconfig: Any, docker_ip: str, docker_services: Any, api_url: str
+) -> str:
+    """Get the URL of the database the API service runs on."""
+    # depends on api_url, the API only starts once the database is healthy
+    path = os.path.join(str(pytestconfig.rootdir), "tests", ".env")
+    with open(path) as f:
+        env = dict(
+            line.strip().split("=", 1)
+            for line in f
+            if "=" in line and not line.startswith("#")
+        )
+    port = docker_services.port_for("db", 5432)
+    return (
+        f"postgresql+psycopg2://{env['POSTGRES_USER']}:{env['POSTGRES_PASSWORD']}"
+        f"@{docker_ip}:{port}/{env['POSTGRES_DB']}"
+    )
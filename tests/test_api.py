@@ -1,8 +1,15 @@
+import gzip
+import io
 import json
+import math
+import time
+from datetime import UTC, datetime, timedelta
 from typing import Union, Dict, List, Any
 
+import pyarrow.parquet as pq
 import pytest
 import requests
+import zstandard
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -25,6 +32,33 @@ def login_user(api_url: str, email: str, password: str) -> Any:
     return resp.json()["access_token"]
 
 
+def wait_for_job(
+    api_url: str, headers: Dict[str, str], job_id: int, timeout: float = 60.0
+) -> Any:
+    """Polls an ingest job until it finished and returns its final state."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        resp = requests.get(f"{api_url}/jobs/{job_id}", headers=headers)
+        assert resp.status_code == 200, f"Job lookup failed: {resp.text}"
+        job = resp.json()
+        if job["status"] in ("SUCCEEDED", "FAILED"):
+            return job
+        time.sleep(0.5)
+    raise AssertionError(f"Job {job_id} did not finish within {timeout}s")
+
+
+def upload_network(api_url: str, headers: Dict[str, str], file_path: str) -> int:
+    """Uploads a network file, waits for its ingest job and returns the network id."""
+    with open(file_path, "rb") as f:
+        files = {"file": (file_path.rsplit("/", 1)[-1], f, "application/geo+json")}
+        resp = requests.post(f"{api_url}/networks/upload", files=files, headers=headers)
+    assert resp.status_code == 202, f"Upload failed: {resp.text}"
+
+    job = wait_for_job(api_url, headers, resp.json()["job_id"])
+    assert job["status"] == "SUCCEEDED", job
+    return int(job["network_id"])
+
+
 def load_data_file(file_path: str) -> Any:
     with open(file_path, encoding="utf-8") as f:
         data = json.load(f)
@@ -140,8 +174,16 @@ class TestRoadNetworksEndpoints:
                 f"{api_url}/networks/upload", files=files, headers=headers
             )
 
-        assert upload_resp.status_code == 201, f"Upload failed: {upload_resp.text}"
-        assert upload_resp.json().get("message") == "File Uploaded"
+        assert upload_resp.status_code == 202, f"Upload failed: {upload_resp.text}"
+        job_id = upload_resp.json()["job_id"]
+        assert upload_resp.headers["Location"] == f"/jobs/{job_id}"
+
+        job = wait_for_job(api_url, headers, job_id)
+        assert job["status"] == "SUCCEEDED", job
+        assert job["network_id"] is not None
+
+        file = load_data_file(file_path)
+        assert job["features_processed"] == len(file["features"])
 
     def test_get_network_file(self, api_url: str) -> None:
         # user the same user to being able to access the file
@@ -161,6 +203,906 @@ class TestRoadNetworksEndpoints:
         assert len(file["features"]) == len(file_resp.json()["features"])
         assert len(file["type"]) == len(file_resp.json()["type"])
 
+    @pytest.mark.parametrize(
+        "content",
+        [
+            b'{"type": "FeatureCollection", "features": [{"type": "Feature",',
+            b'{"type": "GeometryCollection", "features": []}',
+            b'["not", "an", "object"]',
+        ],
+    )
+    def test_upload_invalid_geojson_fails_job(
+        self, api_url: str, content: bytes
+    ) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        files = {"file": ("broken.geojson", content, "application/geo+json")}
+        upload_resp = requests.post(
+            f"{api_url}/networks/upload", files=files, headers=headers
+        )
+        assert upload_resp.status_code == 202, upload_resp.text
+
+        job = wait_for_job(api_url, headers, upload_resp.json()["job_id"])
+        assert job["status"] == "FAILED"
+        assert job["error"]
+        assert job["network_id"] is None
+
+    def test_upload_with_invalid_extension_is_rejected(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        files = {"file": ("network.txt", b"{}", "text/plain")}
+        upload_resp = requests.post(
+            f"{api_url}/networks/upload", files=files, headers=headers
+        )
+        assert upload_resp.status_code == 400, upload_resp.text
+
+    @pytest.mark.parametrize("filename", ["network.txt", "network.txt.gz"])
+    def test_update_with_invalid_extension_is_rejected(
+        self, api_url: str, filename: str
+    ) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        files = {"file": (filename, b"{}", "text/plain")}
+        update_resp = requests.post(
+            f"{api_url}/networks/{1}/update", files=files, headers=headers
+        )
+        assert update_resp.status_code == 400, update_resp.text
+
+    @pytest.mark.parametrize(
+        "filename, compress, content_type",
+        [
+            ("bayrischzell.geojson.gz", gzip.compress, "application/geo+json"),
+            (
+                "bayrischzell.geojson",
+                zstandard.ZstdCompressor().compress,
+                "application/zstd",
+            ),
+        ],
+    )
+    def test_upload_compressed_file(
+        self, api_url: str, filename: str, compress: Any, content_type: str
+    ) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        file_path = (
+            "./geojson_files_from_task_assignment/road_network_bayrischzell_1.0.geojson"
+        )
+        with open(file_path, "rb") as f:
+            content = compress(f.read())
+        files = {"file": (filename, content, content_type)}
+        upload_resp = requests.post(
+            f"{api_url}/networks/upload", files=files, headers=headers
+        )
+        assert upload_resp.status_code == 202, upload_resp.text
+
+        job = wait_for_job(api_url, headers, upload_resp.json()["job_id"])
+        assert job["status"] == "SUCCEEDED", job
+        file = load_data_file(file_path)
+        assert job["features_processed"] == len(file["features"])
+
+        part_headers = {"Content-Encoding": "br"}
+        files = {"file": ("bayrischzell.geojson", content, content_type, part_headers)}
+        upload_resp = requests.post(
+            f"{api_url}/networks/upload", files=files, headers=headers
+        )
+        assert upload_resp.status_code == 415, upload_resp.text
+
+    def test_update_network_only_touches_changed_edges(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        old_path = (
+            "./geojson_files_from_task_assignment/road_network_bayrischzell_1.0.geojson"
+        )
+        new_path = (
+            "./geojson_files_from_task_assignment/road_network_bayrischzell_1.1.geojson"
+        )
+        network_id = upload_network(api_url, headers, old_path)
+
+        # a cached response of the old version must not survive the update
+        for _ in range(2):
+            requests.get(f"{api_url}/networks/{network_id}/edges", headers=headers)
+
+        with open(new_path, "rb") as f:
+            files = {"file": ("bayrischzell_1.1.geojson", f, "application/geo+json")}
+            update_resp = requests.post(
+                f"{api_url}/networks/{network_id}/update", files=files, headers=headers
+            )
+        assert update_resp.status_code == 202, update_resp.text
+
+        job = wait_for_job(api_url, headers, update_resp.json()["job_id"])
+        assert job["status"] == "SUCCEEDED", job
+
+        changes = job["result"]
+        old_count = len(load_data_file(old_path)["features"])
+        new_count = len(load_data_file(new_path)["features"])
+        assert changes["unchanged"] > 0
+        assert changes["added"] + changes["unchanged"] == new_count
+        assert changes["removed"] + changes["unchanged"] == old_count
+
+        edges_resp = requests.get(
+            f"{api_url}/networks/{network_id}/edges", headers=headers
+        )
+        assert len(edges_resp.json()["features"]) == new_count
+
+        # the job was created before the update retired anything
+        before_resp = requests.get(
+            f"{api_url}/networks/{network_id}/edges",
+            params={"timestamp": job["created_at"]},
+            headers=headers,
+        )
+        assert len(before_resp.json()["features"]) == old_count
+
+        changes_resp = requests.get(
+            f"{api_url}/networks/{network_id}/changes",
+            params={"since": job["created_at"]},
+            headers=headers,
+        )
+        assert changes_resp.status_code == 200, changes_resp.text
+        kinds = [f["properties"]["change"] for f in changes_resp.json()["features"]]
+        assert kinds.count("added") == changes["added"]
+        assert kinds.count("retired") == changes["removed"]
+
+        ndjson_resp = requests.get(
+            f"{api_url}/networks/{network_id}/changes",
+            params={
+                "since": job["created_at"],
+                "until": changes_resp.headers["x-changes-until"],
+                "format": "ndjson",
+            },
+            headers=headers,
+        )
+        assert ndjson_resp.headers["content-type"] == "application/x-ndjson"
+        assert len(ndjson_resp.text.splitlines()) == len(kinds)
+
+    @pytest.mark.parametrize(
+        "params, expect_all",
+        [
+            ({"bbox": "-180,-90,180,90"}, True),
+            ({"bbox": "100,-10,101,-9"}, False),
+            (
+                {
+                    "intersects": (
+                        "POLYGON((-180 -90, 180 -90, 180 90, -180 90, -180 -90))"
+                    )
+                },
+                True,
+            ),
+            (
+                {
+                    "intersects": json.dumps(
+                        {
+                            "type": "Polygon",
+                            "coordinates": [
+                                [[100, -10], [101, -10], [101, -9], [100, -10]]
+                            ],
+                        }
+                    )
+                },
+                False,
+            ),
+        ],
+    )
+    def test_get_network_edges_in_area(
+        self, api_url: str, params: Dict[str, str], expect_all: bool
+    ) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        edges_resp = requests.get(
+            f"{api_url}/networks/{1}/edges", params=params, headers=headers
+        )
+        assert edges_resp.status_code == 200, edges_resp.text
+
+        file = load_data_file("./tests/test_data/York_cycle_network.geojson")
+        expected = len(file["features"]) if expect_all else 0
+        assert len(edges_resp.json()["features"]) == expected
+
+    def test_get_network_edges_at_naive_timestamp(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        current = requests.get(f"{api_url}/networks/{1}/edges", headers=headers)
+
+        # timestamps without an offset are UTC
+        now = datetime.now(UTC).replace(tzinfo=None).isoformat()
+        naive_resp = requests.get(
+            f"{api_url}/networks/{1}/edges",
+            params={"timestamp": now},
+            headers=headers,
+        )
+        assert naive_resp.status_code == 200, naive_resp.text
+        assert len(naive_resp.json()["features"]) == len(current.json()["features"])
+
+        before_resp = requests.get(
+            f"{api_url}/networks/{1}/edges",
+            params={"timestamp": "2000-01-01T00:00:00"},
+            headers=headers,
+        )
+        assert before_resp.status_code == 200, before_resp.text
+        assert before_resp.json()["features"] == []
+
+    def test_get_network_edges_not_modified(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # the first response is streamed and fills the cache
+        first_resp = requests.get(f"{api_url}/networks/{1}/edges", headers=headers)
+        cached_resp = requests.get(f"{api_url}/networks/{1}/edges", headers=headers)
+        assert cached_resp.status_code == 200
+        assert cached_resp.content == first_resp.content
+        etag = cached_resp.headers["etag"]
+
+        not_modified_resp = requests.get(
+            f"{api_url}/networks/{1}/edges",
+            headers={**headers, "If-None-Match": etag},
+        )
+        assert not_modified_resp.status_code == 304
+        assert not_modified_resp.headers["etag"] == etag
+        assert not_modified_resp.content == b""
+
+        metrics = requests.get(f"{api_url}/metrics").json()
+        assert metrics["response_cache"]["hits"] >= 2
+        assert metrics["principal_cache"]["hits"] >= 2
+
+    def test_get_network_nodes(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        network_id = upload_network(
+            api_url,
+            headers,
+            "./geojson_files_from_task_assignment/"
+            "road_network_bayrischzell_1.0.geojson",
+        )
+
+        edges = requests.get(
+            f"{api_url}/networks/{network_id}/edges", headers=headers
+        ).json()["features"]
+        degrees: Dict[int, int] = {}
+        for edge in edges:
+            for end in ("source", "target"):
+                node_id = edge["properties"][end]
+                assert node_id is not None
+                degrees[node_id] = degrees.get(node_id, 0) + 1
+
+        nodes_resp = requests.get(
+            f"{api_url}/networks/{network_id}/nodes", headers=headers
+        )
+        assert nodes_resp.status_code == 200, nodes_resp.text
+        nodes = nodes_resp.json()["features"]
+        assert {
+            node["properties"]["id"]: node["properties"]["degree"] for node in nodes
+        } == degrees
+        # edges that meet share their node
+        assert len(nodes) < 2 * len(edges)
+        assert all(node["geometry"]["type"] == "Point" for node in nodes)
+
+        # timestamps without an offset are UTC
+        naive_resp = requests.get(
+            f"{api_url}/networks/{network_id}/nodes",
+            params={"timestamp": datetime.now(UTC).replace(tzinfo=None).isoformat()},
+            headers=headers,
+        )
+        assert naive_resp.status_code == 200, naive_resp.text
+        assert {
+            node["properties"]["id"]: node["properties"]["degree"]
+            for node in naive_resp.json()["features"]
+        } == degrees
+
+        junction = max(degrees, key=lambda node_id: degrees[node_id])
+        junctions_resp = requests.get(
+            f"{api_url}/networks/{network_id}/nodes",
+            params={"min_degree": degrees[junction]},
+            headers=headers,
+        )
+        assert junction in {
+            node["properties"]["id"] for node in junctions_resp.json()["features"]
+        }
+
+        at_junction = requests.get(
+            f"{api_url}/networks/{network_id}/edges",
+            params={"filter": f"source = {junction} or target = {junction}"},
+            headers=headers,
+        ).json()["features"]
+        assert 0 < len(at_junction) <= degrees[junction]
+
+    def test_get_network_route(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        network_id = upload_network(
+            api_url,
+            headers,
+            "./geojson_files_from_task_assignment/"
+            "road_network_bayrischzell_1.0.geojson",
+        )
+        nodes = {
+            node["properties"]["id"]: node["geometry"]["coordinates"]
+            for node in requests.get(
+                f"{api_url}/networks/{network_id}/nodes", headers=headers
+            ).json()["features"]
+        }
+        edges = requests.get(
+            f"{api_url}/networks/{network_id}/edges", headers=headers
+        ).json()["features"]
+        edge = next(
+            e["properties"]
+            for e in edges
+            if e["properties"]["source"] != e["properties"]["target"]
+        )
+        params = {
+            "from": ",".join(map(str, nodes[edge["source"]])),
+            "to": ",".join(map(str, nodes[edge["target"]])),
+        }
+
+        # the second request is answered from the cached graph
+        for _ in range(2):
+            route_resp = requests.get(
+                f"{api_url}/networks/{network_id}/route", params=params, headers=headers
+            )
+            assert route_resp.status_code == 200, route_resp.text
+        route = route_resp.json()
+        assert route["route"]["source"] == edge["source"]
+        assert route["route"]["target"] == edge["target"]
+        assert route["features"]
+
+        # the edges follow each other from the source to the target node
+        node_id = edge["source"]
+        for feature in route["features"]:
+            ends = (feature["properties"]["source"], feature["properties"]["target"])
+            assert node_id in ends
+            node_id = ends[1] if node_id == ends[0] else ends[0]
+        assert node_id == edge["target"]
+        assert route["route"]["length"] > 0
+
+        # timestamps without an offset are UTC
+        naive_resp = requests.get(
+            f"{api_url}/networks/{network_id}/route",
+            params={
+                **params,
+                "timestamp": datetime.now(UTC).replace(tzinfo=None).isoformat(),
+            },
+            headers=headers,
+        )
+        assert naive_resp.status_code == 200, naive_resp.text
+        assert naive_resp.json()["route"] == route["route"]
+
+        metrics = requests.get(f"{api_url}/metrics").json()
+        assert metrics["graph_cache"]["hits"] >= 1
+
+        invalid_resp = requests.get(
+            f"{api_url}/networks/{network_id}/route",
+            params={**params, "from": "north"},
+            headers=headers,
+        )
+        assert invalid_resp.status_code == 400
+
+    def test_snap_points_to_network(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        edges = requests.get(f"{api_url}/networks/{1}/edges", headers=headers).json()[
+            "features"
+        ][:50]
+
+        # points on inner vertices, which are on their edge only unless edges
+        # overlap
+        points = []
+        expected = []
+        for edge in edges:
+            geometry = edge["geometry"]
+            if geometry["type"] == "LineString" and len(geometry["coordinates"]) > 2:
+                points.append(geometry["coordinates"][1])
+                expected.append(edge["properties"]["id"])
+        assert points
+        far_away = [0.0, 0.0]
+
+        snap_resp = requests.post(
+            f"{api_url}/networks/{1}/snap",
+            json={"points": [*points, far_away], "max_distance": 1000},
+            headers=headers,
+        )
+        assert snap_resp.status_code == 200, snap_resp.text
+        matches = snap_resp.json()["matches"]
+        assert len(matches) == len(points) + 1
+        assert matches[-1] is None
+        for point, match in zip(points, matches):
+            assert match["distance"] == pytest.approx(0, abs=0.01)
+            assert match["location"] == pytest.approx(point)
+        # overlapping edges may share the vertex
+        same = sum(m["edge_id"] == e for m, e in zip(matches, expected))
+        assert same >= len(points) / 2
+
+        # timestamps without an offset are UTC
+        naive_resp = requests.post(
+            f"{api_url}/networks/{1}/snap",
+            json={
+                "points": [*points, far_away],
+                "max_distance": 1000,
+                "timestamp": datetime.now(UTC).replace(tzinfo=None).isoformat(),
+            },
+            headers=headers,
+        )
+        assert naive_resp.status_code == 200, naive_resp.text
+        assert naive_resp.json()["matches"] == matches
+
+        invalid_resp = requests.post(
+            f"{api_url}/networks/{1}/snap",
+            json={"points": [[1.0]]},
+            headers=headers,
+        )
+        assert invalid_resp.status_code == 422
+
+    def test_concurrent_updates_of_one_network(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        network_id = upload_network(
+            api_url,
+            headers,
+            "./geojson_files_from_task_assignment/"
+            "road_network_bayrischzell_1.0.geojson",
+        )
+        new_path = (
+            "./geojson_files_from_task_assignment/road_network_bayrischzell_1.1.geojson"
+        )
+
+        # both jobs are queued before either finished, the workers run them
+        # at the same time
+        job_ids = []
+        for _ in range(2):
+            with open(new_path, "rb") as f:
+                files = {
+                    "file": ("bayrischzell_1.1.geojson", f, "application/geo+json")
+                }
+                update_resp = requests.post(
+                    f"{api_url}/networks/{network_id}/update",
+                    files=files,
+                    headers=headers,
+                )
+            assert update_resp.status_code == 202, update_resp.text
+            job_ids.append(update_resp.json()["job_id"])
+        jobs = [wait_for_job(api_url, headers, job_id) for job_id in job_ids]
+        assert all(job["status"] == "SUCCEEDED" for job in jobs), jobs
+
+        # the second update found the version of the first one unchanged
+        new_count = len(load_data_file(new_path)["features"])
+        results = sorted((job["result"] for job in jobs), key=lambda r: r["added"])
+        assert results[0] == {"added": 0, "removed": 0, "unchanged": new_count}
+        assert results[1]["added"] + results[1]["unchanged"] == new_count
+
+        edges = requests.get(
+            f"{api_url}/networks/{network_id}/edges", headers=headers
+        ).json()["features"]
+        assert len(edges) == new_count
+        stats = requests.get(
+            f"{api_url}/networks/{network_id}/stats", headers=headers
+        ).json()
+        assert stats["edge_count"] == new_count
+
+        # no grid cell got two nodes
+        nodes = requests.get(
+            f"{api_url}/networks/{network_id}/nodes", headers=headers
+        ).json()["features"]
+        positions = [tuple(node["geometry"]["coordinates"]) for node in nodes]
+        assert len(set(positions)) == len(positions)
+
+    def test_get_network_versions_while_archiving(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        network_id = upload_network(
+            api_url,
+            headers,
+            "./geojson_files_from_task_assignment/"
+            "road_network_bayrischzell_1.0.geojson",
+        )
+        with open(
+            "./geojson_files_from_task_assignment/"
+            "road_network_bayrischzell_1.1.geojson",
+            "rb",
+        ) as f:
+            files = {"file": ("bayrischzell_1.1.geojson", f, "application/geo+json")}
+            update_resp = requests.post(
+                f"{api_url}/networks/{network_id}/update", files=files, headers=headers
+            )
+        job = wait_for_job(api_url, headers, update_resp.json()["job_id"])
+        assert job["status"] == "SUCCEEDED", job
+
+        def versions() -> tuple[Any, Any]:
+            # a fresh timestamp each time, so no response comes from the cache
+            now = datetime.now(UTC).isoformat()
+            before, current = (
+                requests.get(
+                    f"{api_url}/networks/{network_id}/edges",
+                    params={"timestamp": timestamp},
+                    headers=headers,
+                ).json()["features"]
+                for timestamp in (job["created_at"], now)
+            )
+            return (
+                sorted(before, key=lambda f: f["properties"]["id"]),
+                sorted(current, key=lambda f: f["properties"]["id"]),
+            )
+
+        # the retired edges move to the history partition after the update,
+        # both versions read the same before, during and after
+        first = versions()
+        assert len(first[0]) == len(
+            load_data_file(
+                "./geojson_files_from_task_assignment/"
+                "road_network_bayrischzell_1.0.geojson"
+            )["features"]
+        )
+        for _ in range(5):
+            time.sleep(0.5)
+            assert versions() == first
+
+    def test_get_network_stats(self, api_url: str) -> None:
+        user_payload = {
+            "username": "stats_user",
+            "email": "stats_user@example.com",
+            "hashed_password": "stats_user_pass",
+            "role": "USER",
+        }
+        create_resp = requests.post(f"{api_url}/users/", json=user_payload)
+        assert create_resp.status_code in (200, 201), create_resp.text
+        user_id = create_resp.json()["id"]
+        token = login_user(api_url, "stats_user@example.com", "stats_user_pass")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        old_path = (
+            "./geojson_files_from_task_assignment/road_network_bayrischzell_1.0.geojson"
+        )
+        new_path = (
+            "./geojson_files_from_task_assignment/road_network_bayrischzell_1.1.geojson"
+        )
+
+        def expected(path: str) -> Dict[str, Any]:
+            features = load_data_file(path)["features"]
+            highways: Dict[str, int] = {}
+            for feature in features:
+                highway = feature["properties"]["highway"]
+                highways[highway] = highways.get(highway, 0) + 1
+            return {
+                "edge_count": len(features),
+                "length": sum(f["properties"]["length"] for f in features),
+                "highways": highways,
+            }
+
+        def check(stats: Dict[str, Any], path: str) -> None:
+            wanted = expected(path)
+            assert stats["edge_count"] == wanted["edge_count"]
+            assert stats["length"] == pytest.approx(wanted["length"])
+            assert {
+                highway: values["edge_count"]
+                for highway, values in stats["highways"].items()
+            } == wanted["highways"]
+            # every edge has at least one lane
+            assert stats["lane_km"] >= stats["length"] / 1000 - 1e-6
+            minx, miny, maxx, maxy = stats["bbox"]
+            assert minx < maxx and miny < maxy
+
+        network_id = upload_network(api_url, headers, old_path)
+        stats_resp = requests.get(
+            f"{api_url}/networks/{network_id}/stats", headers=headers
+        )
+        assert stats_resp.status_code == 200, stats_resp.text
+        old_stats = stats_resp.json()
+        check(old_stats, old_path)
+
+        with open(new_path, "rb") as f:
+            files = {"file": ("bayrischzell_1.1.geojson", f, "application/geo+json")}
+            update_resp = requests.post(
+                f"{api_url}/networks/{network_id}/update", files=files, headers=headers
+            )
+        job = wait_for_job(api_url, headers, update_resp.json()["job_id"])
+        assert job["status"] == "SUCCEEDED", job
+
+        # maintained from the changed edges, the same as counting them all
+        new_stats = requests.get(
+            f"{api_url}/networks/{network_id}/stats", headers=headers
+        ).json()
+        check(new_stats, new_path)
+        assert new_stats["valid_from"] > old_stats["valid_from"]
+
+        before_resp = requests.get(
+            f"{api_url}/networks/{network_id}/stats",
+            params={"timestamp": job["created_at"]},
+            headers=headers,
+        )
+        assert before_resp.json() == old_stats
+
+        # timestamps without an offset are UTC
+        naive_resp = requests.get(
+            f"{api_url}/networks/{network_id}/stats",
+            params={"timestamp": datetime.now(UTC).replace(tzinfo=None).isoformat()},
+            headers=headers,
+        )
+        assert naive_resp.status_code == 200, naive_resp.text
+        assert naive_resp.json() == new_stats
+
+        networks_resp = requests.get(
+            f"{api_url}/users/{user_id}/networks", headers=headers
+        )
+        assert networks_resp.status_code == 200, networks_resp.text
+        [network] = networks_resp.json()
+        assert network["id"] == network_id
+        assert network["stats"] == new_stats
+
+        missing_resp = requests.get(f"{api_url}/networks/{1}/stats", headers=headers)
+        assert missing_resp.status_code == 404
+
+    def test_get_network_edges_compressed(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        # the second response comes from the cache
+        for _ in range(2):
+            plain_resp = requests.get(
+                f"{api_url}/networks/{1}/edges",
+                headers={**headers, "Accept-Encoding": "identity"},
+            )
+            assert plain_resp.status_code == 200
+        assert "content-encoding" not in plain_resp.headers
+        assert plain_resp.headers["vary"] == "Accept-Encoding"
+
+        # compressed on the first request, the compressed body is cached
+        for _ in range(2):
+            zstd_resp = requests.get(
+                f"{api_url}/networks/{1}/edges",
+                headers={**headers, "Accept-Encoding": "zstd"},
+                stream=True,
+            )
+            assert zstd_resp.status_code == 200
+            assert zstd_resp.headers["content-encoding"] == "zstd"
+            reader = zstandard.ZstdDecompressor().stream_reader(zstd_resp.raw)
+            assert json.loads(reader.read()) == plain_resp.json()
+
+        gzip_resp = requests.get(
+            f"{api_url}/networks/{1}/edges",
+            headers={**headers, "Accept-Encoding": "gzip"},
+        )
+        assert gzip_resp.headers["content-encoding"] == "gzip"
+        assert gzip_resp.json() == plain_resp.json()
+        assert gzip_resp.headers["etag"] != plain_resp.headers["etag"]
+
+    def test_get_network_tile(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # web mercator tile of the first York edge at zoom 12
+        file = load_data_file("./tests/test_data/York_cycle_network.geojson")
+        lon, lat = file["features"][0]["geometry"]["coordinates"][0][:2]
+        z = 12
+        x = int((lon + 180) / 360 * 2**z)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * 2**z)
+
+        tile_resp = requests.get(
+            f"{api_url}/networks/{1}/tiles/{z}/{x}/{y}.mvt", headers=headers
+        )
+        assert tile_resp.status_code == 200, tile_resp.text
+        assert tile_resp.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+        assert "no-cache" in tile_resp.headers["cache-control"]
+        assert len(tile_resp.content) > 0
+
+        historical_resp = requests.get(
+            f"{api_url}/networks/{1}/tiles/{z}/{x}/{y}.mvt",
+            params={"timestamp": "2000-01-01T00:00:00+00:00"},
+            headers=headers,
+        )
+        assert historical_resp.status_code == 200
+        assert "immutable" in historical_resp.headers["cache-control"]
+
+        # without an offset the timestamp is UTC
+        naive_resp = requests.get(
+            f"{api_url}/networks/{1}/tiles/{z}/{x}/{y}.mvt",
+            params={"timestamp": "2000-01-01T00:00:00"},
+            headers=headers,
+        )
+        assert naive_resp.status_code == 200, naive_resp.text
+        assert "immutable" in naive_resp.headers["cache-control"]
+
+        invalid_resp = requests.get(
+            f"{api_url}/networks/{1}/tiles/{z}/{2**z}/{y}.mvt", headers=headers
+        )
+        assert invalid_resp.status_code == 400
+
+    def test_get_network_edges_simplified(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def points(params: Dict[str, str]) -> list[list[float]]:
+            resp = requests.get(
+                f"{api_url}/networks/{1}/edges", params=params, headers=headers
+            )
+            assert resp.status_code == 200, resp.text
+            geometries = [f["geometry"] for f in resp.json()["features"]]
+            lines = [
+                line
+                for g in geometries
+                for line in (
+                    g["coordinates"]
+                    if g["type"] == "MultiLineString"
+                    else [g["coordinates"]]
+                )
+            ]
+            return [point for line in lines for point in line]
+
+        full = points({})
+        rounded = points({"precision": "3"})
+        assert len(rounded) == len(full)
+        assert all(round(c, 3) == c for point in rounded for c in point)
+        assert len(points({"simplify": "0.001"})) < len(full)
+
+        # simplified responses of historical versions are cached as immutable
+        timestamp = (datetime.now(UTC) - timedelta(seconds=1)).isoformat()
+        params = {"simplify": "0.0001", "timestamp": timestamp}
+        for _ in range(2):
+            cached_resp = requests.get(
+                f"{api_url}/networks/{1}/edges", params=params, headers=headers
+            )
+        assert cached_resp.status_code == 200
+        assert "immutable" in cached_resp.headers["cache-control"]
+
+    def test_get_network_edges_in_other_formats(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        url = f"{api_url}/networks/{1}/edges"
+
+        geojson_resp = requests.get(url, headers=headers)
+        count = len(geojson_resp.json()["features"])
+
+        ndjson_resp = requests.get(url, params={"format": "ndjson"}, headers=headers)
+        assert ndjson_resp.status_code == 200
+        assert ndjson_resp.headers["content-type"] == "application/x-ndjson"
+        lines = ndjson_resp.text.splitlines()
+        assert len(lines) == count
+        assert json.loads(lines[0])["type"] == "Feature"
+
+        parquet_resp = requests.get(
+            url, headers={**headers, "Accept": "application/vnd.apache.parquet"}
+        )
+        assert parquet_resp.status_code == 200, parquet_resp.text
+        table = pq.read_table(io.BytesIO(parquet_resp.content))
+        assert table.num_rows == count
+        assert b"geo" in table.schema.metadata
+        # flattened properties of the York cycle network
+        assert {"id", "geometry", "ONROAD", "NAME"} <= set(table.column_names)
+
+        fgb_resp = requests.get(url, params={"format": "fgb"}, headers=headers)
+        assert fgb_resp.status_code == 200, fgb_resp.text
+        assert fgb_resp.headers["content-type"] == "application/flatgeobuf"
+        assert fgb_resp.content.startswith(b"fgb")
+
+        paged_resp = requests.get(
+            url, params={"format": "ndjson", "limit": 10}, headers=headers
+        )
+        assert paged_resp.status_code == 400
+
+    def test_get_network_edges_with_filter(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def count(params: Dict[str, str]) -> int:
+            resp = requests.get(
+                f"{api_url}/networks/{1}/edges", params=params, headers=headers
+            )
+            assert resp.status_code == 200, resp.text
+            return len(resp.json()["features"])
+
+        total = count({})
+        on_road = count({"filter": "ONROAD = 'On road'"})
+        off_road = count({"filter": "ONROAD != 'On road'"})
+        assert 0 < on_road < total
+        assert on_road + off_road == total
+        assert count({"filter": "ONROAD = 'On road' or ONROAD is not null"}) == total
+        assert count({"filter": "id < 0"}) == 0
+
+    def test_get_network_edges_in_pages(self, api_url: str) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        all_resp = requests.get(f"{api_url}/networks/{1}/edges", headers=headers)
+        assert all_resp.status_code == 200
+        all_ids = {f["properties"]["id"] for f in all_resp.json()["features"]}
+
+        paged_ids = []
+        url: str | None = f"{api_url}/networks/{1}/edges?limit=100"
+        while url is not None:
+            page_resp = requests.get(url, headers=headers)
+            assert page_resp.status_code == 200, page_resp.text
+            page = page_resp.json()
+            assert len(page["features"]) <= 100
+            paged_ids += [f["properties"]["id"] for f in page["features"]]
+            url = page_resp.links.get("next", {}).get("url")
+            assert [link["href"] for link in page["links"]] == ([url] if url else [])
+
+        assert paged_ids == sorted(all_ids)
+
+        # the next links of a read at a naive timestamp carry it as UTC
+        naive_ids = []
+        url = f"{api_url}/networks/{1}/edges"
+        params: Dict[str, Any] | None = {
+            "limit": 100,
+            "timestamp": datetime.now(UTC).replace(tzinfo=None).isoformat(),
+        }
+        while url is not None:
+            page_resp = requests.get(url, params=params, headers=headers)
+            assert page_resp.status_code == 200, page_resp.text
+            naive_ids += [f["properties"]["id"] for f in page_resp.json()["features"]]
+            url = page_resp.links.get("next", {}).get("url")
+            params = None
+        assert naive_ids == sorted(all_ids)
+
+        invalid_resp = requests.get(
+            f"{api_url}/networks/{1}/edges",
+            params={"limit": 100, "cursor": "not a cursor"},
+            headers=headers,
+        )
+        assert invalid_resp.status_code == 400
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"bbox": "1,2,3"},
+            {"bbox": "3,0,1,1"},
+            {"intersects": "POINT(1 1)"},
+            {"intersects": "not a polygon"},
+            {"filter": "lanes >="},
+            {"filter": "oneway = 3"},
+            {"filter": "(highway = primary"},
+        ],
+    )
+    def test_get_network_edges_with_invalid_area(
+        self, api_url: str, params: Dict[str, str]
+    ) -> None:
+        token = login_user(
+            api_url, "file_upload_user@example.com", "file_upload_user_pass"
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        edges_resp = requests.get(
+            f"{api_url}/networks/{1}/edges", params=params, headers=headers
+        )
+        assert edges_resp.status_code == 400, edges_resp.text
+
 
 @pytest.mark.role_based_permissions
 class TestPermissions:
@@ -281,11 +1223,23 @@ class TestPermissions:
         assert resp.status_code in (200, 201)
         temp_user_id = resp.json()["id"]
 
+        # the temp user is now resolved from the principal cache
+        temp_headers = {
+            "Authorization": "Bearer "
+            + login_user(api_url, "tempuser@example.com", "temppass")
+        }
+        own_resp = requests.get(f"{api_url}/users/{temp_user_id}", headers=temp_headers)
+        assert own_resp.status_code == 200
+
         delete_resp = requests.delete(
             f"{api_url}/users/{temp_user_id}", headers=headers
         )
         assert delete_resp.status_code == 200, "ADMIN should delete users"
 
+        # deleting the user drops it from the cache, its token stops working
+        own_resp = requests.get(f"{api_url}/users/{temp_user_id}", headers=temp_headers)
+        assert own_resp.status_code in (401, 404)
+
         get_resp = requests.get(f"{api_url}/users/{temp_user_id}", headers=headers)
         assert get_resp.status_code == 404, "Deleted user should not be found"
 
@@ -310,10 +1264,13 @@ class TestPermissions:
             upload_resp = requests.post(
                 f"{api_url}/networks/upload", files=files, headers=headers_user1
             )
-        assert upload_resp.status_code in (
-            200,
-            201,
-        ), "User 1 should be able to upload network"
+        assert upload_resp.status_code == 202, "User 1 should be able to upload network"
+        job = wait_for_job(api_url, headers_user1, upload_resp.json()["job_id"])
+        assert job["status"] == "SUCCEEDED"
+
+        # user 2 cannot see the job of user 1
+        job_resp = requests.get(f"{api_url}/jobs/{job['id']}", headers=headers_user2)
+        assert job_resp.status_code == 404
 
         # user 2 tries to get user_1 network:
         get_resp = requests.get(f"{api_url}/networks/{1}/edges", headers=headers_user2)
@@ -0,0 +1,138 @@
+import importlib.util
+import os
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from types import ModuleType
+from typing import Any
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "alembic", "versions")
+
+
+def load_migration(name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(VERSIONS_DIR, f"{name}.py")
+    )
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_upgrade(connection: Connection, migration: ModuleType) -> None:
+    context = MigrationContext.configure(connection)
+    with Operations.context(context):
+        migration.upgrade()
+
+
+@pytest.fixture
+def connection(db_url: str) -> Iterator[Connection]:
+    """A connection whose changes are rolled back after the test."""
+    engine = create_engine(db_url)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            yield connection
+        finally:
+            transaction.rollback()
+    engine.dispose()
+
+
+def insert_edges(
+    connection: Connection,
+    network_id: int,
+    is_current: bool,
+    timestamp: datetime,
+    count: int,
+    step: timedelta,
+) -> None:
+    connection.execute(
+        text(
+            "INSERT INTO road_edges (network_id, is_current, timestamp) "
+            "SELECT :network_id, :is_current, :timestamp + i * :step "
+            "FROM generate_series(0, :count - 1) AS i"
+        ),
+        {
+            "network_id": network_id,
+            "is_current": is_current,
+            "timestamp": timestamp,
+            "step": step,
+            "count": count,
+        },
+    )
+
+
+def validity(connection: Connection, network_id: int) -> list[Any]:
+    return list(
+        connection.execute(
+            text(
+                "SELECT valid_from, valid_to, is_current, count(*) AS edges "
+                "FROM road_edges WHERE network_id = :network_id "
+                "GROUP BY valid_from, valid_to, is_current ORDER BY valid_from"
+            ),
+            {"network_id": network_id},
+        )
+    )
+
+
+def test_validity_interval_backfill_of_baseline_updates(
+    connection: Connection,
+) -> None:
+    """
+    Edges in the format the API wrote before the validity interval: uploaded
+    edges share the timestamp of the process start, an update retires every
+    current edge and stamps each new edge with the time it was built.
+    """
+    # shadows any road_edges table of the API for this connection
+    connection.execute(
+        text(
+            "CREATE TEMPORARY TABLE road_edges ("
+            "id serial PRIMARY KEY, network_id integer NOT NULL, "
+            "is_current boolean NOT NULL, timestamp timestamptz NOT NULL)"
+        )
+    )
+    started = datetime(2025, 5, 1, 8, 0, tzinfo=UTC)
+    first_update = datetime(2025, 5, 1, 9, 30, tzinfo=UTC)
+    second_update = datetime(2025, 5, 2, 14, 0, tzinfo=UTC)
+    built = timedelta(microseconds=40)
+
+    # network 1: uploaded, then updated twice
+    insert_edges(connection, 1, False, started, 500, timedelta(0))
+    insert_edges(connection, 1, False, first_update, 3000, built)
+    insert_edges(connection, 1, True, second_update, 3000, built)
+    # network 2: uploaded by the same process and never updated
+    insert_edges(connection, 2, True, started, 200, timedelta(0))
+
+    run_upgrade(
+        connection,
+        load_migration("c72d5e9a1b04_add_validity_interval_to_road_edges"),
+    )
+
+    assert [tuple(row) for row in validity(connection, 1)] == [
+        (started, first_update, False, 500),
+        (first_update, second_update, False, 3000),
+        (second_update, None, True, 3000),
+    ]
+    assert [tuple(row) for row in validity(connection, 2)] == [
+        (started, None, True, 200),
+    ]
+
+    # a read as of any time sees exactly one whole version
+    for at, expected in [
+        (first_update - timedelta(seconds=1), 500),
+        (first_update + 100 * built, 3000),
+        (second_update + 100 * built, 3000),
+    ]:
+        count = connection.execute(
+            text(
+                "SELECT count(*) FROM road_edges WHERE network_id = 1 "
+                "AND tstzrange(valid_from, valid_to, '[)') @> CAST(:at AS timestamptz)"
+            ),
+            {"at": at},
+        ).scalar_one()
+        assert count == expected